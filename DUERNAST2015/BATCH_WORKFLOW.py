@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+DUERNAST Multi-Season Batch Workflow
+
+Purpose: Runs every DSSAT experiment of the long-term Duernast dataset
+         (TUDU1501-TUDU2201 wheat, maize and barley experiments in 2_dssat) as a
+         job queue with bounded concurrency and consolidates the Summary.OUT
+         results of all seasons into one dataset.
+"""
+
+import re
+import sys
+import os
+import time
+import shutil
+import subprocess
+from pathlib import Path
+from datetime import datetime
+
+from MASTER_WORKFLOW import (DSSAT_SYSTEM_FILES, DEFAULT_CACHE_BYTES, MUTABLE_FILES, RunContext,
+                             SimulationCache, link_or_copy)
+
+# Long-term Duernast experiments converted to DSSAT format
+DATASET_DIR = 'input/orignal data/orignal data complete years duernast/data/2_dssat'
+
+# Experiment files are named <INSTITUTE><SITE><YY><NN>.<CROP>X, e.g. TUDU1601.MZX
+EXPERIMENT_PATTERN = re.compile(r'^[A-Z]{4}\d{4}\.([A-Z]{2})X$', re.IGNORECASE)
+
+def discover_experiments(data_dir):
+    """Find all DSSAT experiment files in data_dir
+    
+    Returns:
+        Sorted list of (experiment_path, crop_code) tuples
+    """
+    
+    experiments = []
+    for path in sorted(Path(data_dir).iterdir()):
+        match = EXPERIMENT_PATTERN.match(path.name)
+        if match and path.is_file():
+            experiments.append((path, match.group(1).upper()))
+    return experiments
+
+def read_soil_id(experiment_file):
+    """Read the ID_SOIL of the first field in the *FIELDS section"""
+    
+    with open(experiment_file, 'r', encoding='utf-8', errors='ignore') as f:
+        lines = f.readlines()
+    
+    for i, line in enumerate(lines):
+        if line.startswith('@L ID_FIELD'):
+            columns = line[1:].split()
+            for data_line in lines[i + 1:]:
+                if data_line.strip() and not data_line.startswith(('!', '@', '*')):
+                    parts = data_line.split()
+                    if 'ID_SOIL' in columns and len(parts) > columns.index('ID_SOIL'):
+                        return parts[columns.index('ID_SOIL')]
+                    break
+    return None
+
+def read_summary_table(summary_file):
+    """Read the Summary.OUT table using column extents taken from its @ header line
+    
+    Numeric values are right-aligned to the end of their header label and text
+    values (TNAM, SOIL_ID...) start under it, so each field is sliced from the end
+    of the previous label to the end of its own. This keeps names containing spaces
+    intact.
+    
+    Returns:
+        pandas DataFrame with one row per run, or None if no table was found
+    """
+    
+    import pandas as pd
+    
+    with open(summary_file, 'r', encoding='utf-8', errors='ignore') as f:
+        lines = f.readlines()
+    
+    header_idx = next((i for i, line in enumerate(lines) if line.startswith('@')), None)
+    if header_idx is None:
+        return None
+    
+    header = lines[header_idx].rstrip('\n')
+    labels = [(m.group(), m.end()) for m in re.finditer(r'\S+', header[1:])]
+    names = [label.rstrip('.') for label, _ in labels]
+    colspecs = []
+    start = 0
+    for _, end in labels:
+        # +1 accounts for the leading '@' stripped above
+        colspecs.append((start, end + 1))
+        start = end + 1
+    
+    rows = []
+    for line in lines[header_idx + 1:]:
+        if not line.strip() or line.startswith(('*', '!', '@')):
+            continue
+        rows.append([line[a:b].strip() for a, b in colspecs])
+    
+    if not rows:
+        return None
+    
+    df = pd.DataFrame(rows, columns=names)
+    for column in df.columns:
+        converted = pd.to_numeric(df[column], errors='coerce')
+        if converted.notna().all():
+            df[column] = converted
+    return df
+
+
+class DuernastBatchRunner:
+    """Runs all Duernast seasons as a bounded-concurrency job queue"""
+    
+    def __init__(self, context=None, max_workers=None, cache=None, data_dir=None):
+        self.start_time = datetime.now()
+        self.context = context or RunContext(Path.cwd())
+        self.data_dir = Path(data_dir) if data_dir else self.context.project_path(DATASET_DIR)
+        self.batch_dir = self.context.work_path('batch')
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache = cache
+        self.job_results = []
+    
+    def print_header(self, title, level=1):
+        """Print formatted headers"""
+        if level == 1:
+            print(f"\n{'='*90}")
+            print(f"{title.center(90)}")
+            print('='*90)
+        else:
+            print(f"\n{'-'*70}")
+            print(f"{title}")
+            print('-'*70)
+    
+    def _experiment_sources(self, experiment_file, crop_code):
+        """Source path of every file staged for one experiment, keyed by staged name"""
+        
+        context = self.context
+        sources = {}
+        
+        for filename in DSSAT_SYSTEM_FILES:
+            src = context.project_path(filename)
+            if not src.exists():
+                src = context.project_path('../DSSAT48') / filename
+            sources[filename] = src
+        
+        # Experiment and its observed data files (.xxA / .xxT)
+        sources[experiment_file.name] = experiment_file
+        for suffix in ('A', 'T'):
+            observed = experiment_file.with_suffix(f".{crop_code}{suffix}")
+            if observed.exists():
+                sources[observed.name] = observed
+        
+        # Weather and soil files are shared by all seasons
+        for path in sorted(self.data_dir.glob('*.WTH')):
+            sources[path.name] = path
+        soil_files = sorted(self.data_dir.glob('*.SOL'))
+        for path in soil_files:
+            sources[path.name] = path
+        
+        # DSSAT looks for a profile in <first two letters of ID_SOIL>.SOL
+        soil_id = read_soil_id(experiment_file)
+        if soil_id:
+            for path in soil_files:
+                if f"*{soil_id}" in path.read_text(encoding='utf-8', errors='ignore'):
+                    sources.setdefault(f"{soil_id[:2]}.SOL", path)
+                    break
+        
+        # Crop genotype files from DSSAT48, overridden by the project's calibrated ones
+        for genotype_dir in (context.project_path('../DSSAT48/Genotype'), context.project_path('Genotype')):
+            if genotype_dir.is_dir():
+                for path in sorted(genotype_dir.glob(f"{crop_code}*")):
+                    sources[f"Genotype/{path.name}"] = path
+        
+        return sources
+    
+    def run_experiment(self, experiment_file, crop_code):
+        """Stage, simulate and summarize one experiment in its own work directory
+        
+        Returns:
+            Dictionary with experiment, crop, status, details, execution_time and summary
+        """
+        
+        start_time = time.time()
+        job = {'experiment': experiment_file.stem, 'crop': crop_code, 'status': 'FAILED',
+               'details': '', 'execution_time': 0, 'summary': None}
+        
+        work_dir = self.batch_dir / experiment_file.stem
+        (work_dir / 'Genotype').mkdir(parents=True, exist_ok=True)
+        
+        sources = self._experiment_sources(experiment_file, crop_code)
+        key = self.cache.compute_key(sources) if self.cache else None
+        
+        if key and self.cache.restore(key, work_dir) is not None:
+            job['status'] = 'CACHED'
+        else:
+            # Outputs of an earlier run in this directory would be read as this run's results
+            for path in work_dir.iterdir():
+                if path.suffix.upper() in ('.OUT', '.LST'):
+                    path.unlink()
+            
+            # Files DSSAT may write are copied; only read-only inputs are linked
+            for filename, src in sources.items():
+                if not src.exists():
+                    continue
+                dst = work_dir / filename
+                if filename == experiment_file.name or filename in MUTABLE_FILES:
+                    if dst.exists() or dst.is_symlink():
+                        dst.unlink()
+                    shutil.copy2(src, dst)
+                else:
+                    link_or_copy(src, dst)
+            
+            executable = work_dir / 'DSCSM048.EXE'
+            try:
+                result = subprocess.run([str(executable), 'A', experiment_file.name], cwd=work_dir,
+                                        capture_output=True, text=True, timeout=600)
+            except Exception as e:
+                job['details'] = str(e)
+                job['execution_time'] = time.time() - start_time
+                return job
+            
+            if result.returncode != 0:
+                job['details'] = f"Return code {result.returncode}"
+                job['execution_time'] = time.time() - start_time
+                return job
+            job['status'] = 'SUCCESS'
+            
+            if key and (work_dir / 'Summary.OUT').exists():
+                outputs = sorted(p.name for p in work_dir.iterdir() if p.suffix.upper() in ('.OUT', '.LST'))
+                self.cache.store(key, work_dir, outputs)
+        
+        summary_file = work_dir / 'Summary.OUT'
+        if not summary_file.exists():
+            job['status'] = 'FAILED'
+            job['details'] = "Summary.OUT not created"
+        else:
+            job['summary'] = read_summary_table(summary_file)
+            if job['summary'] is None:
+                job['status'] = 'FAILED'
+                job['details'] = "Summary.OUT has no data rows"
+        
+        job['execution_time'] = time.time() - start_time
+        return job
+    
+    def run_batch(self):
+        """Run every discovered experiment and write the consolidated summary dataset"""
+        
+        self.print_header("DUERNAST MULTI-SEASON BATCH WORKFLOW", 1)
+        print(f"Dataset: {self.context.display_path(self.data_dir)}")
+        print(f"Started: {self.start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+        
+        if not self.data_dir.is_dir():
+            print(f"[ERROR] Dataset folder not found: {self.data_dir}")
+            return False
+        
+        experiments = discover_experiments(self.data_dir)
+        if not experiments:
+            print(f"[ERROR] No experiment files found in {self.data_dir}")
+            return False
+        
+        print(f"\n[OK] Found {len(experiments)} experiments:")
+        for experiment_file, crop_code in experiments:
+            print(f"  - {experiment_file.name} ({crop_code})")
+        
+        self.batch_dir.mkdir(parents=True, exist_ok=True)
+        
+        self.print_header(f"RUNNING {len(experiments)} JOBS ON {self.max_workers} WORKERS", 2)
+        
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+        
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.run_experiment, experiment_file, crop_code)
+                       for experiment_file, crop_code in experiments]
+            for future in as_completed(futures):
+                job = future.result()
+                self.job_results.append(job)
+                tag = 'OK' if job['status'] in ('SUCCESS', 'CACHED') else 'WARNING'
+                details = f" - {job['details']}" if job['details'] else ''
+                print(f"  [{tag}] {job['experiment']:<10} {job['status']:<8} "
+                      f"({job['execution_time']:.2f}s){details}")
+        
+        self.job_results.sort(key=lambda job: job['experiment'])
+        return self.write_consolidated_summary()
+    
+    def write_consolidated_summary(self):
+        """Concatenate per-experiment Summary.OUT tables into batch_summary.csv"""
+        
+        import pandas as pd
+        
+        self.print_header("CONSOLIDATED RESULTS", 2)
+        
+        frames = []
+        for job in self.job_results:
+            if job['summary'] is not None:
+                frame = job['summary'].copy()
+                frame.insert(0, 'EXPERIMENT', job['experiment'])
+                frame.insert(1, 'CROP', job['crop'])
+                frames.append(frame)
+        
+        succeeded = len(frames)
+        print(f"  Experiments: {len(self.job_results)}")
+        print(f"  Succeeded: {succeeded}")
+        print(f"  Failed: {len(self.job_results) - succeeded}")
+        
+        if not frames:
+            print("[ERROR] No experiment produced results")
+            return False
+        
+        consolidated = pd.concat(frames, ignore_index=True, sort=False)
+        output_csv = self.batch_dir / 'batch_summary.csv'
+        consolidated.to_csv(output_csv, index=False)
+        
+        duration = (datetime.now() - self.start_time).total_seconds()
+        print(f"\n[SUCCESS] Wrote {len(consolidated)} runs to {self.context.display_path(output_csv)}")
+        print(f"  Batch Time: {duration:.2f} seconds")
+        return succeeded == len(self.job_results)
+
+def main():
+    """Main entry point"""
+    
+    import argparse
+    parser = argparse.ArgumentParser(description="Run all Duernast seasons as a batch")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Number of experiments simulated at once (default: CPU count)")
+    parser.add_argument('--data-dir', default=None,
+                        help=f"Folder with DSSAT experiment files (default: {DATASET_DIR})")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Always run DSSAT, ignoring the simulation output cache")
+    parser.add_argument('--cache-dir', default='.simulation_cache',
+                        help="Simulation output cache directory (default: .simulation_cache)")
+    args = parser.parse_args()
+    
+    base_dir = Path.cwd()
+    cache = None if args.no_cache else SimulationCache(base_dir / args.cache_dir, DEFAULT_CACHE_BYTES)
+    runner = DuernastBatchRunner(context=RunContext(base_dir), max_workers=args.workers,
+                                 cache=cache, data_dir=args.data_dir)
+    
+    return 0 if runner.run_batch() else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,15 +9,361 @@ Purpose: Complete end-to-end workflow for Duernast 2015 Spring Wheat N-Wheat mod
 import subprocess
 import sys
 import os
+import re
 import time
 from pathlib import Path
 from datetime import datetime
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'scripts'))
+from dssat_output_reader import OutputFollower
+
+# Experiment simulated by the workflow
+EXPERIMENT_FILE = 'TUDU1501.WHX'
+
+# Files staged into every run directory
+DSSAT_SYSTEM_FILES = ['DSCSM048.EXE', 'DSCSM048.CTR', 'DATA.CDE', 'DETAIL.CDE']
+INPUT_FILES = ['TUDU1501.WHX', 'TUDU1501.WTH', 'TUDU1501.WHA', 'DE.SOL']
+OBSERVED_FILE = 'TUDU1501.WHT'
+
+# Staged files that DSSAT may rewrite during a run; these are copied, never linked
+MUTABLE_FILES = ['TUDU1501.WHX', 'DSCSM048.CTR']
+
+# Default size bound of the simulation output cache
+DEFAULT_CACHE_BYTES = 512 * 1024 * 1024
+
+# DSSAT batch file written into each shard directory
+BATCH_FILE = 'DSSBatch.v48'
+
+# Daily/seasonal outputs made of *RUN blocks that are merged after a sharded run
+RUN_SECTIONED_OUTPUTS = ['PlantGro.OUT', 'PlantN.OUT', 'Weather.OUT',
+                         'SoilNi.OUT', 'SoilWat.OUT', 'OVERVIEW.OUT']
+
+# Outputs followed while DSSAT is running in live mode
+LIVE_OUTPUTS = ['PlantGro.OUT', 'Summary.OUT']
+
+def read_treatment_numbers(experiment_file):
+    """Read treatment numbers from the *TREATMENTS section of a DSSAT experiment file"""
+    
+    treatments = []
+    in_treatments = False
+    with open(experiment_file, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            if line.startswith('*'):
+                in_treatments = line.startswith('*TREATMENTS')
+                continue
+            if not in_treatments or not line.strip() or line.startswith(('@', '!')):
+                continue
+            try:
+                treatments.append(int(line.split()[0]))
+            except (ValueError, IndexError):
+                continue
+    return treatments
+
+def link_or_copy(src, dst):
+    """Stage src at dst as a hard link, falling back to a symlink and then a copy
+    
+    An existing dst that already refers to src is left alone.
+    
+    Returns:
+        How the file was staged: 'existing', 'hardlink', 'symlink' or 'copy'
+    """
+    
+    import shutil
+    
+    src = Path(src)
+    dst = Path(dst)
+    if dst.exists() or dst.is_symlink():
+        try:
+            if os.path.samefile(src, dst):
+                return 'existing'
+        except OSError:
+            pass
+        dst.unlink()
+    
+    try:
+        os.link(src, dst)
+        return 'hardlink'
+    except OSError:
+        pass
+    try:
+        os.symlink(src.resolve(), dst)
+        return 'symlink'
+    except OSError:
+        pass
+    shutil.copy2(src, dst)
+    return 'copy'
+
+def write_batch_file(batch_path, experiment_file, treatments):
+    """Write a DSSAT batch file that runs the given treatments of one experiment"""
+    
+    lines = ['$BATCH(WHEAT)', '!',
+             f"{'@FILEX':<94}TRTNO     RP     SQ     OP     CO"]
+    for trt in treatments:
+        lines.append(f"{experiment_file:<92}{trt:>7}{1:>7}{0:>7}{0:>7}{0:>7}")
+    with open(batch_path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+
+def run_dssat_shard(shard_dir):
+    """Run DSSAT in batch mode inside one shard directory
+    
+    Returns:
+        Tuple of (success, details, execution_time)
+    """
+    
+    start_time = time.time()
+    executable = (Path(shard_dir) / 'DSCSM048.EXE').resolve()
+    try:
+        result = subprocess.run([str(executable), 'B', BATCH_FILE], cwd=shard_dir,
+                                capture_output=True, text=True, timeout=300)
+    except subprocess.TimeoutExpired:
+        return False, "Timeout", time.time() - start_time
+    except Exception as e:
+        return False, str(e), time.time() - start_time
+    
+    execution_time = time.time() - start_time
+    if result.returncode != 0:
+        return False, f"Return code {result.returncode}", execution_time
+    if not (Path(shard_dir) / 'Summary.OUT').exists():
+        return False, "Summary.OUT not created", execution_time
+    return True, "", execution_time
+
+def merge_summary_outputs(shard_files, merged_file):
+    """Concatenate shard Summary.OUT tables, renumbering RUNNO sequentially"""
+    
+    header = []
+    rows = []
+    for file_num, shard_file in enumerate(shard_files):
+        with open(shard_file, 'r', encoding='utf-8', errors='ignore') as f:
+            lines = f.readlines()
+        in_data = False
+        for line in lines:
+            if in_data:
+                if line.strip():
+                    rows.append(line)
+            elif file_num == 0:
+                header.append(line)
+            if line.startswith('@'):
+                in_data = True
+    
+    with open(merged_file, 'w', encoding='utf-8') as f:
+        f.writelines(header)
+        for run_num, line in enumerate(rows, start=1):
+            # RUNNO occupies the first 9 characters of each data row
+            f.write(f"{run_num:>9}{line[9:]}")
+
+def merge_run_sectioned_outputs(shard_files, merged_file):
+    """Concatenate *RUN blocks of shard output files, renumbering runs sequentially
+    
+    The file title (everything before the first model version line) is kept from
+    the first shard only.
+    """
+    
+    run_num = 0
+    with open(merged_file, 'w', encoding='utf-8') as out:
+        for file_num, shard_file in enumerate(shard_files):
+            with open(shard_file, 'r', encoding='utf-8', errors='ignore') as f:
+                lines = f.readlines()
+            
+            body_start = 0
+            for i, line in enumerate(lines):
+                if line.startswith(('*DSSAT', '*RUN')):
+                    body_start = i
+                    break
+            if file_num == 0:
+                out.writelines(lines[:body_start])
+            
+            for line in lines[body_start:]:
+                if line.startswith('*RUN'):
+                    run_num += 1
+                    line = re.sub(r'^\*RUN\s+\d+', f"*RUN {run_num:>3}", line)
+                out.write(line)
+
+
+class RunContext:
+    """Directories used by one workflow run
+    
+    base_dir is the DUERNAST2015 project folder (input/, Genotype/, scripts/) and
+    work_dir is the directory the run stages files into and runs DSSAT and the
+    visualization in. Subprocesses get work_dir as cwd, so the process-wide
+    working directory is never changed and several runs can share one process.
+    """
+    
+    def __init__(self, base_dir, work_dir=None):
+        self.base_dir = Path(base_dir).resolve()
+        self.work_dir = Path(work_dir).resolve() if work_dir else self.base_dir / 'output'
+    
+    @classmethod
+    def scratch(cls, base_dir, scratch_root=None):
+        """Create a context with a fresh, uniquely named work directory"""
+        
+        import tempfile
+        base_dir = Path(base_dir).resolve()
+        scratch_root = Path(scratch_root) if scratch_root else base_dir / 'output' / 'runs'
+        scratch_root.mkdir(parents=True, exist_ok=True)
+        return cls(base_dir, tempfile.mkdtemp(prefix='run_', dir=scratch_root))
+    
+    def project_path(self, relative_path):
+        """Resolve a path relative to the project folder"""
+        return self.base_dir / relative_path
+    
+    def work_path(self, relative_path):
+        """Resolve a path relative to the run's work directory"""
+        return self.work_dir / relative_path
+    
+    def display_path(self, path):
+        """Short path for log messages (relative to the project folder when possible)"""
+        try:
+            return Path(path).relative_to(self.base_dir).as_posix()
+        except ValueError:
+            return str(path)
+    
+    def run(self, args, timeout):
+        """Run a command inside the work directory and capture its output"""
+        return subprocess.run(args, cwd=self.work_dir, capture_output=True, text=True, timeout=timeout)
+    
+    def popen(self, args):
+        """Start a command inside the work directory without waiting for it"""
+        return subprocess.Popen(args, cwd=self.work_dir, stdin=subprocess.DEVNULL,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+class SimulationCache:
+    """Content-addressed store of DSSAT output files
+    
+    Entries are keyed on a SHA-256 digest of every staged simulation input
+    (experiment, weather, soil, genotype, control file and the executable itself)
+    and hold the .OUT/.LST files that run produced. The cache is bounded in size;
+    when it grows past max_bytes the least recently used entries are evicted.
+    """
+    
+    KEY_VERSION = 'duernast-sim-cache-v1'
+    
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+    
+    @classmethod
+    def compute_key(cls, sources, mode=''):
+        """Hash the content of every source file (directories are walked recursively)
+        
+        Args:
+            sources: Dictionary mapping staged name to source path
+            mode: Run mode whose output set is cached (e.g. 'serial', 'sharded');
+                  entries of different modes never match
+        """
+        
+        import hashlib
+        
+        digest = hashlib.sha256(f"{cls.KEY_VERSION}|{mode}".encode())
+        for name in sorted(sources):
+            src = Path(sources[name])
+            if src.is_dir():
+                files = sorted(p for p in src.rglob('*') if p.is_file())
+                entries = [(f"{name}/{p.relative_to(src).as_posix()}", p) for p in files]
+            else:
+                entries = [(name, src)]
+            
+            for entry_name, path in entries:
+                digest.update(entry_name.encode() + b'\0')
+                if not path.exists():
+                    digest.update(b'<missing>\0')
+                    continue
+                with open(path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        digest.update(chunk)
+                digest.update(b'\0')
+        return digest.hexdigest()
+    
+    def restore(self, key, dest_dir):
+        """Copy a cached entry into dest_dir
+        
+        Returns:
+            List of restored file names, or None on a cache miss
+        """
+        
+        import shutil
+        
+        entry = self.cache_dir / key
+        if not entry.is_dir():
+            return None
+        
+        restored = []
+        for path in sorted(entry.iterdir()):
+            shutil.copy2(path, Path(dest_dir) / path.name)
+            restored.append(path.name)
+        
+        # Mark as most recently used
+        os.utime(entry)
+        return restored
+    
+    def store(self, key, src_dir, filenames):
+        """Store the given output files of src_dir under key, then enforce the size bound"""
+        
+        import shutil
+        import tempfile
+        
+        entry = self.cache_dir / key
+        if entry.is_dir():
+            os.utime(entry)
+            return
+        
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Build the entry next to its final location and rename it into place so
+        # concurrent runs never see a partially written entry
+        staging = Path(tempfile.mkdtemp(prefix=f".{key[:12]}-", dir=self.cache_dir))
+        try:
+            for filename in filenames:
+                src = Path(src_dir) / filename
+                if src.is_file():
+                    shutil.copy2(src, staging / filename)
+            os.replace(staging, entry)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            if not entry.is_dir():
+                raise
+        
+        self.evict()
+    
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        
+        import shutil
+        
+        if not self.cache_dir.is_dir():
+            return []
+        
+        entries = []
+        total_size = 0
+        for entry in self.cache_dir.iterdir():
+            if not entry.is_dir() or entry.name.startswith('.'):
+                continue
+            size = sum(p.stat().st_size for p in entry.iterdir() if p.is_file())
+            entries.append((entry.stat().st_mtime, size, entry))
+            total_size += size
+        
+        evicted = []
+        for _, size, entry in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total_size -= size
+            evicted.append(entry.name)
+        return evicted
+
+
 class DuernastWorkflowManager:
     """Main workflow manager for Duernast 2015 N-Wheat analysis"""
     
-    def __init__(self):
+    def __init__(self, sharded=False, max_workers=None, treatments_per_shard=1, context=None,
+                 cache=None, live=False):
         self.start_time = datetime.now()
+        self.context = context or RunContext(Path.cwd())
+        self.cache = cache
+        self.sharded = sharded
+        self.live = live
+        self.max_workers = max_workers
+        self.treatments_per_shard = max(1, treatments_per_shard)
         self.workflow_steps = []
         self.results = {}
         self.errors = []
@@ -54,19 +400,22 @@ class DuernastWorkflowManager:
         
         start_time = time.time()
         
+        context = self.context
+        
         # Check if we're in the right directory and input folder exists
-        if not Path('input').exists():
+        if not context.project_path('input').exists():
             error_msg = "Not in DUERNAST2015 directory or input folder missing! Please run from DUERNAST2015/"
             self.log_step("Prerequisites", "FAILED", error_msg)
             print(f"[ERROR] {error_msg}")
-            print(f"Current directory: {os.getcwd()}")
+            print(f"Project directory: {context.base_dir}")
             return False
         
-        print(f"[OK] Working directory: {os.getcwd()}")
+        print(f"[OK] Project directory: {context.base_dir}")
+        print(f"[OK] Run directory: {context.work_dir}")
         print(f"[OK] Input folder exists: input/")
         
         # Ensure output directory exists
-        output_dir = Path('output')
+        output_dir = context.work_dir
         if not output_dir.exists():
             print(f"[INFO] Creating output directory...")
             output_dir.mkdir(parents=True, exist_ok=True)
@@ -93,8 +442,12 @@ class DuernastWorkflowManager:
         total_size = 0
         
         for filename, description in required_files.items():
-            if Path(filename).exists():
-                size = Path(filename).stat().st_size
+            if filename.startswith('output/'):
+                path = context.work_path(filename[len('output/'):])
+            else:
+                path = context.project_path(filename)
+            if path.exists():
+                size = path.stat().st_size
                 total_size += size
                 print(f"  [OK] {filename:<45} ({size:>10,} bytes) - {description}")
             else:
@@ -138,7 +491,7 @@ class DuernastWorkflowManager:
         # Check visualization script
         print("\nChecking Visualization Script:")
         vis_script = 'scripts/create_duernast_visualizations.py'
-        if Path(vis_script).exists():
+        if context.project_path(vis_script).exists():
             print(f"  [OK] {vis_script}")
         else:
             print(f"  [WARNING] {vis_script} not found")
@@ -157,112 +510,364 @@ class DuernastWorkflowManager:
         start_time = time.time()
         
         # Ensure output directory exists
-        output_dir = Path('output')
+        context = self.context
+        output_dir = context.work_dir
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        # Copy necessary files to output directory
-        # Executable and config files from main folder or DSSAT48
-        main_files = ['DSCSM048.EXE', 'DSCSM048.CTR', 'DATA.CDE', 'DETAIL.CDE']
-        # Input files from input folder
-        input_files = ['TUDU1501.WHX', 'TUDU1501.WTH', 'TUDU1501.WHA', 'DE.SOL']
-        
         print("Preparing simulation environment...")
-        import shutil
+        self._stage_simulation_files(output_dir)
         
-        # Copy DSSAT executable and config files (check multiple locations)
-        for filename in main_files:
-            src = Path(filename)
-            if not src.exists():
-                # Try parent DSSAT48 folder
-                src = Path('../DSSAT48') / filename
+        # Run DSSAT from output directory
+        print("\nRunning DSSAT N-Wheat simulation...")
+        try:
+            executable = context.work_path('DSCSM048.EXE')
+            result = context.run([str(executable), 'A', EXPERIMENT_FILE], timeout=300)
             
-            if src.exists():
-                dst = output_dir / filename
-                shutil.copy2(src, dst)
-                print(f"  [OK] Copied {filename}")
-            else:
-                print(f"  [WARNING] {filename} not found")
+            execution_time = time.time() - start_time
+            return self._check_simulation_result(result.returncode, execution_time)
+                
+        except Exception as e:
+            print(f"[ERROR] Simulation failed: {e}")
+            self.log_step("DSSAT Simulation", "FAILED", str(e))
+            return False
+    
+    def _check_simulation_result(self, returncode, execution_time):
+        """Report a finished single-directory DSSAT run and check its key outputs"""
         
-        # Copy input files from input folder
-        for filename in input_files:
-            src = Path('input') / filename
-            if src.exists():
-                dst = output_dir / filename
-                shutil.copy2(src, dst)
-                print(f"  [OK] Copied {filename}")
+        output_dir = self.context.work_dir
+        
+        if returncode == 0:
+            # Check if key output files were created
+            key_outputs = ['Summary.OUT', 'OVERVIEW.OUT', 'PlantGro.OUT']
+            outputs_created = all((output_dir / f).exists() for f in key_outputs)
+            
+            if outputs_created:
+                print(f"[SUCCESS] DSSAT N-Wheat simulation completed ({execution_time:.2f}s)")
+                print(f"  Output files saved in: {self.context.display_path(output_dir)}/")
+                self.log_step("DSSAT Simulation", "SUCCESS", "Simulation completed", execution_time)
+                return True
             else:
-                print(f"  [WARNING] {filename} not found in input folder")
-        
-        # Copy observed data file (WHT format with grain weight and nitrogen data)
-        wht_src = Path('input/orignal data/TUDU1501.WHT')
-        if wht_src.exists():
-            wht_dst = output_dir / 'TUDU1501.WHT'
-            shutil.copy2(wht_src, wht_dst)
-            print(f"  [OK] Copied TUDU1501.WHT (observed data: yield+grain wt+grain N)")
+                print(f"[WARNING] Simulation ran but some output files missing")
+                self.log_step("DSSAT Simulation", "WARNING", "Some outputs missing", execution_time)
+                return False
         else:
-            print(f"  [WARNING] TUDU1501.WHT not found")
+            print(f"[WARNING] DSSAT returned code {returncode}")
+            self.log_step("DSSAT Simulation", "WARNING", f"Return code {returncode}", execution_time)
+            return False
+    
+    @staticmethod
+    def report_live_run(filename, run):
+        """Default live-mode callback: print progress and flag runs without daily data"""
         
-        # Copy Genotype directory
-        src_genotype = Path('Genotype')
-        dst_genotype = output_dir / 'Genotype'
-        if src_genotype.exists():
-            if dst_genotype.exists():
-                shutil.rmtree(dst_genotype)
-            shutil.copytree(src_genotype, dst_genotype)
-            print(f"  [OK] Copied Genotype directory (N-Wheat cultivar parameters)")
+        rows = 0 if run.data is None else len(run.data)
+        if filename == 'Summary.OUT':
+            print(f"  [LIVE] {filename}: run {run.run_number} finished (treatment {run.treatment})")
+        elif rows == 0:
+            print(f"  [WARNING] {filename}: run {run.run_number} (treatment {run.treatment}) has no daily rows")
+        else:
+            print(f"  [LIVE] {filename}: run {run.run_number} (treatment {run.treatment}) - {rows} days")
+    
+    def run_dssat_simulation_live(self, on_run=None, poll_interval=1.0, timeout=300):
+        """Run DSSAT and parse its outputs while it is still running
         
-        # Run DSSAT from output directory
-        print("\nRunning DSSAT N-Wheat simulation...")
-        original_dir = os.getcwd()
+        DSSAT is started in the background and PlantGro.OUT and Summary.OUT are
+        followed as they grow. Every *RUN block (or Summary.OUT row) is parsed as
+        soon as it is complete and passed to on_run(filename, run), so callers can
+        start analysis or spot bad runs before the whole experiment has finished.
+        
+        Args:
+            on_run: Callback taking (output filename, OutputRun); defaults to
+                    printing progress (report_live_run)
+            poll_interval: Seconds between checks of the followed outputs
+            timeout: Seconds before DSSAT is killed
+        """
+        
+        self.print_header("STEP 2: DSSAT N-WHEAT SIMULATION (LIVE)", 1)
+        
+        start_time = time.time()
+        context = self.context
+        output_dir = context.work_dir
+        output_dir.mkdir(parents=True, exist_ok=True)
+        on_run = on_run or self.report_live_run
+        
+        print("Preparing simulation environment...")
+        self._stage_simulation_files(output_dir)
+        
+        # Outputs left over from an earlier run would be read as new results
+        for filename in LIVE_OUTPUTS:
+            context.work_path(filename).unlink(missing_ok=True)
+        followers = {filename: OutputFollower(context.work_path(filename), numeric=filename != 'Summary.OUT')
+                     for filename in LIVE_OUTPUTS}
+        
+        print("\nRunning DSSAT N-Wheat simulation (following outputs)...")
         try:
-            os.chdir('output')
-            result = subprocess.run(['DSCSM048.EXE', 'A', 'TUDU1501.WHX'], 
-                                  capture_output=True, text=True, timeout=300)
-            os.chdir(original_dir)
+            executable = context.work_path('DSCSM048.EXE')
+            process = context.popen([str(executable), 'A', EXPERIMENT_FILE])
+            
+            while True:
+                finished = process.poll() is not None
+                for filename, follower in followers.items():
+                    for run in follower.poll(final=finished):
+                        on_run(filename, run)
+                
+                if finished:
+                    break
+                if time.time() - start_time > timeout:
+                    process.kill()
+                    process.wait()
+                    raise subprocess.TimeoutExpired(process.args, timeout)
+                time.sleep(poll_interval)
             
             execution_time = time.time() - start_time
+            return self._check_simulation_result(process.returncode, execution_time)
+        
+        except Exception as e:
+            print(f"[ERROR] Simulation failed: {e}")
+            self.log_step("DSSAT Simulation", "FAILED", str(e))
+            return False
+    
+    def _simulation_sources(self):
+        """Source path of every file staged into a run directory, keyed by staged name"""
+        
+        context = self.context
+        sources = {}
+        
+        # Executable and config files from main folder or DSSAT48
+        for filename in DSSAT_SYSTEM_FILES:
+            src = context.project_path(filename)
+            if not src.exists():
+                # Try parent DSSAT48 folder
+                src = context.project_path('../DSSAT48') / filename
+            sources[filename] = src
+        
+        # Input files from input folder
+        for filename in INPUT_FILES:
+            sources[filename] = context.project_path('input') / filename
+        
+        # Observed data file (WHT format with grain weight and nitrogen data)
+        sources[OBSERVED_FILE] = context.project_path('input/orignal data') / OBSERVED_FILE
+        
+        # Cultivar, ecotype and species parameters
+        sources['Genotype'] = context.project_path('Genotype')
+        
+        return sources
+    
+    def _stage_simulation_files(self, run_dir, verbose=True, only=None):
+        """Stage executable, configuration, input and genotype files into run_dir
+        
+        Read-only inputs are hard-linked (or symlinked) to their sources so staging
+        many run directories costs almost nothing; files DSSAT may modify during a
+        run (MUTABLE_FILES) are always copied. Linking falls back to copying on
+        file systems that do not support it.
+        
+        Args:
+            only: Optional list of staged names to stage instead of the full set
+        """
+        
+        import shutil
+        
+        def report(message):
+            if verbose:
+                print(message)
+        
+        for filename, src in self._simulation_sources().items():
+            if only is not None and filename not in only:
+                continue
             
-            if result.returncode == 0:
-                # Check if key output files were created
-                key_outputs = ['Summary.OUT', 'OVERVIEW.OUT', 'PlantGro.OUT']
-                outputs_created = all((output_dir / f).exists() for f in key_outputs)
+            if not src.exists():
+                report(f"  [WARNING] {filename} not found")
+                continue
+            
+            dst = run_dir / filename
+            if src.is_dir():
+                if dst.is_symlink() or dst.is_file():
+                    dst.unlink()
+                dst.mkdir(parents=True, exist_ok=True)
                 
-                if outputs_created:
-                    print(f"[SUCCESS] DSSAT N-Wheat simulation completed ({execution_time:.2f}s)")
-                    print(f"  Output files saved in: output/")
-                    self.log_step("DSSAT Simulation", "SUCCESS", "Simulation completed", execution_time)
-                    return True
+                src_files = {p.relative_to(src) for p in src.rglob('*') if p.is_file()}
+                for stale in [p for p in dst.rglob('*') if p.is_file() or p.is_symlink()]:
+                    if stale.relative_to(dst) not in src_files:
+                        stale.unlink()
+                
+                methods = []
+                for rel_path in sorted(src_files):
+                    (dst / rel_path).parent.mkdir(parents=True, exist_ok=True)
+                    methods.append(link_or_copy(src / rel_path, dst / rel_path))
+                report(f"  [OK] Staged {filename} directory ({len(methods)} files, "
+                       f"{sum(m != 'copy' for m in methods)} linked)")
+            elif filename in MUTABLE_FILES:
+                # Remove first so a hard link left by older staging is never written through
+                if dst.exists() or dst.is_symlink():
+                    dst.unlink()
+                shutil.copy2(src, dst)
+                report(f"  [OK] Copied {filename}")
+            else:
+                method = link_or_copy(src, dst)
+                if method == 'copy':
+                    report(f"  [OK] Copied {filename}")
+                else:
+                    report(f"  [OK] Linked {filename}")
+    
+    def run_dssat_simulation_sharded(self):
+        """Run DSSAT N-Wheat simulation split into per-treatment shards run in parallel
+        
+        Each shard gets its own directory under the run's shards/ folder and a DSSAT
+        batch file listing only its treatments. Shards run concurrently (one DSSAT
+        process per worker) and their outputs are merged back into the run directory
+        in treatment order, so the visualization sees the same layout as a serial run.
+        """
+        
+        self.print_header("STEP 2: DSSAT N-WHEAT SIMULATION (SHARDED)", 1)
+        
+        start_time = time.time()
+        
+        context = self.context
+        output_dir = context.work_dir
+        output_dir.mkdir(parents=True, exist_ok=True)
+        
+        treatments = read_treatment_numbers(context.project_path('input') / EXPERIMENT_FILE)
+        if not treatments:
+            error_msg = f"No treatments found in input/{EXPERIMENT_FILE}"
+            print(f"[ERROR] {error_msg}")
+            self.log_step("DSSAT Simulation", "FAILED", error_msg)
+            return False
+        
+        shards = [treatments[i:i + self.treatments_per_shard]
+                  for i in range(0, len(treatments), self.treatments_per_shard)]
+        max_workers = self.max_workers or min(len(shards), os.cpu_count() or 1)
+        
+        print("Preparing simulation environment...")
+        self._stage_simulation_files(output_dir)
+        
+        import shutil
+        shards_root = output_dir / 'shards'
+        if shards_root.exists():
+            shutil.rmtree(shards_root)
+        
+        shard_dirs = []
+        for shard_num, shard_treatments in enumerate(shards, start=1):
+            shard_dir = shards_root / f"shard_{shard_num:03d}"
+            shard_dir.mkdir(parents=True)
+            self._stage_simulation_files(shard_dir, verbose=False)
+            write_batch_file(shard_dir / BATCH_FILE, EXPERIMENT_FILE, shard_treatments)
+            shard_dirs.append(shard_dir)
+        
+        print(f"  [OK] Staged {len(shards)} shards ({len(treatments)} treatments, "
+              f"{self.treatments_per_shard} per shard)")
+        
+        print(f"\nRunning DSSAT N-Wheat simulation on {max_workers} workers...")
+        
+        # Each worker only waits on its own DSSAT process, so threads are enough
+        # to keep one simulation per core busy
+        from concurrent.futures import ThreadPoolExecutor
+        
+        failed_shards = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(run_dssat_shard, shard_dirs)
+            for shard_dir, shard_treatments, (success, details, shard_time) in zip(shard_dirs, shards, results):
+                trt_label = ','.join(str(t) for t in shard_treatments)
+                if success:
+                    print(f"  [OK] {shard_dir.name} (treatments {trt_label}) - {shard_time:.2f}s")
                 else:
-                    print(f"[WARNING] Simulation ran but some output files missing")
-                    self.log_step("DSSAT Simulation", "WARNING", "Some outputs missing", execution_time)
-                    return False
+                    print(f"  [WARNING] {shard_dir.name} (treatments {trt_label}) - {details}")
+                    failed_shards.append(shard_dir.name)
+        
+        execution_time = time.time() - start_time
+        
+        if failed_shards:
+            details = f"{len(failed_shards)} of {len(shards)} shards failed"
+            print(f"[WARNING] {details}")
+            self.log_step("DSSAT Simulation", "WARNING", details, execution_time)
+            return False
+        
+        print("\nMerging shard outputs...")
+        merge_summary_outputs([d / 'Summary.OUT' for d in shard_dirs], output_dir / 'Summary.OUT')
+        print(f"  [OK] Merged Summary.OUT")
+        for filename in RUN_SECTIONED_OUTPUTS:
+            shard_files = [d / filename for d in shard_dirs]
+            if all(f.exists() for f in shard_files):
+                merge_run_sectioned_outputs(shard_files, output_dir / filename)
+                print(f"  [OK] Merged {filename}")
             else:
-                print(f"[WARNING] DSSAT returned code {result.returncode}")
-                self.log_step("DSSAT Simulation", "WARNING", f"Return code {result.returncode}", execution_time)
-                return False
-                
-        except Exception as e:
-            os.chdir(original_dir)
-            print(f"[ERROR] Simulation failed: {e}")
-            self.log_step("DSSAT Simulation", "FAILED", str(e))
+                print(f"  [WARNING] {filename} missing from some shards, not merged")
+        
+        execution_time = time.time() - start_time
+        
+        key_outputs = ['Summary.OUT', 'OVERVIEW.OUT', 'PlantGro.OUT']
+        if all((output_dir / f).exists() for f in key_outputs):
+            print(f"[SUCCESS] DSSAT N-Wheat simulation completed ({execution_time:.2f}s)")
+            print(f"  Output files saved in: {context.display_path(output_dir)}/")
+            self.log_step("DSSAT Simulation", "SUCCESS",
+                          f"Simulation completed in {len(shards)} shards", execution_time)
+            return True
+        
+        print(f"[WARNING] Simulation ran but some output files missing")
+        self.log_step("DSSAT Simulation", "WARNING", "Some outputs missing", execution_time)
+        return False
+    
+    def run_cached_simulation(self):
+        """Restore simulation outputs from the cache or run DSSAT and cache the results"""
+        
+        if self.sharded:
+            simulate = self.run_dssat_simulation_sharded
+        elif self.live:
+            simulate = self.run_dssat_simulation_live
+        else:
+            simulate = self.run_dssat_simulation
+        if self.cache is None:
+            return simulate()
+        
+        context = self.context
+        start_time = time.time()
+        key = self.cache.compute_key(self._simulation_sources(),
+                                     mode='sharded' if self.sharded else 'serial')
+        
+        output_dir = context.work_dir
+        output_dir.mkdir(parents=True, exist_ok=True)
+        restored = self.cache.restore(key, output_dir)
+        
+        if restored is not None:
+            self.print_header("STEP 2: DSSAT N-WHEAT SIMULATION (CACHED)", 1)
+            # Observed data is read by the visualization but is not a DSSAT output
+            self._stage_simulation_files(output_dir, verbose=False,
+                                         only=[OBSERVED_FILE, 'TUDU1501.WHA'])
+            execution_time = time.time() - start_time
+            print(f"[SUCCESS] Inputs unchanged - restored {len(restored)} output files from cache")
+            print(f"  Cache key: {key[:16]}")
+            print(f"  Output files saved in: {context.display_path(output_dir)}/")
+            self.log_step("DSSAT Simulation", "SUCCESS", f"Restored from cache {key[:16]}", execution_time)
+            return True
+        
+        # Whole seconds, for file systems with coarse modification times
+        run_start = int(time.time())
+        if not simulate():
             return False
+        
+        # Only outputs written by this run; files left over from earlier runs are not cached
+        if self.sharded:
+            candidates = [output_dir / name for name in ['Summary.OUT'] + RUN_SECTIONED_OUTPUTS]
+        else:
+            candidates = [p for p in output_dir.iterdir() if p.suffix.upper() in ('.OUT', '.LST')]
+        cached_outputs = sorted(p.name for p in candidates
+                                if p.is_file() and p.stat().st_mtime >= run_start)
+        self.cache.store(key, output_dir, cached_outputs)
+        print(f"  [OK] Cached {len(cached_outputs)} output files (key {key[:16]})")
+        return True
     
     def run_visualization(self):
         """Run visualization generation"""
         
         self.print_header("STEP 3: VISUALIZATION GENERATION", 1)
         
-        # Change to output directory for visualizations
-        original_dir = os.getcwd()
-        os.chdir('output')
+        # Visualization runs with the run directory as its working directory
+        context = self.context
         
-        script = '../scripts/create_duernast_visualizations.py'
+        script = context.project_path('scripts/create_duernast_visualizations.py')
         description = 'Comprehensive 16-Panel Visualization'
         expected_output = 'duernast_2015_comprehensive_analysis.png'
         
-        if not Path(script).exists():
+        if not script.exists():
             print(f"[ERROR] {description} - script not found")
-            os.chdir(original_dir)
             return False
         
         self.print_header(description, 2)
@@ -270,43 +875,39 @@ class DuernastWorkflowManager:
         start_time = time.time()
         
         try:
-            result = subprocess.run([sys.executable, script], 
-                                  capture_output=True, text=True, timeout=180)
+            result = context.run([sys.executable, str(script)], timeout=180)
             execution_time = time.time() - start_time
             
             if result.returncode == 0:
                 print(f"[SUCCESS] {description} completed ({execution_time:.2f}s)")
                 
                 # Check outputs
-                if Path(expected_output).exists():
-                    size = Path(expected_output).stat().st_size
+                output_path = context.work_path(expected_output)
+                if output_path.exists():
+                    size = output_path.stat().st_size
                     print(f"  Generated: {expected_output} ({size:,} bytes)")
                     
-                    pdf_version = expected_output.replace('.png', '.pdf')
-                    if Path(pdf_version).exists():
-                        pdf_size = Path(pdf_version).stat().st_size
-                        print(f"  Generated: {pdf_version} ({pdf_size:,} bytes)")
+                    pdf_version = context.work_path(expected_output.replace('.png', '.pdf'))
+                    if pdf_version.exists():
+                        pdf_size = pdf_version.stat().st_size
+                        print(f"  Generated: {pdf_version.name} ({pdf_size:,} bytes)")
                 
                 self.log_step(description, "SUCCESS", f"Generated {expected_output}", execution_time)
-                os.chdir(original_dir)
                 return True
             else:
                 print(f"[ERROR] Visualization returned code {result.returncode}")
                 if result.stderr:
                     print(f"  Error: {result.stderr[:500]}")
                 self.log_step(description, "FAILED", "Non-zero exit", execution_time)
-                os.chdir(original_dir)
                 return False
                 
         except subprocess.TimeoutExpired:
             print(f"[ERROR] Visualization timed out")
             self.log_step(description, "FAILED", "Timeout")
-            os.chdir(original_dir)
             return False
         except Exception as e:
             print(f"[ERROR] Could not run {description}: {e}")
             self.log_step(description, "FAILED", str(e))
-            os.chdir(original_dir)
             return False
     
     def generate_summary(self):
@@ -314,15 +915,17 @@ class DuernastWorkflowManager:
         
         self.print_header("WORKFLOW SUMMARY", 1)
         
+        context = self.context
+        
         # Collect generated outputs
         output_files = {
             'Visualization Files': [
-                'output/duernast_2015_comprehensive_analysis.png',
-                'output/duernast_2015_comprehensive_analysis.pdf'
+                'duernast_2015_comprehensive_analysis.png',
+                'duernast_2015_comprehensive_analysis.pdf'
             ],
             'DSSAT Output Files': [
-                'output/Summary.OUT', 'output/OVERVIEW.OUT', 'output/PlantGro.OUT', 'output/PlantN.OUT',
-                'output/SoilWat.OUT', 'output/SoilNi.OUT', 'output/Weather.OUT'
+                'Summary.OUT', 'OVERVIEW.OUT', 'PlantGro.OUT', 'PlantN.OUT',
+                'SoilWat.OUT', 'SoilNi.OUT', 'Weather.OUT'
             ]
         }
         
@@ -337,11 +940,12 @@ class DuernastWorkflowManager:
             print("-" * len(category))
             
             for filename in files:
-                if Path(filename).exists():
-                    size = Path(filename).stat().st_size
+                path = context.work_path(filename)
+                if path.exists():
+                    size = path.stat().st_size
                     total_files += 1
                     total_size += size
-                    print(f"  [OK] {filename:<50} ({size:>10,} bytes)")
+                    print(f"  [OK] {context.display_path(path):<50} ({size:>10,} bytes)")
         
         # Performance summary
         print(f"\n\nWorkflow Performance:")
@@ -376,7 +980,7 @@ class DuernastWorkflowManager:
         # Execute workflow steps
         workflow_steps = [
             (self.check_prerequisites, "Prerequisites Check"),
-            (self.run_dssat_simulation, "DSSAT Simulation"),
+            (self.run_cached_simulation, "DSSAT Simulation"),
             (self.run_visualization, "Visualization Generation"),
             (self.generate_summary, "Workflow Summary")
         ]
@@ -402,12 +1006,13 @@ class DuernastWorkflowManager:
             print(f"Analyzed 15 nitrogen treatments")
             print(f"Generated comprehensive visualization")
             
+            run_dir = self.context.display_path(self.context.work_dir)
             print(f"\nOUTPUT FILES:")
-            print(f"  - output/duernast_2015_comprehensive_analysis.png")
-            print(f"  - output/duernast_2015_comprehensive_analysis.pdf")
-            print(f"  - output/Summary.OUT (main results)")
-            print(f"  - output/PlantGro.OUT (growth time series)")
-            print(f"  - output/PlantN.OUT (nitrogen dynamics)")
+            print(f"  - {run_dir}/duernast_2015_comprehensive_analysis.png")
+            print(f"  - {run_dir}/duernast_2015_comprehensive_analysis.pdf")
+            print(f"  - {run_dir}/Summary.OUT (main results)")
+            print(f"  - {run_dir}/PlantGro.OUT (growth time series)")
+            print(f"  - {run_dir}/PlantN.OUT (nitrogen dynamics)")
             
             return True
         
@@ -416,8 +1021,37 @@ class DuernastWorkflowManager:
 def main():
     """Main entry point"""
     
+    import argparse
+    parser = argparse.ArgumentParser(description="Duernast 2015 N-Wheat analysis workflow")
+    parser.add_argument('--sharded', action='store_true',
+                        help="Split the experiment by treatment and run shards in parallel")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Number of parallel DSSAT runs in sharded mode (default: CPU count)")
+    parser.add_argument('--treatments-per-shard', type=int, default=1,
+                        help="Treatments simulated by each shard in sharded mode (default: 1)")
+    parser.add_argument('--live', action='store_true',
+                        help="Parse PlantGro.OUT and Summary.OUT run by run while DSSAT is running")
+    parser.add_argument('--isolated', action='store_true',
+                        help="Run in a fresh scratch directory under output/runs/ instead of output/")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Always run DSSAT, ignoring the simulation output cache")
+    parser.add_argument('--cache-dir', default='.simulation_cache',
+                        help="Simulation output cache directory (default: .simulation_cache)")
+    parser.add_argument('--cache-size-mb', type=int, default=DEFAULT_CACHE_BYTES // (1024 * 1024),
+                        help="Maximum cache size before least recently used entries are evicted")
+    args = parser.parse_args()
+    if args.live and args.sharded:
+        parser.error("--live cannot be combined with --sharded")
+    
+    base_dir = Path.cwd()
+    context = RunContext.scratch(base_dir) if args.isolated else RunContext(base_dir)
+    cache = None if args.no_cache else SimulationCache(base_dir / args.cache_dir,
+                                                       max_bytes=args.cache_size_mb * 1024 * 1024)
+    
     # Create workflow manager
-    workflow = DuernastWorkflowManager()
+    workflow = DuernastWorkflowManager(sharded=args.sharded, max_workers=args.workers,
+                                       treatments_per_shard=args.treatments_per_shard,
+                                       context=context, cache=cache, live=args.live)
     
     # Run complete workflow
     success = workflow.run_complete_workflow()
@@ -13,9 +13,69 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from pathlib import Path
 import sys
-import re
 from collections import Counter
 
+from dssat_output_reader import ExtractionPlan, read_output_file
+from dssat_output_cache import OutputTableCache
+from dssat_experiment import load_treatment_registry
+
+# Parsed .OUT tables are cached column by column next to the outputs, so
+# re-rendering the same run skips the text parse
+PARSE_CACHE = OutputTableCache('.parsed_cache')
+
+# Experiment file in the run directory; treatment names, fertilizer types and the
+# control/flagged treatments are read from its *TREATMENTS and *FERTILIZERS sections
+EXPERIMENT_FILE = 'TUDU1501.WHX'
+
+# Columns pulled from each DSSAT output, resolved by header name once per section.
+# Tuples list alternative names (N-Wheat writes grain weight as GWAD, CERES as HWAD).
+SUMMARY_PLAN = ExtractionPlan({
+    'TRNO': 'TRNO', 'MODEL': 'MODEL',
+    'SDAT': 'SDAT',  # Sowing date
+    'PDAT': 'PDAT',  # Planting date
+    'EDAT': 'EDAT',  # Emergence date
+    'ADAT': 'ADAT',  # Anthesis date
+    'MDAT': 'MDAT',  # Maturity date
+    'HDAT': 'HDAT',  # Harvest date
+    'NICM': 'NICM',  # Nitrogen applied
+})
+
+PLANTGRO_PLAN = ExtractionPlan({
+    'DAS': 'DAS',
+    'WSPD': 'WSPD',  # Water stress photosynthesis (0-1)
+    'WSGD': 'WSGD',  # Water stress grain filling (0-1)
+    'SLFT': 'SLFT',  # Soil water factor for leaves (0-1)
+    'NSTD': 'NSTD',  # N stress cumulative
+    'CWAD': 'CWAD',  # Total biomass
+    'HWAD': ('HWAD', 'GWAD'),  # Grain weight
+    'HIAD': 'HIAD',  # Harvest index
+    'H#AD': ('H#AD', 'G#AD'),  # Grain number
+    'GWGD': 'GWGD',  # Grain weight per grain
+    'RDPD': 'RDPD',  # Root depth
+})
+
+PLANTN_PLAN = ExtractionPlan({
+    'DAS': 'DAS',
+    'CNAD': 'CNAD',  # Crop N (total: leaves+stems+grains)
+    'GNAD': 'GNAD',  # Grain N (only grains)
+})
+
+WEATHER_PLAN = ExtractionPlan({
+    'DAS': 'DAS',
+    'PRED': 'PRED',  # Precipitation
+    'SRAD': 'SRAD',  # Solar radiation
+    'TMAX': 'TMXD',  # Max temp
+    'TMIN': 'TMND',  # Min temp
+})
+
+TEMPERATURE_PLAN = ExtractionPlan({
+    'DAS': 'DAS',
+    'TMEAN': 'TAVD',  # Average daily temperature
+})
+
+# Memoized Weather.OUT tables, keyed on (path, size, mtime)
+_WEATHER_OUTPUT = {}
+
 # Set style for publication-quality visualization
 plt.style.use('seaborn-v0_8-whitegrid')
 sns.set_palette("husl")
@@ -31,19 +91,18 @@ def parse_summary_phenology():
         return None, None
     
     try:
-        with open('Summary.OUT', 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.readlines()
+        runs = read_output_file('Summary.OUT', SUMMARY_PLAN, cache=PARSE_CACHE)
         
-        if not lines:
+        if not runs or runs[0].data is None:
             print("[ERROR] Summary.OUT is empty!")
             return None, None
         
+        summary = runs[0].data
+        
         # Detect model type from Summary.OUT
         model_type = 'UNKNOWN'
-        for line in lines[:10]:
-            if 'WHAPS' in line:
-                model_type = 'NWHEAT'
-                break
+        if 'MODEL' in summary.columns and summary['MODEL'].astype(str).str.contains('WHAPS').any():
+            model_type = 'NWHEAT'
         
         print(f"[INFO] Summary.OUT model type: {model_type}")
         
@@ -51,60 +110,37 @@ def parse_summary_phenology():
             print("[ERROR] Only N-Wheat (WHAPS) model is supported!")
             return None, None
         
-        # Find data section - look for lines starting with numbers
-        data_start = -1
-        for i, line in enumerate(lines):
-            # Skip header lines and look for data lines
-            if line.strip() and line.strip()[0].isdigit() and not line.startswith('!'):
-                data_start = i
-                break
-        
-        if data_start == -1:
-            print("[ERROR] Could not find data section in Summary.OUT")
+        missing = [c for c in runs[0].missing if c != 'MODEL']
+        if missing:
+            print(f"[ERROR] Could not find columns {missing} in Summary.OUT")
             return None, None
         
+        dates = summary[['TRNO', 'SDAT', 'PDAT', 'EDAT', 'ADAT', 'MDAT', 'HDAT', 'NICM']]
+        dates = dates.apply(pd.to_numeric, errors='coerce').dropna().astype(int)
+        
+        # Convert to days after planting (wrapping over the new year)
+        pdat_doy = dates['PDAT'] % 1000
+        
+        def date_to_das(date):
+            date_doy = date % 1000
+            das = np.where(date_doy >= pdat_doy, date_doy - pdat_doy, date_doy + 365 - pdat_doy)
+            return np.where((date == -99) | (dates['PDAT'] == -99), -99, das)
+        
+        stage_das = {
+            'emergence_das': date_to_das(dates['EDAT']),
+            'anthesis_das': date_to_das(dates['ADAT']),
+            'maturity_das': date_to_das(dates['MDAT']),
+            'harvest_das': date_to_das(dates['HDAT']),
+        }
+        
         # Parse each treatment
-        for i in range(data_start, min(data_start + 20, len(lines))):
-            line = lines[i].strip()
-            if not line or line.startswith('*'):
-                continue
+        for i, treatment in enumerate(dates['TRNO'].tolist()):
+            stages[treatment] = {name: int(values[i]) for name, values in stage_das.items()}
+            stages[treatment]['sowing_date'] = int(dates['SDAT'].iloc[i])
+            stages[treatment]['planting_date'] = int(dates['PDAT'].iloc[i])
             
-            parts = line.split()
-            if len(parts) >= 51:  # Need at least 51 columns to get NICM
-                try:
-                    treatment = int(parts[1])
-                    sdat = int(parts[16])  # Sowing date (SDAT)
-                    pdat = int(parts[17])  # Planting date (PDAT)
-                    edat = int(parts[18])  # Emergence date (EDAT)
-                    adat = int(parts[19])  # Anthesis date (ADAT)
-                    mdat = int(parts[20])  # Maturity date (MDAT)
-                    hdat = int(parts[21])  # Harvest date (HDAT)
-                    nicm = int(parts[50])   # Nitrogen applied (NICM)
-                    
-                    # Convert to days after sowing
-                    def date_to_das(date, sdate):
-                        if date == -99 or sdate == -99:
-                            return -99
-                        date_doy = date % 1000
-                        sdate_doy = sdate % 1000
-                        return date_doy - sdate_doy if date_doy >= sdate_doy else date_doy + 365 - sdate_doy
-                    
-                    stages[treatment] = {
-                        'emergence_das': date_to_das(edat, pdat),
-                        'anthesis_das': date_to_das(adat, pdat),
-                        'maturity_das': date_to_das(mdat, pdat),
-                        'harvest_das': date_to_das(hdat, pdat),
-                        'sowing_date': sdat,
-                        'planting_date': pdat
-                    }
-                    
-                    # Store nitrogen level for this treatment
-                    n_levels[treatment] = nicm
-                    
-                except (ValueError, IndexError) as e:
-                    if len(stages) == 0:  # Only warn for first parse attempts
-                        print(f"[WARNING] Skipped line {i}: {str(e)[:50]}")
-                    continue
+            # Store nitrogen level for this treatment
+            n_levels[treatment] = int(dates['NICM'].iloc[i])
         
         if not stages or not n_levels:
             print("[ERROR] No phenology data parsed from Summary.OUT")
@@ -168,59 +204,71 @@ def detect_model_type():
         print(f"[WARNING] Could not detect model type: {e}")
         return 'UNKNOWN'
 
+def load_weather_output(path='Weather.OUT'):
+    """Load every column of Weather.OUT once, as one DataFrame with a RUN column
+    
+    The result is memoized on the file's size and modification time, so the
+    temperature lookup and the weather panels share a single parse.
+    
+    Returns:
+        DataFrame (RUN plus one column per Weather.OUT header label), or None if
+        the file is missing or has no data
+    """
+    
+    path = Path(path)
+    if not path.exists():
+        return None
+    
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    if key not in _WEATHER_OUTPUT:
+        runs = read_output_file(path, numeric=True, cache=PARSE_CACHE)
+        tables = [run.data.assign(RUN=run.run_number) for run in runs if run.data is not None]
+        _WEATHER_OUTPUT.clear()
+        _WEATHER_OUTPUT[key] = pd.concat(tables, ignore_index=True) if tables else None
+    return _WEATHER_OUTPUT[key]
+
+def first_weather_run(weather):
+    """Rows of the first run (weather is identical for every treatment)"""
+    return weather[weather['RUN'] == weather['RUN'].iloc[0]]
+
 def parse_temperature_data():
-    """Parse Weather.OUT for temperature data (returns dictionary)"""
+    """Daily mean temperature from Weather.OUT (DataFrame with DAS and TMEAN)"""
+    
+    empty = pd.DataFrame({'DAS': pd.Series(dtype=int), 'TMEAN': pd.Series(dtype=float)})
     
     if not Path('Weather.OUT').exists():
         print("[WARNING] Weather.OUT not found, temperature data unavailable")
-        return {}
+        return empty
     
     try:
-        weather_by_das = {}
-        with open('Weather.OUT', 'r', encoding='utf-8', errors='ignore') as f:
-            lines = f.readlines()
+        weather = load_weather_output('Weather.OUT')
         
-        if not lines:
+        if weather is None or weather.empty:
             print("[WARNING] Weather.OUT is empty")
-            return {}
-        
-        data_start = -1
-        for i, line in enumerate(lines):
-            if line.strip().startswith('@YEAR DOY'):
-                data_start = i + 1
-                break
+            return empty
         
-        if data_start == -1:
+        temperature, missing = TEMPERATURE_PLAN.apply(first_weather_run(weather))
+        if missing:
             print("[WARNING] Could not find data section in Weather.OUT")
-            return {}
+            return empty
         
-        for i in range(data_start, len(lines)):
-            line = lines[i].strip()
-            if not line or line.startswith(('*', '@', '!')):
-                continue
-            
-            parts = line.split()
-            if len(parts) >= 12:
-                try:
-                    das = int(parts[2])
-                    tavd = float(parts[11])  # TAVD = average daily temperature
-                    if -50 <= tavd <= 60:  # Sanity check for temperature
-                        weather_by_das[das] = tavd
-                except (ValueError, IndexError):
-                    continue
-        
-        if weather_by_das:
-            print(f"[INFO] Loaded temperature data for {len(weather_by_das)} days")
+        # Sanity check for temperature; the last value wins for repeated days
+        temperature = temperature[temperature['TMEAN'].between(-50, 60)]
+        temperature = temperature.drop_duplicates('DAS', keep='last').astype({'DAS': int})
+        
+        if not temperature.empty:
+            print(f"[INFO] Loaded temperature data for {len(temperature)} days")
         else:
             print("[WARNING] No temperature data parsed from Weather.OUT")
         
-        return weather_by_das
+        return temperature.reset_index(drop=True)
     except Exception as e:
         print(f"[WARNING] Error parsing Weather.OUT: {e}")
-        return {}
+        return empty
 
 def parse_plantgro_data(n_levels=None):
-    """Parse PlantGro.OUT for all 15 treatments (N-Wheat model)
+    """Parse PlantGro.OUT for all treatments (N-Wheat model)
     
     Args:
         n_levels: Dictionary mapping treatment number to N applied (kg/ha)
@@ -239,154 +287,90 @@ def parse_plantgro_data(n_levels=None):
         return None
     
     # Load temperature data (shared across all treatments)
-    weather_data = parse_temperature_data()
+    temperature = parse_temperature_data()
     
     try:
-        with open('PlantGro.OUT', 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
+        runs = read_output_file('PlantGro.OUT', PLANTGRO_PLAN, numeric=True, cache=PARSE_CACHE)
         
-        if not content:
+        if not runs:
             print("[ERROR] PlantGro.OUT is empty!")
             return None
         
-        # Split by RUN sections
-        run_sections = re.split(r'\*RUN\s+\d+', content)
-        
         treatments_data = {}
         
         # Generate treatment names using actual N levels from data
-        fertilizer_types = {
-            1: "Harnstoff", 2: "Harnstoff", 3: "Mixed",
-            4: "AmmonSulf", 5: "Kalkamm", 6: "Kalkamm",
-            7: "Kalkamm", 8: "Kalkamm", 9: "UAN",
-            10: "Mixed", 11: "Kalkstick", 12: "Mixed",
-            13: "UAN", 14: "UAN", 15: "Control"
-        }
+        treatment_names = generate_treatment_names(n_levels)
         
-        treatment_names = {}
-        for trt in range(1, 16):
-            fert_type = fertilizer_types.get(trt, f"Trt{trt}")
-            if n_levels and trt in n_levels:
-                n_kg = n_levels[trt]
-                if trt == 15:
-                    treatment_names[trt] = f"Trt{trt}:Control-{n_kg}N"
-                elif trt in [3, 10]:  # Problem treatments - mark with asterisk
-                    treatment_names[trt] = f"Trt{trt}:{fert_type}-{n_kg}N*"
-                else:
-                    treatment_names[trt] = f"Trt{trt}:{fert_type}-{n_kg}N"
-            else:
-                # Fallback if N levels not provided
-                treatment_names[trt] = f"Trt{trt}:{fert_type}"
-        
-        for run_num in range(1, min(16, len(run_sections))):
-            section = run_sections[run_num]
+        for run_num, run in enumerate(runs[:len(treatment_names)], start=1):
             treatment_name = treatment_names.get(run_num, f"Treatment{run_num}")
             
-            lines = section.split('\n')
-            data_start = -1
-            
-            for i, line in enumerate(lines):
-                if line.strip().startswith('@YEAR DOY'):
-                    data_start = i + 1
-                    break
-            
-            if data_start == -1:
+            if run.data is None:
+                continue
+            if run.missing:
+                print(f"[WARNING] PlantGro.OUT run {run.run_number} lacks columns {run.missing}")
                 continue
             
-            data_rows = []
-            for i in range(data_start, len(lines)):
-                line = lines[i].strip()
+            raw = run.data.dropna()
+            if raw.empty:
+                print(f"[WARNING] Empty dataframe for {treatment_name}")
+                continue
                 
-                if not line or line.startswith('*RUN') or line.startswith('$'):
-                    break
+            das = raw['DAS'].to_numpy(dtype=int)
+            # Get temperature from Weather.OUT (15 C where a day is missing)
+            tmean = pd.DataFrame({'DAS': das}).merge(temperature, on='DAS', how='left')
+            tmean = tmean['TMEAN'].fillna(15.0).to_numpy(dtype=float)
                 
-                if line.startswith('@') or line.startswith('*'):
-                    continue
+            # N-Wheat water stress variables (with bounds checking)
+            wspd = raw['WSPD'].clip(0.0, 1.0).to_numpy()  # Water stress photosynthesis (0-1)
+            wsgd = raw['WSGD'].clip(0.0, 1.0).to_numpy()  # Water stress grain filling (0-1)
+            slft = raw['SLFT'].clip(0.0, 1.0).to_numpy()  # Soil water factor for leaves (0-1)
+            nstd = raw['NSTD'].clip(lower=0.0).to_numpy()  # N stress cumulative (non-negative)
                 
-                parts = line.split()
+            # N-Wheat doesn't have daily N stress factor, so derive from cumulative
+            # When NSTD is low (no stress), factor is high (optimal)
+            # NSTD typically ranges 0-100+
+            nftd = np.where(nstd == 0, 1.0, np.clip(1.0 - nstd / 100.0, 0.0, 1.0))
                 
-                try:
-                    # N-Wheat column positions (WHAPS048 model)
-                    if len(parts) >= 35:
-                        das = int(parts[2])
-                        # Get temperature from Weather.OUT
-                        tmean = float(weather_data.get(das, 15.0)) if len(weather_data) > 0 else 15.0
+            # Water stress factor: use minimum of photosynthesis and leaf factors
+            wftd = np.where((wspd > 0) | (slft > 0), np.minimum(wspd, slft), 1.0)
                         
-                        # N-Wheat water stress variables (with bounds checking)
-                        wspd = max(0.0, min(1.0, float(parts[18])))  # Water stress photosynthesis (0-1)
-                        wsgd = max(0.0, min(1.0, float(parts[19])))  # Water stress grain filling (0-1)
-                        slft = max(0.0, min(1.0, float(parts[20])))  # Soil water factor for leaves (0-1)
-                        nstd = max(0.0, float(parts[21]))  # N stress cumulative (non-negative)
+            # Extract values with bounds checking
+            df = pd.DataFrame({
+                'DAS': das,
+                'TMEAN': tmean,
+                'CWAD': raw['CWAD'].clip(lower=0.0).to_numpy(),  # Total biomass (non-negative)
+                'HWAD': raw['HWAD'].clip(lower=0.0).to_numpy(),  # Grain weight (non-negative)
+                'HIAD': raw['HIAD'].clip(0.0, 1.0).to_numpy(),  # Harvest index (0-1)
+                'H#AD': raw['H#AD'].clip(lower=0.0).to_numpy(),  # Grain number (non-negative)
+                'GWGD': raw['GWGD'].clip(lower=0.0).to_numpy(),  # Grain weight per grain (non-negative)
+                'RDPD': raw['RDPD'].clip(lower=0.0).to_numpy(),  # Root depth (non-negative)
+                'WFTD': wftd,
+                'WFPD': wspd,
+                'WFGD': wsgd,
+                'NFTD': nftd,
+                'NSTD': nstd,
+            })
                         
-                        # N-Wheat doesn't have daily N stress factor, so derive from cumulative
-                        # When NSTD is low (no stress), factor is high (optimal)
-                        # NSTD typically ranges 0-100+
-                        if nstd == 0:
-                            nftd = 1.0
-                        else:
-                            nftd = max(0.0, min(1.0, 1.0 - (nstd / 100.0)))
+            # Calculate derived variables with safe operations
+            # Use GWGD directly (grain weight per grain in mg)
+            df['grain_size_mg'] = df['GWGD'].clip(lower=0)  # Use direct value, ensure non-negative
                         
-                        # Water stress factor: use minimum of photosynthesis and leaf factors
-                        if wspd > 0 or slft > 0:
-                            wftd = min(wspd, slft)
-                        else:
-                            wftd = 1.0
+            # Stress calculations (all already bounded 0-1)
+            # Water stress: WFTD is 1=no stress, 0=max stress
+            df['daily_water_stress'] = df['WFTD']  # 1=optimal, 0=stressed
+            # Cumulative water stress: sum of daily stress amounts (invert factor to get stress)
+            df['cumulative_water_stress'] = (1.0 - df['WFTD']).cumsum()  # Sum of stress days
                         
-                        # Extract values with bounds checking
-                        cwad = max(0.0, float(parts[12]))  # Total biomass (non-negative)
-                        hwad = max(0.0, float(parts[9]))   # Grain weight (non-negative)
-                        hiad = max(0.0, min(1.0, float(parts[16])))  # Harvest index (0-1)
-                        h_ad = max(0.0, float(parts[13]))  # Grain number (non-negative)
-                        gwgd = max(0.0, float(parts[15]))  # Grain weight per grain (non-negative)
-                        rdpd = max(0.0, float(parts[34]))  # Root depth (non-negative)
+            # Nitrogen stress: NFTD is 1=no stress, 0=max stress
+            df['daily_nitrogen_stress'] = df['NFTD']  # Keep as is: 1=optimal, 0=stressed
+            # Invert to show stress level (makes small variations visible)
+            # N-Wheat shows very little N stress (NFTD ~0.99), so invert to magnify differences
+            df['nitrogen_stress_level'] = 1.0 - df['NFTD']  # 0=optimal, 1=stressed
                         
-                        data_rows.append({
-                            'DAS': das,
-                            'TMEAN': tmean,
-                            'CWAD': cwad,
-                            'HWAD': hwad,
-                            'HIAD': hiad,
-                            'H#AD': h_ad,
-                            'GWGD': gwgd,
-                            'RDPD': rdpd,
-                            'WFTD': wftd,
-                            'WFPD': wspd,
-                            'WFGD': wsgd,
-                            'NFTD': nftd,
-                            'NSTD': nstd,
-                        })
-                except (ValueError, IndexError) as e:
-                    if run_num == 1 and len(data_rows) < 5:  # Debug first treatment only
-                        print(f"[DEBUG] Skipped line (treatment {run_num}): {str(e)[:100]}")
-                    continue
+            # Calculate TRUE cumulative nitrogen stress
+            df['cumulative_nitrogen_stress'] = df['nitrogen_stress_level'].cumsum()
             
-            if data_rows:
-                df = pd.DataFrame(data_rows)
-                
-                if df.empty:
-                    print(f"[WARNING] Empty dataframe for {treatment_name}")
-                    continue
-                
-                # Calculate derived variables with safe operations
-                # Use GWGD directly (grain weight per grain in mg) from column 15
-                df['grain_size_mg'] = df['GWGD'].clip(lower=0)  # Use direct value, ensure non-negative
-                
-                # Stress calculations (all already bounded 0-1)
-                # Water stress: WFTD is 1=no stress, 0=max stress
-                df['daily_water_stress'] = df['WFTD']  # 1=optimal, 0=stressed
-                # Cumulative water stress: sum of daily stress amounts (invert factor to get stress)
-                df['cumulative_water_stress'] = (1.0 - df['WFTD']).cumsum()  # Sum of stress days
-                
-                # Nitrogen stress: NFTD is 1=no stress, 0=max stress
-                df['daily_nitrogen_stress'] = df['NFTD']  # Keep as is: 1=optimal, 0=stressed
-                # Invert to show stress level (makes small variations visible)
-                # N-Wheat shows very little N stress (NFTD ~0.99), so invert to magnify differences
-                df['nitrogen_stress_level'] = 1.0 - df['NFTD']  # 0=optimal, 1=stressed
-                
-                # Calculate TRUE cumulative nitrogen stress
-                df['cumulative_nitrogen_stress'] = df['nitrogen_stress_level'].cumsum()
-                
-                treatments_data[treatment_name] = df
+            treatments_data[treatment_name] = df
         
         if not treatments_data:
             print("[ERROR] No treatment data was parsed successfully!")
@@ -413,71 +397,27 @@ def parse_nitrogen_data(n_levels=None):
         return None
     
     try:
-        with open('PlantN.OUT', 'r') as f:
-            content = f.read()
-        
-        run_sections = re.split(r'\*RUN\s+\d+', content)
+        runs = read_output_file('PlantN.OUT', PLANTN_PLAN, numeric=True, cache=PARSE_CACHE)
         
         nitrogen_data = {}
         
         # Generate treatment names using actual N levels from data
-        fertilizer_types = {
-            1: "Harnstoff", 2: "Harnstoff", 3: "Mixed",
-            4: "AmmonSulf", 5: "Kalkamm", 6: "Kalkamm",
-            7: "Kalkamm", 8: "Kalkamm", 9: "UAN",
-            10: "Mixed", 11: "Kalkstick", 12: "Mixed",
-            13: "UAN", 14: "UAN", 15: "Control"
-        }
-        
-        treatment_names = {}
-        for trt in range(1, 16):
-            fert_type = fertilizer_types.get(trt, f"Trt{trt}")
-            if n_levels and trt in n_levels:
-                n_kg = n_levels[trt]
-                if trt == 15:
-                    treatment_names[trt] = f"Trt{trt}:Control-{n_kg}N"
-                elif trt in [3, 10]:
-                    treatment_names[trt] = f"Trt{trt}:{fert_type}-{n_kg}N*"
-                else:
-                    treatment_names[trt] = f"Trt{trt}:{fert_type}-{n_kg}N"
-            else:
-                treatment_names[trt] = f"Trt{trt}:{fert_type}"
+        treatment_names = generate_treatment_names(n_levels)
         
-        for run_num in range(1, min(16, len(run_sections))):
-            section = run_sections[run_num]
+        for run_num, run in enumerate(runs[:len(treatment_names)], start=1):
             treatment_name = treatment_names.get(run_num, f"Treatment{run_num}")
             
-            lines = section.split('\n')
-            data_start = -1
-            
-            for i, line in enumerate(lines):
-                if line.strip().startswith('@YEAR DOY'):
-                    data_start = i + 1
-                    break
-            
-            if data_start == -1:
+            if run.data is None or run.missing:
                 continue
             
-            data_rows = []
-            for i in range(data_start, len(lines)):
-                line = lines[i].strip()
-                if not line or line.startswith('*') or line.startswith('@'):
-                    break
+            df = run.data.dropna()
+            df['DAS'] = df['DAS'].astype(int)
+            df['CNAD'] = df['CNAD'].astype(float)
+            df['GNAD'] = df['GNAD'].astype(float)
+            df['nitrogen_uptake'] = df['GNAD']  # Use GNAD for comparison with observed
                 
-                parts = line.split()
-                if len(parts) >= 6:  # Need at least columns 0-5 for GNAD
-                    try:
-                        data_rows.append({
-                            'DAS': int(parts[2]),
-                            'CNAD': float(parts[4]),  # Crop N (total: leaves+stems+grains)
-                            'GNAD': float(parts[5]),  # Grain N (only grains) - CORRECT INDEX!
-                            'nitrogen_uptake': float(parts[5]),  # Use GNAD for comparison with observed
-                        })
-                    except (ValueError, IndexError):
-                        continue
-            
-            if data_rows:
-                nitrogen_data[treatment_name] = pd.DataFrame(data_rows)
+            if not df.empty:
+                nitrogen_data[treatment_name] = df.reset_index(drop=True)
         
         return nitrogen_data
         
@@ -493,48 +433,20 @@ def parse_weather_data():
         return None
     
     try:
-        with open('Weather.OUT', 'r') as f:
-            content = f.read()
-        
-        # Split by RUN sections - just get first one (weather same for all)
-        run_sections = re.split(r'\*RUN\s+\d+', content)
-        
-        if len(run_sections) < 2:
+        weather = load_weather_output('Weather.OUT')
+        if weather is None or weather.empty:
             return None
         
-        section = run_sections[1]
-        lines = section.split('\n')
-        data_start = -1
-        
-        for i, line in enumerate(lines):
-            if line.strip().startswith('@YEAR DOY'):
-                data_start = i + 1
-                break
-        
-        if data_start == -1:
+        # Weather is the same for all runs, so the first one is enough
+        df, missing = WEATHER_PLAN.apply(first_weather_run(weather))
+        if missing:
             return None
         
-        data_rows = []
-        for i in range(data_start, len(lines)):
-            line = lines[i].strip()
-            if not line or line.startswith('*') or line.startswith('@'):
-                break
+        df = df.dropna()
+        df['DAS'] = df['DAS'].astype(int)
             
-            parts = line.split()
-            if len(parts) >= 12:
-                try:
-                    data_rows.append({
-                        'DAS': int(parts[2]),
-                        'PRED': float(parts[3]),  # Precipitation
-                        'SRAD': float(parts[6]),  # Solar radiation (SRAD column 6)
-                        'TMAX': float(parts[9]),  # Max temp (TMXD column 9)
-                        'TMIN': float(parts[10]),  # Min temp (TMND column 10)
-                    })
-                except (ValueError, IndexError):
-                    continue
-        
-        if data_rows:
-            return pd.DataFrame(data_rows)
+        if not df.empty:
+            return df.reset_index(drop=True)
         
     except Exception as e:
         print(f"[WARNING] Could not parse weather: {e}")
@@ -620,30 +532,13 @@ def parse_observed_data(n_levels=None):
             print("  [WARNING] No observed data file found (TUDU1501.WHT or .WHA)")
             return None
         
-        # Generate treatment names using actual N levels from data
-        fertilizer_types = {
-            1: "Harnstoff", 2: "Harnstoff", 3: "Mixed",
-            4: "AmmonSulf", 5: "Kalkamm", 6: "Kalkamm",
-            7: "Kalkamm", 8: "Kalkamm", 9: "UAN",
-            10: "Mixed", 11: "Kalkstick", 12: "Mixed",
-            13: "UAN", 14: "UAN", 15: "Control"
-        }
+        # Treatment names using actual N levels from data
+        registry = get_treatment_registry()
         
         # Calculate means and standard deviations
         observed_means = {}
         for treatment, data in observed_raw.items():
-            fert_type = fertilizer_types.get(treatment, f"Trt{treatment}")
-            
-            if n_levels and treatment in n_levels:
-                n_kg = n_levels[treatment]
-                if treatment == 15:
-                    trt_name = f"Trt{treatment}:Control-{n_kg}N"
-                elif treatment in [3, 10]:
-                    trt_name = f"Trt{treatment}:{fert_type}-{n_kg}N*"
-                else:
-                    trt_name = f"Trt{treatment}:{fert_type}-{n_kg}N"
-            else:
-                trt_name = f"Trt{treatment}:{fert_type}"
+            trt_name = registry.label(treatment, n_levels.get(treatment) if n_levels else None)
             
             observed_means[trt_name] = {
                 'yield': np.mean(data['yield']),
@@ -678,6 +573,10 @@ def parse_observed_data(n_levels=None):
         traceback.print_exc()
         return None
 
+def get_treatment_registry():
+    """Treatments of the experiment file in the working directory (parsed once)"""
+    return load_treatment_registry(EXPERIMENT_FILE)
+
 def generate_treatment_names(n_levels):
     """Generate treatment names using actual N levels from data
     
@@ -687,45 +586,30 @@ def generate_treatment_names(n_levels):
     Returns:
         Dictionary mapping treatment number to display name
     """
-    fertilizer_types = {
-        1: "Harnstoff", 2: "Harnstoff", 3: "Mixed",
-        4: "AmmonSulf", 5: "Kalkamm", 6: "Kalkamm",
-        7: "Kalkamm", 8: "Kalkamm", 9: "UAN",
-        10: "Mixed", 11: "Kalkstick", 12: "Mixed",
-        13: "UAN", 14: "UAN", 15: "Control"
-    }
-    
-    treatment_names = {}
-    for trt in range(1, 16):
-        fert_type = fertilizer_types.get(trt, f"Trt{trt}")
-        if n_levels and trt in n_levels:
-            n_kg = n_levels[trt]
-            if trt == 15:
-                treatment_names[trt] = f"Trt{trt}:Control-{n_kg}N"
-            elif trt in [3, 10]:
-                treatment_names[trt] = f"Trt{trt}:{fert_type}-{n_kg}N*"
-            else:
-                treatment_names[trt] = f"Trt{trt}:{fert_type}-{n_kg}N"
-        else:
-            treatment_names[trt] = f"Trt{trt}:{fert_type}"
     
-    return treatment_names
+    registry = get_treatment_registry()
+    n_levels = n_levels or {}
+    # Without the experiment file, fall back to the treatments Summary.OUT reported
+    numbers = registry.numbers or sorted(n_levels)
+    return {trt: registry.label(trt, n_levels.get(trt)) for trt in numbers}
 
 def get_treatment_styles(treatment_names_dict):
-    """Define visual styles for 15 treatments
+    """Define visual styles for all treatments
     
     Args:
         treatment_names_dict: Dictionary mapping treatment numbers to names
     """
     
-    # Use color palette and line styles to differentiate 15 treatments
-    colors = plt.cm.tab20(np.linspace(0, 1, 15))
+    # Use color palette and line styles to differentiate the treatments
+    colors = plt.cm.tab20(np.linspace(0, 1, len(treatment_names_dict)))
+    registry = get_treatment_registry()
     
     styles = {}
     
     for i, (trt_num, trt_name) in enumerate(treatment_names_dict.items()):
+        treatment = registry.get(trt_num)
         # Control treatment - distinct style (thicker to stand out)
-        if trt_num == 15:
+        if treatment is not None and treatment.control:
             styles[trt_name] = {
                 'color': 'black',
                 'linestyle': ':',
@@ -734,7 +618,7 @@ def get_treatment_styles(treatment_names_dict):
                 'marker': 'o'
             }
         # Problematic treatments - dashed (stand out)
-        elif trt_num in [3, 10]:
+        elif treatment is not None and treatment.flagged:
             styles[trt_name] = {
                 'color': colors[i],
                 'linestyle': '--',
@@ -773,6 +657,7 @@ def create_comprehensive_visualization(treatments_data, phenology_stages, consen
                                for k in treatments_data.keys() if 'Trt' in k}
     
     treatment_styles = get_treatment_styles(treatment_names_dict)
+    registry = get_treatment_registry()
     
     # Create figure with 16 vertical panels (weather, stress, growth, validation)
     fig, axes = plt.subplots(16, 1, figsize=(18, 48))
@@ -1025,9 +910,11 @@ def create_comprehensive_visualization(treatments_data, phenology_stages, consen
                         style = treatment_styles.get(trt_name, {})
                         
                         # For clarity, only show labels for control and a few key treatments
-                        # Show: Control (15), Problem treatments (3, 10), and representative high N (8, 9)
+                        # Show: Control, problem treatments, and representative high N (8, 9)
                         trt_num = int(trt_name.split('Trt')[1].split(':')[0])
-                        show_label = trt_num in [3, 8, 9, 10, 15]
+                        treatment = registry.get(trt_num)
+                        show_label = trt_num in [8, 9] or (treatment is not None and
+                                                           (treatment.control or treatment.flagged))
                         
                         ax.plot(df['DAS'], df[var],
                                color=style.get('color', 'black'),
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+DSSAT Experiment File Treatments
+
+Purpose: Treatment registry parsed from the *TREATMENTS and *FERTILIZERS sections
+         of a DSSAT experiment file (.WHX). Every treatment carries its factor
+         levels, its fertilizer applications, the fertilizer type derived from
+         them and whether it is the unfertilized control. The registry is built
+         once per file and shared by all parsers; lookups by treatment number
+         are dictionary lookups.
+"""
+
+import re
+from pathlib import Path
+
+# Short plot labels for the fertilizer names (FERNAME) used in the experiment
+FERTILIZER_LABELS = {
+    'Harnstoff': 'Harnstoff',
+    'Ammon-Sulfat-Salpeter': 'AmmonSulf',
+    'Kalkammonsalpeter': 'Kalkamm',
+    'Kalkstickstoff': 'Kalkstick',
+    'UAN-Loesung': 'UAN',
+}
+
+# Material codes without material-specific N release in DSSAT (FE900 = generic
+# fertilizer). Treatments applying them are flagged (*) in the figures.
+FLAGGED_MATERIALS = {'FE900'}
+
+SECTION_PATTERN = re.compile(r'^\*([A-Z ]+)')
+HEADER_LABEL = re.compile(r'\S+')
+
+# Sections parsed into tables; all others are kept verbatim
+TABLE_SECTIONS = ('TREATMENTS', 'FERTILIZERS')
+
+class Treatment:
+    """One treatment of the experiment file
+    
+    Attributes:
+        number: Treatment number (N)
+        name: TNAME as written in the file
+        levels: Factor code -> level, e.g. {'CU': 1, 'MF': 2, ...}
+        applications: Fertilizer rows of the treatment's MF level (dicts keyed by header)
+    """
+    
+    def __init__(self, number, name, levels, applications):
+        self.number = number
+        self.name = name
+        self.levels = levels
+        self.applications = applications
+    
+    @property
+    def fertilizer_level(self):
+        return self.levels.get('MF', 0)
+    
+    @property
+    def total_n(self):
+        """Fertilizer N applied over the season (kg/ha)"""
+        return sum(max(app['FAMN'], 0) for app in self.applications)
+    
+    @property
+    def control(self):
+        return self.total_n == 0
+    
+    @property
+    def flagged(self):
+        return any(app['FMCD'] in FLAGGED_MATERIALS for app in self.applications)
+    
+    @property
+    def fertilizer_type(self):
+        """Plot label of the fertilizer: one material, 'Mixed' or 'Control'"""
+        
+        if self.control:
+            return 'Control'
+        labels = {FERTILIZER_LABELS.get(app['FERNAME'], app['FERNAME'] or app['FMCD'])
+                  for app in self.applications}
+        return labels.pop() if len(labels) == 1 else 'Mixed'
+    
+    def label(self, n_kg=None):
+        """Display name, e.g. 'Trt1:Harnstoff-120N' ('*' marks flagged treatments)"""
+        
+        if n_kg is None:
+            return f"Trt{self.number}:{self.fertilizer_type}"
+        suffix = '*' if self.flagged else ''
+        return f"Trt{self.number}:{self.fertilizer_type}-{n_kg}N{suffix}"
+    
+    def __repr__(self):
+        return f"Treatment({self.number}, {self.fertilizer_type}, {self.total_n:g} kg N/ha)"
+
+def _to_number(value):
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return int(number) if number.is_integer() else number
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+class ExperimentTable:
+    """One @ table of an experiment file section, as row dicts keyed by header name
+    
+    The column layout is taken from the header line: numeric and code columns are
+    right-aligned to the end of their label, labels padded with dots (TNAME....)
+    and a trailing ...NAME column hold left-aligned text. The first column (the
+    treatment or level number) may use three digits, as DSSAT reads it as I3.
+    """
+    
+    def __init__(self, header, rows=None):
+        self.header = header
+        self.layout = []  # (column, label start, label end, text column)
+        labels = list(HEADER_LABEL.finditer(' ' + header[1:]))
+        for i, match in enumerate(labels):
+            label = match.group(0)
+            text = label.endswith('.') or (i == len(labels) - 1 and label.endswith('NAME'))
+            self.layout.append((label.strip('.'), match.start(), match.end(), text))
+        self.rows = rows if rows is not None else []
+    
+    @property
+    def columns(self):
+        return [column for column, _, _, _ in self.layout]
+    
+    def parse_line(self, line):
+        """Row dict of one data line (text, code and date columns stay strings)"""
+        
+        row = {}
+        previous = 0
+        for i, (column, start, end, text) in enumerate(self.layout):
+            if i == 0:
+                end = max(end, 3)
+            last = i == len(self.layout) - 1
+            value = (line[previous:] if last else line[previous:end]).strip()
+            previous = end
+            row[column] = value if text or column.endswith('DATE') else _to_number(value)
+        return row
+    
+    def format_row(self, row):
+        """Fixed-width data line of a row dict (missing columns are written as -99)"""
+        
+        line = ''
+        for i, (column, start, end, text) in enumerate(self.layout):
+            value = _format_value(row.get(column, -99))
+            if text:
+                if i < len(self.layout) - 1:
+                    value = value[:end - start].ljust(end - start)
+                line += ' ' * max(start - len(line), 1) + value
+            elif i == 0:
+                # I3 field: up to two digits keep the blank separator
+                if len(value) > 3:
+                    raise ValueError(f"{column}={value} does not fit the first column")
+                line = value.rjust(end) + ' ' if len(value) <= end else value
+            else:
+                # A value may fill its whole field (DSSAT reads fixed-width fields)
+                pad = end - len(line) - len(value)
+                if pad < 0:
+                    raise ValueError(f"{column}={value} does not fit its column")
+                line += ' ' * pad + value
+        return line.rstrip(' ') if self.layout and self.layout[-1][3] else line
+    
+    def render(self, newline='\n'):
+        return newline.join([self.header] + [self.format_row(row) for row in self.rows]) + newline
+    
+    def copy(self):
+        return ExperimentTable(self.header, [dict(row) for row in self.rows])
+
+class ExperimentFile:
+    """In-memory DSSAT experiment file (.WHX and other FILEX types)
+    
+    The editable sections (*TREATMENTS, *FERTILIZERS) are held as ExperimentTable
+    objects; everything else is kept as the original text. Rendering joins the
+    preserved text chunks with the re-formatted tables, so a file read and written
+    unchanged is byte-identical and scenario variants only pay for formatting the
+    rows that were edited.
+    """
+    
+    def __init__(self, chunks, tables, newline='\n'):
+        self.chunks = chunks    # str (verbatim text) or section name of a table
+        self.tables = tables    # section name -> ExperimentTable
+        self.newline = newline
+    
+    @classmethod
+    def read(cls, path):
+        with open(path, 'r', encoding='utf-8', errors='ignore', newline='') as f:
+            return cls.parse(f.read())
+    
+    @classmethod
+    def parse(cls, text):
+        newline = '\r\n' if '\r\n' in text else '\n'
+        chunks, tables = [], {}
+        verbatim = []
+        current = table = None
+        
+        for line in text.splitlines(keepends=True):
+            content = line.rstrip('\r\n')
+            match = SECTION_PATTERN.match(content)
+            if match:
+                name = match.group(1).strip()
+                current = next((n for n in TABLE_SECTIONS if name.startswith(n)), None)
+                table = None
+            elif current and current not in tables and content.startswith('@'):
+                # The table takes the header and the data lines that follow it
+                chunks.append(''.join(verbatim))
+                verbatim = []
+                table = tables[current] = ExperimentTable(content)
+                chunks.append(current)
+                continue
+            elif table is not None and content.strip() and not content.startswith(('!', '@')):
+                table.rows.append(table.parse_line(content))
+                continue
+            else:
+                table = None
+            verbatim.append(line)
+        
+        chunks.append(''.join(verbatim))
+        return cls(chunks, tables, newline)
+    
+    def render(self):
+        """Text of the experiment file"""
+        return ''.join(chunk if chunk not in self.tables else self.tables[chunk].render(self.newline)
+                       for chunk in self.chunks)
+    
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(self.render())
+    
+    def copy(self):
+        """Copy with its own tables (the verbatim text is shared)"""
+        return ExperimentFile(self.chunks, {name: table.copy() for name, table in self.tables.items()},
+                              self.newline)
+    
+    @property
+    def treatments(self):
+        """Rows of *TREATMENTS: N, R, O, C, TNAME and one level per factor"""
+        return self.tables['TREATMENTS'].rows
+    
+    @property
+    def fertilizers(self):
+        """Rows of *FERTILIZERS: F (level), FDATE, FMCD, FACD, FDEP, FAMN, ..., FERNAME"""
+        return self.tables['FERTILIZERS'].rows
+    
+    def fertilizer_levels(self):
+        """Fertilizer level -> its application rows"""
+        
+        levels = {}
+        for row in self.fertilizers:
+            levels.setdefault(row['F'], []).append(row)
+        return levels
+    
+    def treatment(self, number):
+        return next(row for row in self.treatments if row['N'] == number)
+    
+    def add_fertilizer_level(self, applications):
+        """Append a fertilizer level holding the given applications
+        
+        Returns:
+            Number of the new level
+        """
+        
+        level = max([row['F'] for row in self.fertilizers] + [0]) + 1
+        for application in applications:
+            self.fertilizers.append(dict(application, F=level))
+        return level
+    
+    def add_treatment(self, name, like=1, **levels):
+        """Append a treatment copying the factor levels of treatment `like`
+        
+        Args:
+            name: TNAME (at most 25 characters)
+            like: Treatment whose factor levels are the starting point
+            levels: Factor levels to change, e.g. MF=16
+        
+        Returns:
+            Number of the new treatment
+        """
+        
+        number = max([row['N'] for row in self.treatments] + [0]) + 1
+        row = dict(self.treatment(like), N=number, TNAME=name)
+        row.update(levels)
+        self.treatments.append(row)
+        return number
+    
+    def with_scenarios(self, scenarios, like=1):
+        """Experiment with one treatment per fertilizer scenario
+        
+        The existing treatments and fertilizer levels are replaced; all other
+        sections are unchanged.
+        
+        Args:
+            scenarios: Mapping of treatment name -> list of fertilizer applications
+                       (see fertilizer_application)
+            like: Treatment of this file whose other factor levels are kept
+        """
+        
+        template = self.treatment(like)
+        experiment = self.copy()
+        experiment.treatments.clear()
+        experiment.fertilizers.clear()
+        for name, applications in scenarios.items():
+            level = experiment.add_fertilizer_level(applications) if applications else 0
+            number = len(experiment.treatments) + 1
+            experiment.treatments.append(dict(template, N=number, TNAME=name, MF=level))
+        return experiment
+
+def fertilizer_application(date, amount, material='FE005', method='AP001', depth=5,
+                           name='-99', **columns):
+    """Row of the *FERTILIZERS table
+    
+    Args:
+        date: Application date as datetime.date or YYDDD string
+        amount: N applied (kg/ha, FAMN)
+        material: Fertilizer material code (FMCD)
+        method: Application method code (FACD)
+        depth: Application depth (cm, FDEP)
+        name: FERNAME
+        columns: Other columns, e.g. FAMC=13
+    """
+    
+    if hasattr(date, 'timetuple'):
+        date = f"{date.year % 100:02d}{date.timetuple().tm_yday:03d}"
+    row = {'FDATE': str(date), 'FMCD': material, 'FACD': method, 'FDEP': depth, 'FAMN': amount,
+           'FAMP': 0, 'FAMK': 0, 'FAMC': 0, 'FAMO': -99, 'FOCD': -99, 'FERNAME': name}
+    row.update(columns)
+    return row
+
+def write_scenarios(experiment, scenarios, out_dir, file_name, like=1):
+    """Write one single-treatment experiment file per scenario
+    
+    Each file goes to its own directory (out_dir/<scenario>/<file_name>) so every
+    scenario can be simulated in an isolated run directory with the original
+    experiment file name.
+    
+    Args:
+        experiment: ExperimentFile to vary
+        scenarios: Mapping of scenario name -> list of fertilizer applications
+        out_dir: Directory receiving one sub-directory per scenario
+        file_name: Experiment file name, e.g. 'TUDU1501.WHX'
+        like: Treatment whose other factor levels are kept
+    
+    Returns:
+        List of written paths
+    """
+    
+    out_dir = Path(out_dir)
+    paths = []
+    for name, applications in scenarios.items():
+        scenario_dir = out_dir / name
+        scenario_dir.mkdir(parents=True, exist_ok=True)
+        path = scenario_dir / file_name
+        experiment.with_scenarios({name[:25]: applications}, like).write(path)
+        paths.append(path)
+    return paths
+
+class TreatmentRegistry:
+    """Treatments of one experiment file, keyed by treatment number"""
+    
+    def __init__(self, treatments):
+        self.treatments = {treatment.number: treatment for treatment in treatments}
+    
+    @classmethod
+    def from_file(cls, path):
+        """Parse *TREATMENTS and *FERTILIZERS (an empty registry if path is missing)"""
+        
+        if not Path(path).exists():
+            return cls([])
+        return cls.from_experiment(ExperimentFile.read(path))
+    
+    @classmethod
+    def from_experiment(cls, experiment):
+        """Registry of an ExperimentFile (e.g. a generated scenario)"""
+        
+        if 'TREATMENTS' not in experiment.tables:
+            return cls([])
+        fertilizers = experiment.fertilizer_levels() if 'FERTILIZERS' in experiment.tables else {}
+        
+        treatments = []
+        for row in experiment.treatments:
+            levels = {column: row[column] for column in experiment.tables['TREATMENTS'].columns[5:]}
+            # Level 0 means no fertilizer, whatever rows the file lists under 0
+            level = levels.get('MF', 0)
+            applications = fertilizers.get(level, []) if level else []
+            treatments.append(Treatment(row['N'], str(row['TNAME']), levels, applications))
+        return cls(treatments)
+    
+    def __len__(self):
+        return len(self.treatments)
+    
+    def __iter__(self):
+        return iter(self.treatments.values())
+    
+    def __contains__(self, number):
+        return number in self.treatments
+    
+    def __getitem__(self, number):
+        return self.treatments[number]
+    
+    def get(self, number, default=None):
+        return self.treatments.get(number, default)
+    
+    @property
+    def numbers(self):
+        return list(self.treatments)
+    
+    def label(self, number, n_kg=None):
+        """Display name of a treatment ('TrtN:TrtN' for numbers not in the file)"""
+        
+        treatment = self.treatments.get(number)
+        if treatment is None:
+            return f"Trt{number}:Trt{number}" if n_kg is None else f"Trt{number}:Trt{number}-{n_kg}N"
+        return treatment.label(n_kg)
+    
+    def labels(self, n_levels=None):
+        """Treatment number -> display name, with N amounts from n_levels where known"""
+        
+        n_levels = n_levels or {}
+        return {number: self.label(number, n_levels.get(number)) for number in self.numbers}
+
+# Registries already parsed, keyed on (path, size, mtime)
+_REGISTRIES = {}
+
+def load_treatment_registry(path):
+    """Treatment registry of an experiment file, parsed once per file version"""
+    
+    path = Path(path)
+    try:
+        stat = path.stat()
+        key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        key = (str(path), None, None)
+    
+    if key not in _REGISTRIES:
+        _REGISTRIES[key] = TreatmentRegistry.from_file(path)
+    return _REGISTRIES[key]
@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+ICASA to DSSAT Input Converter
+
+Purpose: Regenerates the DSSAT inputs of every Duernast season from the ICASA
+         tables in input/orignal data/.../data/1_icasa (WEATHER_DAILY.csv,
+         TREATMENTS.csv, FERTILIZERS.csv, SOIL_PROFILE_LAYERS.csv, ...):
+         
+         TUDUyy01.WTH          - weather, one file per calendar year
+         TUDUyy01.WHX/MZX/BAX  - experiment file per season (crop from TREATMENTS)
+         TUDUyy01.WHT/WHA/...  - observed time series and harvest summary
+         TU.SOL                - the soil profile
+         
+         Every table is read once and split by experiment_year with groupby;
+         dates and values are formatted column by column, so all seasons are
+         refreshed from updated ICASA exports in about a second instead of
+         through a csmtools round trip. The layout follows the csmtools output
+         in 2_dssat.
+         
+         Usage:
+             python dssat_icasa.py [icasa_dir] [out_dir]
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dssat_weather import WeatherFile, render_wth
+
+ICASA_DIR = (Path(__file__).parent.parent / 'input' / 'orignal data'
+             / 'orignal data complete years duernast' / 'data' / '1_icasa')
+
+# Site codes: files are named TUDUyy01, the weather station is TUDU, the field TUDU0001
+INSTITUTE = 'TU'
+SITE = 'DU'
+SITE_NAME = 'DÜRNAST, Freising, Bayern, Deutschland'
+FIELD_NAME = 'DÜRNAST'
+
+MISSING = '-99'
+COMMENT = '! Generated from the ICASA tables by dssat_icasa.py.'
+
+# ICASA crop -> DSSAT crop code (also the first letters of the file extensions)
+CROP_CODES = {'WHT': 'WH', 'MAZ': 'MZ', 'BAR': 'BA'}
+
+# .WTH columns -> WEATHER_DAILY columns (None: not in the ICASA export, written as -99)
+WEATHER_COLUMNS = {
+    'SRAD': 'solar_radiation',
+    'TMAX': 'maximum_temperature',
+    'TMIN': 'minimum_temperature',
+    'RAIN': 'precipitation',
+    'DEWP': None,
+    'WIND': None,
+    'PAR': None,
+    'EVAP': None,
+    'RHUM': 'realtive_humidity_avg',
+}
+
+# Factor levels of *TREATMENTS -> TREATMENTS columns (None: level 0)
+FACTOR_COLUMNS = {
+    'CU': 'genotype_level', 'FL': 'field_level', 'SA': None,
+    'IC': 'initial_conditions_level', 'MP': 'planting_level', 'MI': 'irrigation_level',
+    'MF': 'fertilizer_level', 'MR': 'org_materials_applic_lev', 'MC': 'chemical_applic_level',
+    'MT': 'tillage_level', 'ME': None, 'MH': 'harvest_operations_level',
+}
+
+# Elements other than N, P, K and Ca that fit the FAMO/FOCD columns (first non-zero is written)
+OTHER_ELEMENTS = {
+    'S_in_applied_fertilizer': 'S', 'Mg_in_applied_fertilizer': 'MG',
+    'Zn_in_applied_fertilizer': 'ZN', 'Mn_in_applied_fertilizer': 'MN',
+    'Fe_in_applied_fertilizer': 'FE', 'B_in_applied_fertilizer': 'B',
+}
+
+# Observed data: T-file and A-file columns -> TIME_SERIES and SUMMARY columns
+TIME_SERIES_COLUMNS = {'HWAD': 'harvest_yield_at_day_dw', 'GWGD': 'grain_unit_dry_weight',
+                       'GNAD': 'grain_N'}
+SUMMARY_COLUMNS = {'HWAM': 'harvest_yld_matur_dry_wt'}
+
+# Soil layer columns: (DSSAT name, SOIL_PROFILE_LAYERS column, decimals; None = text)
+SOIL_LAYER_COLUMNS = [
+    ('SLB', 'soil_layer_base_depth', 0), ('SLMH', 'master_horizon', None),
+    ('SLLL', 'soil_water_lower_limit', 3), ('SDUL', 'soil_wat_drned_upper_lim', 3),
+    ('SSAT', 'soil_water_saturated', 3), ('SRGF', 'root_growth_factor_soil', 3),
+    ('SSKS', 'sat_hydraul_conductivity', 3), ('SBDM', 'soil_bulk_density_moist', 2),
+    ('SLOC', 'soil_organic_C_perc_layr', 3), ('SLCL', 'soil_clay_fraction', 1),
+    ('SLSI', 'soil_silt_fraction', 1), ('SLCF', 'soil_coarse_fraction', 1),
+    ('SLNI', 'soil_organic_N_conc', 2), ('SLHW', 'soil_pH_in_water', 2),
+    ('SLHB', 'soil_pH_in_buffer', 2), ('SCEC', 'cation_exchange_capacity', 2),
+    ('SADC', 'soil_adsorption_coef', 1),
+]
+
+# csmtools defaults of the *SIMULATION CONTROLS section
+SIMULATION_CONTROLS = """*SIMULATION CONTROLS
+@N GENERAL     NYERS NREPS START SDATE RSEED SNAME                     SMODEL
+ 1 GE              1     1     S   -99  1234 -99                       -99
+@N OPTIONS     WATER NITRO SYMBI PHOSP POTAS DISES  CHEM  TILL   CO2
+ 1 OP              N     N     N     N     N     N     N     N     M
+@N METHODS     WTHER INCON LIGHT EVAPO INFIL PHOTO HYDRO NSWIT MESOM MESEV MESOL
+ 1 ME              M     M     E     R     S     L     R     1     G     R     2
+@N MANAGEMENT  PLANT IRRIG FERTI RESID HARVS
+ 1 MA              R     N     N     N     M
+@N OUTPUTS     FNAME OVVEW SUMRY FROPT GROUT CAOUT WAOUT NIOUT MIOUT DIOUT VBOSE CHOUT OPOUT FMOPT
+ 1 OU              N     Y     Y     1     N     N     N     N     N     N     N     N     N     A
+@N PLANTING    PFRST PLAST PH2OL PH2OU PH2OD PSTMX PSTMN
+ 1 PL            -99   -99   -99   -99   -99   -99   -99
+@N IRRIGATION  IMDEP ITHRL ITHRU IROFF IMETH IRAMT IREFF
+ 1 IR            -99   -99   -99   -99   -99   -99   -99
+@N NITROGEN    NMDEP NMTHR NAMNT NCODE NAOFF
+ 1 NI            -99   -99   -99   -99   -99
+@N RESIDUES    RIPCN RTIME RIDEP
+ 1 RE            -99   -99   -99
+@N HARVEST     HFRST HLAST HPCNP HPCNR
+ 1 HA            -99   -99   -99   -99
+@N SIMDATES    ENDAT    SDUR   FODAT  FSTRYR  FENDYR FWFILE           FONAME
+ 1 SI            -99     -99     -99     -99     -99 -99              -99
+"""
+
+def load_icasa_tables(icasa_dir=ICASA_DIR):
+    """All ICASA tables of a folder (file stem -> DataFrame)"""
+    return {path.stem: pd.read_csv(path, encoding='utf-8')
+            for path in sorted(Path(icasa_dir).glob('*.csv'))}
+
+def _yyddd(dates):
+    """YYDDD strings of a Series of ISO dates (NaN -> -99)"""
+    
+    dates = pd.to_datetime(dates, errors='coerce')
+    return dates.dt.strftime('%y%j').fillna(MISSING)
+
+def _format_columns(frame, columns):
+    """Fixed-width lines of a DataFrame, formatted column by column
+    
+    Args:
+        frame: DataFrame with the values
+        columns: List of (column, width, decimals). decimals None right-aligns
+                 text, '<' writes left-aligned text after a blank. Missing
+                 columns and NaN are written as -99.
+    
+    Returns:
+        List of lines (trailing blanks removed)
+    """
+    
+    lines = np.full(len(frame), '', dtype=object)
+    for column, width, decimals in columns:
+        values = frame[column] if column in frame else pd.Series(np.nan, index=frame.index)
+        if decimals is None or decimals == '<':
+            text = values.where(values.notna(), MISSING).astype(str)
+            text = text.str.rjust(width) if decimals is None else ' ' + text.str.ljust(width - 1)
+            text = text.to_numpy(dtype=object)
+        else:
+            numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=float)
+            text = np.char.mod(f"%{width}.{decimals}f", np.nan_to_num(numbers)).astype(object)
+            text[np.isnan(numbers)] = MISSING.rjust(width)
+        lines = lines + text
+    return [line.rstrip() for line in lines]
+
+def _table(header, frame, columns):
+    return '\n'.join([header] + _format_columns(frame, columns)) + '\n'
+
+def _file_code(year):
+    return f"{INSTITUTE}{SITE}{year % 100:02d}01"
+
+def weather_files(tables):
+    """One WeatherFile per calendar year of WEATHER_DAILY
+    
+    Returns:
+        Dict of file name (TUDUyy01.WTH) -> WeatherFile
+    """
+    
+    daily = tables['WEATHER_DAILY'].copy()
+    dates = pd.to_datetime(daily['weather_date'])
+    field = tables['FIELDS'].iloc[0]
+    sensor = tables.get('WEATHER_METADATA')
+    refht = float(sensor['temperature_sensor_ht'].iloc[0]) if sensor is not None else np.nan
+    
+    # TAV: annual mean temperature; AMP: half the range of the monthly means
+    daily['TMEAN'] = (daily['maximum_temperature'] + daily['minimum_temperature']) / 2
+    daily['YEAR'], daily['MONTH'] = dates.dt.year, dates.dt.month
+    tav = daily.groupby('YEAR')['TMEAN'].mean()
+    monthly = daily.groupby(['YEAR', 'MONTH'])['TMEAN'].mean().groupby(level=0)
+    amp = (monthly.max() - monthly.min()) / 2
+    
+    days = ((dates - pd.Timestamp('1970-01-01')).dt.days).to_numpy(dtype=np.int64)
+    files = {}
+    for year, rows in daily.groupby('YEAR').indices.items():
+        name = f"{_file_code(year)}.WTH"
+        weather = WeatherFile(name)
+        weather.columns = list(WEATHER_COLUMNS)
+        weather.days = days[rows]
+        weather.values = {column: (daily[source].to_numpy(dtype=float)[rows] if source
+                                   else np.full(len(rows), np.nan))
+                          for column, source in WEATHER_COLUMNS.items()}
+        weather.formats = {column: [6, 1, MISSING, False] for column in WEATHER_COLUMNS}
+        weather.site = {'LAT': field['field_latitude'], 'LONG': field['field_longitude'],
+                        'ELEV': field['field_elevation'], 'TAV': tav[year], 'AMP': amp[year],
+                        'REFHT': refht}
+        site_line = (f"  {INSTITUTE}{SITE}{field['field_latitude']:9.3f}{field['field_longitude']:9.3f}"
+                     f"{field['field_elevation']:6.0f}{tav[year]:6.1f}{amp[year]:6.1f}"
+                     f"{refht:6.1f}{MISSING:>6}")
+        weather.header = '\n'.join([
+            f"$WEATHER: {SITE_NAME.upper()}", '', COMMENT, '',
+            '@ INSI      LAT     LONG  ELEV   TAV   AMP REFHT WNDHT', site_line, '',
+            '@DATE' + ''.join(f"{column:>6}" for column in WEATHER_COLUMNS), '',
+        ])
+        files[name] = weather
+    return files
+
+def _genotype_codes(genotypes):
+    """INGENO codes TU0001... numbered by genotype name over all seasons"""
+    names = sorted(genotypes['genotype_name'].dropna().unique())
+    return {name: f"{INSTITUTE}{i:04d}" for i, name in enumerate(names, 1)}
+
+def _season_tables(tables, year):
+    """Rows of every per-season table for one experiment year"""
+    return {name: table[table['experiment_year'] == year]
+            for name, table in tables.items() if 'experiment_year' in table}
+
+def experiment_text(tables, year):
+    """Text of the experiment file (FILEX) of one season
+    
+    Returns:
+        (crop code, text), or None if the season's treatments name no crop
+    """
+    
+    season = _season_tables(tables, year)
+    treatments = season['TREATMENTS'].drop_duplicates('treatment_number')
+    crops = treatments['crop_id'].dropna().map(CROP_CODES).dropna()
+    if crops.empty:
+        return None
+    crop = crops.iloc[0]
+    code = _file_code(year)
+    
+    field = tables['FIELDS'].iloc[0]
+    persons = tables['PERSONS']
+    people = '; '.join(persons['researcher_first_name'] + ' ' + persons['researcher_last_name'])
+    notes = [' ' + str(doi).strip() for doi in tables['DOCUMENTS']['digital_object_id'].dropna()]
+    
+    sections = [f"*EXP.DETAILS: {code}\n\n{COMMENT}\n"
+                "*GENERAL\n"
+                f"@PEOPLE\n{people}\n@ADDRESS\n{MISSING}\n"
+                f"@SITE\n{SITE_NAME}; {round(field['field_longitude'], 2):g}; "
+                f"{round(field['field_latitude'], 2):g}; {round(field['field_elevation'], 2):g}\n"
+                "@ PAREA  PRNO  PLEN  PLDR  PLSP  PLAY HAREA  HRNO  HLEN  HARM.........\n"
+                "    -99   -99   -99   -99   -99   -99   -99   -99   -99  -99          \n"
+                "@NOTES\n" + ''.join(note + '\n' for note in notes)]
+    
+    # Fertilizer levels without applications are written as level 0 (no fertilizer)
+    fertilizers = season['FERTILIZERS'].sort_values('fertilizer_level', kind='stable')
+    levels = treatments.copy()
+    for factor, column in FACTOR_COLUMNS.items():
+        levels[factor] = levels[column].fillna(0).astype(int) if column else 0
+    levels.loc[~levels['MF'].isin(fertilizers['fertilizer_level']), 'MF'] = 0
+    levels = levels.assign(R=1, O=0, C=0, SM=1)
+    sections.append(
+        "*TREATMENTS                        -------------FACTOR LEVELS------------\n"
+        + _table('@N R O C TNAME.................... CU FL SA IC MP MI MF MR MC MT ME MH SM', levels,
+                 [('treatment_number', 2, 0), ('R', 2, 0), ('O', 2, 0), ('C', 2, 0),
+                  ('treatment_name', 26, '<')]
+                 + [(factor, 3, 0) for factor in list(FACTOR_COLUMNS) + ['SM']]))
+    
+    genotypes = season['GENOTYPES']
+    genotypes = genotypes[genotypes['genotype_level'].isin(levels['CU'])].assign(
+        CR=crop, INGENO=genotypes['genotype_name'].map(_genotype_codes(tables['GENOTYPES'])))
+    sections.append("*CULTIVARS\n" + _table('@C CR INGENO CNAME', genotypes,
+                                            [('genotype_level', 2, 0), ('CR', 3, None),
+                                             ('INGENO', 7, None), ('genotype_name', 50, '<')]))
+    
+    fields = season['FIELDS'].assign(
+        ID_FIELD=lambda f: f"{INSTITUTE}{SITE}" + f['field_level'].map('{:04d}'.format),
+        WSTA=f"{INSTITUTE}{SITE}", ID_SOIL=tables['PROFILE_METADATA']['soil_profile_ID'].iloc[0],
+        FLNAME=FIELD_NAME)
+    sections.append(
+        "*FIELDS\n"
+        + _table('@L ID_FIELD WSTA....  FLSA  FLOB  FLDT  FLDD  FLDS  FLST SLTX  SLDP  ID_SOIL    FLNAME',
+                 fields, [('field_level', 2, 0), ('ID_FIELD', 9, '<'), ('WSTA', 9, '<'),
+                          ('FLSA', 6, None), ('FLOB', 6, None), ('FLDT', 6, None),
+                          ('FLDD', 6, None), ('FLDS', 6, None), ('FLST', 6, None),
+                          ('SLTX', 6, '<'), ('SLDP', 5, None), ('ID_SOIL', 12, None),
+                          ('FLNAME', 50, '<')])
+        + _table('@L ...........XCRD ...........YCRD .....ELEV .............AREA .SLEN .FLWR .SLAS FLHST FHDUR',
+                 fields, [('field_level', 2, 0), ('field_longitude', 16, 6),
+                          ('field_latitude', 16, 6), ('field_elevation', 10, 1),
+                          ('AREA', 18, None), ('SLEN', 6, None), ('FLWR', 6, None),
+                          ('SLAS', 6, None), ('FLHST', 6, None), ('FHDUR', 6, None)]))
+    
+    initial = season['INITIAL_CONDITIONS']
+    initial = initial[initial['initial_conditions_level'].isin(levels['IC'])].assign(
+        PCR=lambda f: f['residue_nature_prev_crop'].map(CROP_CODES))
+    ic_columns = ['ICDAT', 'ICRT', 'ICND', 'ICRN', 'ICRE', 'ICWD', 'ICRES', 'ICREN', 'ICREP',
+                  'ICRIP', 'ICRID']
+    sections.append(
+        "*INITIAL CONDITIONS\n"
+        + _table('@C   PCR ICDAT  ICRT  ICND  ICRN  ICRE  ICWD ICRES ICREN ICREP ICRIP ICRID ICNAME',
+                 initial, [('initial_conditions_level', 2, 0), ('PCR', 6, None)]
+                 + [(column, 6, None) for column in ic_columns] + [('ICNAME', 4, '<')])
+        + _table('@C  ICBL  SH2O  SNH4  SNO3', initial,
+                 [('initial_conditions_level', 2, 0)]
+                 + [(column, 6, None) for column in ('ICBL', 'SH2O', 'SNH4', 'SNO3')]))
+    
+    # A season lists one planting per level (the last date when several are given)
+    plantings = season['PLANTINGS']
+    plantings = plantings[plantings['planting_level'].isin(levels['MP'])]
+    plantings = plantings.sort_values('planting_date').drop_duplicates('planting_level', keep='last')
+    plantings = plantings.assign(PDATE=_yyddd(plantings['planting_date']))
+    sections.append(
+        "*PLANTING DETAILS\n"
+        + _table('@P PDATE EDATE  PPOP  PPOE  PLME  PLDS  PLRS  PLRD  PLDP  PLWT  PAGE  PENV  PLPH  SPRL                        PLNAME',
+                 plantings, [('planting_level', 2, 0), ('PDATE', 6, None), ('EDATE', 6, None),
+                             ('plant_pop_at_planting', 6, 1), ('PPOE', 6, None),
+                             ('PLME', 6, None), ('PLDS', 6, None), ('row_spacing', 6, 1)]
+                 + [(column, 6, None) for column in ('PLRD', 'PLDP', 'PLWT', 'PAGE', 'PENV',
+                                                     'PLPH', 'SPRL')]
+                 + [('PLNAME', 27, None)]))
+    
+    tillage = season['TILLAGE']
+    tillage = tillage[tillage['tillage_level'].isin(levels['MT'])]
+    if len(tillage):
+        sections.append(
+            "*TILLAGE AND ROTATIONS\n"
+            + _table('@T TDATE TIMPL  TDEP TNAME', tillage.assign(TDATE=_yyddd(tillage['tillage_date'])),
+                     [('tillage_level', 2, 0), ('TDATE', 6, None), ('tillage_implement', 6, None),
+                      ('TDEP', 6, None), ('tillage_operation_name', 50, '<')]))
+    
+    if len(fertilizers):
+        other = pd.DataFrame({code: fertilizers[column].fillna(0)
+                              for column, code in OTHER_ELEMENTS.items() if column in fertilizers})
+        has_other = other.gt(0)
+        fertilizers = fertilizers.assign(
+            FDATE=_yyddd(fertilizers['fertilization_date']),
+            FAMO=other.where(has_other).bfill(axis=1).iloc[:, 0],
+            FOCD=has_other.idxmax(axis=1).where(has_other.any(axis=1)))
+        sections.append(
+            "*FERTILIZERS (INORGANIC)\n"
+            + _table('@F FDATE  FMCD  FACD  FDEP  FAMN  FAMP  FAMK  FAMC  FAMO  FOCD FERNAME',
+                     fertilizers,
+                     [('fertilizer_level', 2, 0), ('FDATE', 6, None),
+                      ('fertilizer_material', 6, None), ('fertilizer_applic_method', 6, None),
+                      ('FDEP', 6, None), ('N_in_applied_fertilizer', 6, 0),
+                      ('phosphorus_applied_fert', 6, 0), ('fertilizer_K_applied', 6, 0),
+                      ('Ca_in_applied_fertilizer', 6, 0), ('FAMO', 6, 0), ('FOCD', 6, None),
+                      ('FERNAME', 50, '<')]))
+    
+    chemicals = season['CHEMICALS']
+    chemicals = chemicals[chemicals['chemical_applic_level'].isin(levels['MC'])]
+    if len(chemicals):
+        chemicals = chemicals.assign(
+            CDATE=_yyddd(chemicals['chemical_applic_date']),
+            CHCOD=chemicals['chemical_applic_material'].replace('NA', np.nan))
+        sections.append(
+            "*CHEMICAL APPLICATIONS\n"
+            + _table('@C CDATE CHCOD CHAMT  CHME CHDEP CHT..  CHNAME', chemicals,
+                     [('chemical_applic_level', 2, 0), ('CDATE', 6, None), ('CHCOD', 6, None),
+                      ('chemical_applic_amount', 6, 2), ('chemical_applic_method', 6, None),
+                      ('CHDEP', 6, None), ('CHT', 6, '<'), ('CHNAME', 5, None)]))
+    
+    harvests = season['HARVESTS']
+    harvests = harvests[harvests['harvest_operations_level'].isin(levels['MH'])]
+    sections.append(
+        "*HARVEST DETAILS\n"
+        + _table('@H HDATE  HSTG  HCOM HSIZE   HPC  HBPC HNAME',
+                 harvests.assign(HDATE=_yyddd(harvests['harvest_operations_date'])),
+                 [('harvest_operations_level', 2, 0), ('HDATE', 6, None)]
+                 + [(column, 6, None) for column in ('HSTG', 'HCOM', 'HSIZE', 'HPC', 'HBPC')]
+                 + [('HNAME', 4, '<')]))
+    
+    sections.append(SIMULATION_CONTROLS)
+    return crop, '\n'.join(sections) + '\n'
+
+def observation_texts(tables, year, crop):
+    """Texts of the T file (time series) and A file (harvest summary) of one season
+    
+    Returns:
+        Dict of file name -> text; a file is left out when the season has no data for it
+    """
+    
+    season = _season_tables(tables, year)
+    code = _file_code(year)
+    texts = {}
+    for suffix, table, date_column, date_name, columns in (
+            ('T', 'TIME_SERIES', 'date_of_measurement', 'DATE', TIME_SERIES_COLUMNS),
+            ('A', 'SUMMARY', 'harvest_date', 'HDAT', SUMMARY_COLUMNS)):
+        rows = season.get(table)
+        if rows is None or rows.empty:
+            continue
+        rows = rows.sort_values('treatment_number', kind='stable')
+        rows = rows.assign(**{date_name: _yyddd(rows[date_column])})
+        present = [(name, source) for name, source in columns.items() if rows[source].notna().any()]
+        if not present:
+            continue
+        header = f"@TRNO {date_name:>6}" + ''.join(f"{name:>6}" for name, _ in present)
+        kind = 'T' if suffix == 'T' else 'A'
+        texts[f"{code}.{crop}{suffix}"] = (
+            f"*EXP. DATA ({kind}): {code}\n\n{COMMENT}\n\n"
+            + _table(header, rows, [('treatment_number', 6, 0), (date_name, 6, None)]
+                     + [(source, 6, 0) for _, source in present]))
+    return texts
+
+def soil_text(tables):
+    """Text of the soil file (TU.SOL) holding the ICASA soil profile"""
+    
+    profile = tables['PROFILE_METADATA'].iloc[0]
+    surface = tables['SOIL_PROFILE'].iloc[0:1]
+    layers = tables['SOIL_PROFILE_LAYERS']
+    
+    def text(value):
+        return MISSING if pd.isna(value) else str(value)
+    
+    surface_line = _format_columns(surface, [
+        ('soil_surface_color', 6, None), ('soil_albedo', 6, 2), ('soil_evaporation_limit', 6, 2),
+        ('drainage_rate_per_day', 6, 2), ('runoff_curve_no_SCS', 6, 1),
+        ('mineralization_factor', 6, 2), ('soil_fertility_on_photo', 6, 2),
+        ('soil_analys_meth_pH_buff', 6, None), ('soil_anal_meth_P_extract', 6, None),
+        ('soil_anal_meth_exch_K', 6, None)])[0]
+    return (
+        "*SOILS: General DSSAT Soil Input File\n\n"
+        f"*{profile['soil_profile_ID']:<10}  {text(profile['soil_source']):<11} {MISSING:<5}"
+        f" {profile['soil_depth']:5.0f} {MISSING}\n"
+        "@SITE        COUNTRY          LAT     LONG SCS FAMILY\n"
+        f" {text(profile['soil_site']):<11} {text(profile['soil_location_country']):<11}"
+        f" {profile['latitude_soil_profile']:8.3f} {profile['longitude_soil_profile']:8.3f} {MISSING}\n"
+        "@ SCOM  SALB  SLU1  SLDR  SLRO  SLNF  SLPF  SMHB  SMPX  SMKE\n"
+        f"{surface_line}\n"
+        + _table('@' + ''.join(f"{name:>6}" for name, _, _ in SOIL_LAYER_COLUMNS)[1:], layers,
+                 [(column, 6, decimals) for _, column, decimals in SOIL_LAYER_COLUMNS]))
+
+def convert(icasa_dir=ICASA_DIR, out_dir='.', years=None):
+    """Write the DSSAT inputs of every season (or of the given experiment years)
+    
+    Returns:
+        List of written file paths
+    """
+    
+    tables = load_icasa_tables(icasa_dir)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    
+    texts = {f"{INSTITUTE}.SOL": soil_text(tables)}
+    for name, weather in weather_files(tables).items():
+        if years is None or 2000 + int(name[4:6]) in years:
+            texts[name] = render_wth(weather)
+    
+    for year in sorted(tables['TREATMENTS']['experiment_year'].astype(int).unique()):
+        if years is not None and year not in years:
+            continue
+        experiment = experiment_text(tables, year)
+        if experiment is None:
+            print(f"[WARNING] {year}: no crop in TREATMENTS, experiment file skipped")
+            continue
+        crop, text = experiment
+        texts[f"{_file_code(year)}.{crop}X"] = text
+        texts.update(observation_texts(tables, year, crop))
+    
+    paths = []
+    for name, text in texts.items():
+        path = out_dir / name
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+        paths.append(path)
+    return paths
+
+def main():
+    icasa_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else ICASA_DIR
+    out_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else Path('icasa_dssat')
+    if not (icasa_dir / 'TREATMENTS.csv').exists():
+        print(f"[ERROR] No ICASA tables in {icasa_dir}")
+        return 1
+    
+    paths = convert(icasa_dir, out_dir)
+    print(f"[OK] {len(paths)} DSSAT files written to {out_dir}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
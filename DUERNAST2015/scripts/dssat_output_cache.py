@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+DSSAT Output Table Cache
+
+Purpose: Columnar on-disk cache of parsed DSSAT output files. The first read of an
+         .OUT file parses the text and stores every column of every run in one
+         columnar file (Parquet when pyarrow is installed, otherwise a NumPy .npz
+         archive with one array per column). Later reads load only the columns an
+         ExtractionPlan asks for and skip the text parse entirely.
+         
+         Entries are validated against the source file's size and modification
+         time; when those changed, the SHA-256 of the content decides whether the
+         entry is still valid (e.g. after the file was copied or touched).
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dssat_output_reader import OutputRun
+
+try:
+    import pyarrow  # noqa: F401
+    COLUMNAR_FORMAT = 'parquet'
+except ImportError:
+    COLUMNAR_FORMAT = 'npz'
+
+def file_sha256(path):
+    """SHA-256 of a file's content, read in 1 MB chunks"""
+    
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _column_array(series):
+    """NumPy array for an .npz column (text columns as fixed-width unicode)"""
+    
+    if series.dtype.kind in 'biuf':
+        return series.to_numpy()
+    return series.to_numpy(dtype=str)
+
+class OutputTableCache:
+    """Parsed DSSAT output tables stored column by column
+    
+    Each source file (and parse mode) has one entry: meta.json holding the source
+    fingerprint, header columns and run boundaries, next to the columnar table of
+    all runs concatenated.
+    """
+    
+    KEY_VERSION = 'duernast-output-table-v1'
+    
+    def __init__(self, cache_dir, fmt=COLUMNAR_FORMAT):
+        self.cache_dir = Path(cache_dir)
+        self.format = fmt
+    
+    def _entry_dir(self, path, numeric):
+        source = str(Path(path).resolve())
+        key = hashlib.sha256(f"{self.KEY_VERSION}|{source}|{bool(numeric)}".encode()).hexdigest()
+        return self.cache_dir / key[:24]
+    
+    def _read_meta(self, entry):
+        try:
+            with open(entry / 'meta.json', 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _write_meta(self, entry, meta):
+        tmp = entry / f".meta-{os.getpid()}.json"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, entry / 'meta.json')
+    
+    def _is_fresh(self, entry, meta, path):
+        """Check the entry against the source file's size, mtime and content hash"""
+        
+        stat = Path(path).stat()
+        if meta.get('size') != stat.st_size:
+            return False
+        if meta.get('mtime_ns') == stat.st_mtime_ns:
+            return True
+        
+        # Same size but a different mtime: only the content hash can tell
+        if file_sha256(path) != meta.get('sha256'):
+            return False
+        meta['mtime_ns'] = stat.st_mtime_ns
+        self._write_meta(entry, meta)
+        return True
+    
+    def _load_columns(self, table_path, fmt, columns):
+        if fmt == 'parquet':
+            return pd.read_parquet(table_path, columns=columns)
+        
+        with np.load(table_path, allow_pickle=False) as archive:
+            return pd.DataFrame({column: archive[column] for column in columns})
+    
+    def load(self, path, plan=None, numeric=False):
+        """Cached runs of path, or None when there is no valid entry
+        
+        Args:
+            path: DSSAT output file
+            plan: Optional ExtractionPlan; only its columns are read from disk
+            numeric: Parse mode the entry was stored with
+        """
+        
+        entry = self._entry_dir(path, numeric)
+        meta = self._read_meta(entry)
+        if meta is None or meta.get('version') != self.KEY_VERSION:
+            return None
+        
+        table_path = entry / meta['table']
+        if not table_path.exists() or not self._is_fresh(entry, meta, path):
+            return None
+        
+        columns = meta['columns']
+        if plan:
+            names, positions, missing = plan.resolve(columns)
+            headers = [columns[p] for p in positions]
+        else:
+            names, headers, missing = columns, columns, []
+        
+        try:
+            table = self._load_columns(table_path, meta['format'], list(dict.fromkeys(headers)))
+        except (OSError, KeyError, ValueError, ImportError):
+            return None
+        table = pd.DataFrame({name: table[header] for name, header in zip(names, headers)},
+                             columns=names)
+        
+        runs = []
+        for info in meta['runs']:
+            run = OutputRun(info['run_number'])
+            run.metadata = info['metadata']
+            run.treatment = info['treatment']
+            run.columns = list(columns)
+            run.missing = list(missing)
+            run.data = table.iloc[info['start']:info['stop']].reset_index(drop=True)
+            runs.append(run)
+        return runs
+    
+    def store(self, path, runs, numeric=False):
+        """Store fully parsed runs of path (all header columns)
+        
+        Runs with differing or duplicated header columns are not cached.
+        
+        Returns:
+            True if an entry was written
+        """
+        
+        if not runs or any(run.data is None for run in runs):
+            return False
+        columns = runs[0].columns
+        if len(set(columns)) != len(columns) or any(run.columns != columns for run in runs):
+            return False
+        
+        stat = Path(path).stat()
+        sha256 = file_sha256(path)
+        
+        entry = self._entry_dir(path, numeric)
+        entry.mkdir(parents=True, exist_ok=True)
+        old_meta = self._read_meta(entry)
+        
+        table = pd.concat([run.data for run in runs], ignore_index=True)
+        table_name = f"table-{sha256[:16]}.{self.format}"
+        tmp = entry / f".{table_name}-{os.getpid()}"
+        
+        try:
+            if self.format == 'parquet':
+                table.to_parquet(tmp, index=False)
+            else:
+                with open(tmp, 'wb') as f:
+                    np.savez(f, **{column: _column_array(table[column]) for column in columns})
+            os.replace(tmp, entry / table_name)
+        except (OSError, ValueError, ImportError):
+            tmp.unlink(missing_ok=True)
+            return False
+        
+        bounds = []
+        start = 0
+        for run in runs:
+            bounds.append({
+                'run_number': run.run_number,
+                'treatment': run.treatment,
+                'metadata': run.metadata,
+                'start': start,
+                'stop': start + len(run.data),
+            })
+            start += len(run.data)
+        
+        self._write_meta(entry, {
+            'version': self.KEY_VERSION,
+            'source': str(Path(path).resolve()),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': sha256,
+            'numeric': bool(numeric),
+            'format': self.format,
+            'table': table_name,
+            'columns': list(columns),
+            'runs': bounds,
+        })
+        
+        # The new meta.json points at the new table, so an older one can go
+        if old_meta and old_meta.get('table') not in (None, table_name):
+            (entry / old_meta['table']).unlink(missing_ok=True)
+        return True
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+DSSAT Output Reader
+
+Purpose: Single-pass reader for DSSAT output files (PlantGro.OUT, PlantN.OUT,
+         Weather.OUT, SoilWat.OUT, Summary.OUT, ...). The file is scanned line by
+         line exactly once: *RUN lines start a new run, the @ line of the run gives
+         the column names, and the data rows that follow are collected into one
+         table per run. Only the current run's rows are held in memory as text.
+         
+         Columns are addressed by header name. An ExtractionPlan lists the fields
+         a caller needs; their positions are resolved once per @ header, so
+         files written by other DSSAT versions or output options (extra, missing
+         or reordered columns) are read correctly or reported as missing.
+         
+         Daily outputs that are entirely numeric (PlantGro.OUT, PlantN.OUT,
+         Weather.OUT, ...) can be read with numeric=True: the data block of each
+         run is kept as raw text and converted to a float array in one call.
+         
+         iter_output_runs() and iter_run_tables() are generators: memory use is
+         bounded by the largest single run, whatever the file size, and
+         aggregate_runs() reduces each run to one row of end-of-season
+         statistics as it goes. OutputFollower parses a file while DSSAT is
+         still writing it and hands out each run as soon as it is complete.
+"""
+
+import io
+import re
+from operator import itemgetter
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RUN_PATTERN = re.compile(r'^\*RUN\s+(\d+)')
+RUN_START = re.compile(r'^\*RUN\s', re.MULTILINE)
+TABLE_HEADER = re.compile(r'^@.*\n', re.MULTILINE)
+
+# Read buffer for output files (large sequential reads for multi-GB files)
+READ_BUFFER_BYTES = 1024 * 1024
+
+class OutputRun:
+    """One *RUN section of a DSSAT output file
+    
+    Attributes:
+        run_number: Number from the *RUN line (None for files without *RUN lines)
+        metadata: 'KEY : value' lines of the run header (MODEL, EXPERIMENT, ...)
+        treatment: Treatment number from the 'TREATMENT n : ...' header line
+        columns: Column names from the @ header line
+        data: pandas DataFrame with one column per header name (or per plan field)
+        missing: Plan fields not found in the @ header line
+    """
+    
+    def __init__(self, run_number=None):
+        self.run_number = run_number
+        self.metadata = {}
+        self.treatment = None
+        self.columns = []
+        self.extents = []
+        self.missing = []
+        self.data = None
+    
+    def __repr__(self):
+        rows = 0 if self.data is None else len(self.data)
+        return f"OutputRun(run={self.run_number}, treatment={self.treatment}, rows={rows})"
+
+class ExtractionPlan:
+    """Named fields to pull from DSSAT output tables
+    
+    Args:
+        fields: Mapping of output name to header name, or to a tuple of
+                alternative header names tried in order, e.g.
+                {'DAS': 'DAS', 'HWAD': ('HWAD', 'GWAD')}
+    """
+    
+    def __init__(self, fields):
+        self.fields = {name: (header,) if isinstance(header, str) else tuple(header)
+                       for name, header in fields.items()}
+        self._resolved = {}
+    
+    def resolve(self, columns):
+        """Output names, their header positions and the missing fields for a header
+        
+        Positions are computed once per distinct header and reused for every
+        run that shares it.
+        """
+        key = tuple(columns)
+        if key not in self._resolved:
+            index = {}
+            for position, column in enumerate(columns):
+                index.setdefault(column, position)
+            
+            names, positions, missing = [], [], []
+            for name, candidates in self.fields.items():
+                found = next((c for c in candidates if c in index), None)
+                if found is None:
+                    missing.append(name)
+                else:
+                    names.append(name)
+                    positions.append(index[found])
+            
+            self._resolved[key] = (names, positions, missing)
+        return self._resolved[key]
+    
+    def getter(self, columns):
+        """Callable selecting the plan's fields from a split data row"""
+        
+        _, positions, _ = self.resolve(columns)
+        if len(positions) == 1:
+            position = positions[0]
+            return lambda parts: [parts[position]]
+        if not positions:
+            return lambda parts: []
+        return lambda parts, get=itemgetter(*positions): list(get(parts))
+    
+    def apply(self, frame):
+        """Select and rename the plan's fields from a DataFrame with header-named columns
+        
+        Returns:
+            (DataFrame with one column per found field, list of missing fields)
+        """
+        names, positions, missing = self.resolve(list(frame.columns))
+        selected = frame.iloc[:, positions].copy()
+        selected.columns = names
+        return selected, missing
+
+def _parse_header_columns(line):
+    """Column names from an @ header line (trailing dots of text columns removed)"""
+    return [name.rstrip('.') for name in line[1:].split()]
+
+def _parse_header_extents(line):
+    """End position of every label in an @ header line
+    
+    DSSAT writes each value right-aligned under (or left-aligned within, for
+    dotted text columns) its label, so a field spans from the end of the
+    previous label to the end of its own.
+    """
+    return [match.end() for match in re.finditer(r'\S+', ' ' + line[1:])]
+
+def _split_fixed_width(line, extents):
+    """Split a data row at header label extents (for text values with spaces)"""
+    
+    fields = []
+    start = 0
+    for i, end in enumerate(extents):
+        stop = len(line) if i == len(extents) - 1 else end
+        fields.append(line[start:stop].strip())
+        start = end
+    return fields
+
+def _build_table(columns, rows):
+    """Turn collected data rows into a DataFrame, numeric where every value parses"""
+    
+    df = pd.DataFrame(rows, columns=columns)
+    for column in df.columns:
+        converted = pd.to_numeric(df[column], errors='coerce')
+        if converted.notna().all():
+            df[column] = converted
+    return df
+
+def _build_numeric_table(columns, lines, plan=None):
+    """Convert the raw data lines of a run to a float DataFrame
+    
+    The whole block is split and converted with a single NumPy call. Blocks with
+    ragged rows or non-numeric values (e.g. overflowed '******' fields) fall back
+    to a row-by-row conversion in which bad values become NaN.
+    """
+    
+    ncols = len(columns)
+    try:
+        values = np.array(''.join(lines).split(), dtype=float)
+    except ValueError:
+        values = None
+    
+    if values is not None and values.size == len(lines) * ncols:
+        values = values.reshape(len(lines), ncols)
+    else:
+        rows = [parts for parts in (line.split() for line in lines) if len(parts) == ncols]
+        values = pd.DataFrame(rows, columns=range(ncols)).apply(
+            pd.to_numeric, errors='coerce').to_numpy(dtype=float).reshape(len(rows), ncols)
+    
+    if plan:
+        names, positions, _ = plan.resolve(columns)
+        values = values[:, positions]
+    else:
+        names = columns
+    return pd.DataFrame(values, columns=names)
+
+def iter_runs_from_lines(lines, plan=None, numeric=False):
+    """Yield OutputRun objects from an iterable of output file lines
+    
+    Lines must keep their line endings. Used for whole files as well as for
+    byte ranges taken from a RunIndex or from a file that is still growing.
+    
+    Args:
+        lines: Iterable of text lines
+        plan: Optional ExtractionPlan; only its fields are kept, under their
+              output names
+        numeric: Parse each run's data block as one float array (only for
+                 outputs without text columns)
+    """
+    
+    run = None
+    rows = []
+    select = None
+    
+    def finish(current):
+        if current is not None and current.columns:
+            if numeric:
+                current.data = _build_numeric_table(current.columns, rows, plan)
+            else:
+                names = plan.resolve(current.columns)[0] if plan else current.columns
+                current.data = _build_table(names, rows)
+        return current
+    
+    for line in lines:
+        match = RUN_PATTERN.match(line)
+        if match:
+            if run is not None:
+                yield finish(run)
+            run = OutputRun(int(match.group(1)))
+            rows = []
+            continue
+        
+        if line.startswith('@'):
+            if run is None:
+                # Tabular files such as Summary.OUT have no *RUN lines
+                run = OutputRun()
+                rows = []
+            if not run.columns:
+                run.columns = _parse_header_columns(line)
+                run.extents = _parse_header_extents(line.rstrip('\r\n'))
+                if plan:
+                    run.missing = plan.resolve(run.columns)[2]
+                    select = plan.getter(run.columns)
+                else:
+                    select = None
+            continue
+        
+        if run is None or not line.strip() or line.startswith(('*', '!', '$')):
+            continue
+        
+        if not run.columns:
+            # Run header lines such as ' TREATMENT  1   : 1   WHAPS048'
+            if ':' in line:
+                key, value = line.split(':', 1)
+                key_parts = key.split()
+                if key_parts:
+                    run.metadata[key_parts[0]] = value.strip()
+                    if key_parts[0] == 'TREATMENT' and len(key_parts) > 1 and key_parts[1].isdigit():
+                        run.treatment = int(key_parts[1])
+            continue
+        
+        if numeric:
+            rows.append(line)
+            continue
+        
+        parts = line.split()
+        if len(parts) > len(run.columns) and len(run.extents) == len(run.columns):
+            # Text columns such as TNAM may contain spaces
+            parts = _split_fixed_width(line.rstrip('\r\n'), run.extents)
+        elif len(parts) != len(run.columns):
+            continue
+        rows.append(select(parts) if select else parts)
+    
+    if run is not None:
+        yield finish(run)
+
+def iter_output_runs(path, plan=None, numeric=False):
+    """Yield OutputRun objects from a DSSAT output file, one run at a time
+    
+    Args:
+        path: DSSAT output file
+        plan: Optional ExtractionPlan; only its fields are kept, under their
+              output names
+        numeric: Parse each run's data block as one float array (only for
+                 outputs without text columns)
+    """
+    
+    with open(path, 'r', encoding='utf-8', errors='ignore', buffering=READ_BUFFER_BYTES) as f:
+        yield from iter_runs_from_lines(f, plan, numeric)
+
+def iter_run_tables(path, plan=None, numeric=False):
+    """Yield (run header, DataFrame) pairs one run at a time
+    
+    The run header is a dict with RUN, TRNO and the 'KEY : value' metadata of
+    the run. Runs without a data table are skipped.
+    """
+    
+    for run in iter_output_runs(path, plan, numeric):
+        if run.data is None:
+            continue
+        header = {'RUN': run.run_number, 'TRNO': run.treatment}
+        header.update(run.metadata)
+        yield header, run.data
+
+def aggregate_runs(path, plan=None, last=(), total=(), maximum=(), numeric=True):
+    """End-of-season statistics of every run, computed while streaming
+    
+    Only one run is in memory at a time, so this works for output sets far
+    larger than RAM.
+    
+    Args:
+        path: DSSAT output file
+        plan: Optional ExtractionPlan (column names below refer to its fields)
+        last: Columns whose final daily value is reported (e.g. CWAD, HWAD)
+        total: Columns summed over the season (e.g. daily stress factors)
+        maximum: Columns whose seasonal maximum is reported (e.g. LAID)
+        numeric: Parse data blocks as float arrays (see iter_output_runs)
+    
+    Returns:
+        DataFrame with one row per run: RUN, TRNO, ROWS and <column>_LAST,
+        <column>_SUM, <column>_MAX for the requested columns (NaN if absent)
+    """
+    
+    records = []
+    for header, data in iter_run_tables(path, plan, numeric):
+        record = {'RUN': header['RUN'], 'TRNO': header['TRNO'], 'ROWS': len(data)}
+        for column in last:
+            present = column in data.columns and len(data)
+            record[f"{column}_LAST"] = data[column].iloc[-1] if present else np.nan
+        for column in total:
+            record[f"{column}_SUM"] = data[column].sum() if column in data.columns else np.nan
+        for column in maximum:
+            record[f"{column}_MAX"] = data[column].max() if column in data.columns else np.nan
+        records.append(record)
+    
+    return pd.DataFrame(records)
+
+def select_fields(run, plan):
+    """Restrict a fully parsed run to the fields of an ExtractionPlan (in place)"""
+    
+    names, positions, missing = plan.resolve(run.columns)
+    run.missing = missing
+    if run.data is not None:
+        data = run.data.iloc[:, positions].copy()
+        data.columns = names
+        run.data = data
+    return run
+
+def read_output_file(path, plan=None, numeric=False, cache=None):
+    """Read every run of a DSSAT output file
+    
+    Args:
+        path: DSSAT output file
+        plan: Optional ExtractionPlan restricting the columns that are kept
+        numeric: Parse data blocks as float arrays (see iter_output_runs)
+        cache: Optional OutputTableCache; a valid entry is loaded instead of
+               parsing, otherwise the file is parsed in full and stored
+    
+    Returns:
+        List of OutputRun objects in file order (empty if the file does not exist)
+    """
+    
+    if not Path(path).exists():
+        return []
+    if cache is None:
+        return list(iter_output_runs(path, plan, numeric))
+    
+    runs = cache.load(path, plan, numeric)
+    if runs is None:
+        runs = list(iter_output_runs(path, None, numeric))
+        cache.store(path, runs, numeric)
+        if plan:
+            runs = [select_fields(run, plan) for run in runs]
+    return runs
+
+class OutputFollower:
+    """Incrementally parse a DSSAT output file that is still being written
+    
+    Every poll() reads the complete lines appended since the previous call. A
+    *RUN section is returned once the next *RUN line has been written, or by
+    poll(final=True) after DSSAT has exited. Files without *RUN sections
+    (Summary.OUT) return one single-row OutputRun per new table row.
+    """
+    
+    def __init__(self, path, plan=None, numeric=False):
+        self.path = Path(path)
+        self.plan = plan
+        self.numeric = numeric
+        self.offset = 0
+        self.text = ''
+        self.table_header = None
+        self.completed = 0
+    
+    def _read_appended(self, final):
+        """Append new complete lines (all remaining text when final) to self.text"""
+        
+        if not self.path.exists():
+            return
+        if self.path.stat().st_size < self.offset:
+            # The file was truncated (DSSAT restarted it): start over
+            self.offset, self.text, self.table_header = 0, '', None
+        
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read()
+        
+        end = len(chunk) if final else chunk.rfind(b'\n') + 1
+        if end:
+            self.offset += end
+            self.text += chunk[:end].decode('utf-8', errors='ignore')
+    
+    def poll(self, final=False):
+        """Runs completed since the previous call, in file order"""
+        
+        self._read_appended(final)
+        completed = []
+        
+        if self.table_header is None:
+            starts = [m.start() for m in RUN_START.finditer(self.text)]
+            if starts:
+                cut = len(self.text) if final else starts[-1]
+                if cut > starts[0]:
+                    block = self.text[starts[0]:cut]
+                    self.text = self.text[cut:]
+                    completed = list(iter_runs_from_lines(io.StringIO(block), self.plan, self.numeric))
+            else:
+                # A table header before any *RUN line: Summary.OUT style file
+                header = TABLE_HEADER.search(self.text)
+                if header:
+                    self.table_header = header.group()
+                    self.text = self.text[header.end():]
+        
+        if self.table_header is not None:
+            lines = self.text.splitlines(keepends=True)
+            self.text = ''
+            for line in lines:
+                if not line.strip() or line.startswith(('*', '!', '$', '@')):
+                    continue
+                if not line.endswith('\n'):
+                    line += '\n'
+                run = next(iter_runs_from_lines([self.table_header, line], self.plan, self.numeric), None)
+                if run is not None and run.data is not None and len(run.data):
+                    run.run_number = self.completed + len(completed) + 1
+                    if 'TRNO' in run.data.columns:
+                        run.treatment = int(run.data['TRNO'].iloc[0])
+                    completed.append(run)
+        
+        self.completed += len(completed)
+        return completed
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+DSSAT OVERVIEW.OUT Extractor
+
+Purpose: Reads the per-run tables of OVERVIEW.OUT in a single pass and returns
+         them as tidy DataFrames with RUN and TRNO columns:
+         
+         stages    - *SIMULATED CROP AND SOIL STATUS AT MAIN DEVELOPMENT STAGES
+                     (one row per development stage)
+         variables - *MAIN GROWTH AND DEVELOPMENT VARIABLES
+                     (simulated vs measured, one row per variable)
+         stress    - *ENVIRONMENTAL AND STRESS FACTORS
+                     (one row per development phase, incl. 'Planting to Harvest')
+         
+         Stage-wise stress and growth summaries can be taken from here instead
+         of being recomputed from the daily PlantGro.OUT series.
+"""
+
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+RUN_PATTERN = re.compile(r'^\*RUN\s+(\d+)')
+TREATMENT_PATTERN = re.compile(r'^\s*TREATMENT\s+(\d+)')
+
+# ' 18 MAR    0 Fallow           0   0.00   0.0    0  0.0  0.00  0.00  0.00  0.00     8'
+STAGE_ROW = re.compile(r'^\s*(\d{1,2} [A-Z]{3})\s+(-?\d+) (.{10})(.*)$')
+STAGE_COLUMNS = ['BIOMASS', 'LAI', 'LEAF_NUM', 'CROP_N', 'CROP_N_PCT',
+                 'STRESS_H2O', 'STRESS_N', 'STRESS_P1', 'STRESS_P2', 'RSTG']
+
+# Columns of the environmental and stress factor table, after the phase name
+STRESS_COLUMNS = ['DAYS', 'TMAX', 'TMIN', 'TMEAN', 'SRAD', 'PHOTOPERIOD', 'CO2',
+                  'RAIN', 'TRANSPIRATION', 'POT_ET',
+                  'DAYS_TMIN_LT0', 'DAYS_TMIN_LT2', 'DAYS_TMAX_GT30', 'DAYS_TMAX_GT32',
+                  'DAYS_TMAX_GT34', 'DAYS_RAIN_GT0',
+                  'WATER_PHOTO', 'WATER_GROWTH', 'NITROGEN_PHOTO', 'NITROGEN_GROWTH',
+                  'PHOSPHORUS_PHOTO', 'PHOSPHORUS_GROWTH']
+PHASE_WIDTH = 25
+
+SECTIONS = {
+    '*SIMULATED CROP AND SOIL STATUS': 'stages',
+    '*MAIN GROWTH AND DEVELOPMENT VARIABLES': 'variables',
+    '*ENVIRONMENTAL AND STRESS FACTORS': 'stress',
+}
+
+class OverviewTables:
+    """Tidy tables extracted from OVERVIEW.OUT (see module docstring)"""
+    
+    def __init__(self, stages, variables, stress):
+        self.stages = stages
+        self.variables = variables
+        self.stress = stress
+    
+    def __repr__(self):
+        return (f"OverviewTables(stages={len(self.stages)}, variables={len(self.variables)}, "
+                f"stress={len(self.stress)})")
+
+def _to_float(values):
+    try:
+        return [float(v) for v in values]
+    except ValueError:
+        return None
+
+def read_overview(path='OVERVIEW.OUT'):
+    """Extract stage, simulated-vs-measured and stress tables of every run
+    
+    Returns:
+        OverviewTables (empty DataFrames if the file is missing)
+    """
+    
+    stages, variables, stress = [], [], []
+    run_number = treatment = None
+    section = None
+    
+    if Path(path).exists():
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            for line in f:
+                match = RUN_PATTERN.match(line)
+                if match:
+                    run_number, treatment, section = int(match.group(1)), None, None
+                    continue
+                
+                if line.startswith('*'):
+                    section = next((name for prefix, name in SECTIONS.items()
+                                    if line.startswith(prefix)), None)
+                    continue
+                
+                if treatment is None:
+                    match = TREATMENT_PATTERN.match(line)
+                    if match:
+                        treatment = int(match.group(1))
+                        continue
+                
+                if section is None or not line.strip():
+                    continue
+                ids = {'RUN': run_number, 'TRNO': treatment}
+                
+                if section == 'stages':
+                    match = STAGE_ROW.match(line.rstrip('\r\n'))
+                    values = _to_float(match.group(4).split()) if match else None
+                    if values is not None and len(values) == len(STAGE_COLUMNS):
+                        row = dict(ids, DATE=match.group(1), DAP=int(match.group(2)),
+                                   STAGE=match.group(3).strip())
+                        row.update(zip(STAGE_COLUMNS, values))
+                        stages.append(row)
+                
+                elif section == 'variables':
+                    if line.startswith('@') or line.strip().startswith('-'):
+                        continue
+                    parts = line.rstrip().rsplit(None, 2)
+                    values = _to_float(parts[1:]) if len(parts) == 3 else None
+                    if values is not None:
+                        variables.append(dict(ids, VARIABLE=parts[0].strip(),
+                                              SIMULATED=values[0], MEASURED=values[1]))
+                
+                elif section == 'stress':
+                    values = _to_float(line[PHASE_WIDTH:].split())
+                    if values is not None and len(values) == len(STRESS_COLUMNS):
+                        row = dict(ids, PHASE=line[:PHASE_WIDTH].strip())
+                        row.update(zip(STRESS_COLUMNS, values))
+                        stress.append(row)
+    
+    variables = pd.DataFrame(variables, columns=['RUN', 'TRNO', 'VARIABLE', 'SIMULATED', 'MEASURED'])
+    # -99 marks values that were not simulated or not measured
+    variables[['SIMULATED', 'MEASURED']] = variables[['SIMULATED', 'MEASURED']].replace(-99, np.nan)
+    
+    return OverviewTables(
+        stages=pd.DataFrame(stages, columns=['RUN', 'TRNO', 'DATE', 'DAP', 'STAGE'] + STAGE_COLUMNS),
+        variables=variables,
+        stress=pd.DataFrame(stress, columns=['RUN', 'TRNO', 'PHASE'] + STRESS_COLUMNS),
+    )
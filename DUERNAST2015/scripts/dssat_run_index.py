@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+DSSAT Output Run Index
+
+Purpose: Random access to single *RUN sections of large DSSAT output files. The
+         index records the byte offsets of every *RUN block and of its @ header
+         line and is stored as a sidecar next to the output file
+         (PlantGro.OUT -> PlantGro.OUT.runidx). The output file is then memory
+         mapped and only the requested runs are decoded and parsed, so drilling
+         into one treatment of a multi-gigabyte file takes milliseconds.
+         
+         The sidecar records the size and modification time of the file it was
+         built from and is rebuilt automatically when the file changes.
+"""
+
+import io
+import re
+import os
+import json
+import mmap
+from pathlib import Path
+
+from dssat_output_reader import iter_runs_from_lines
+
+INDEX_SUFFIX = '.runidx'
+INDEX_VERSION = 1
+
+RUN_LINE = re.compile(rb'^\*RUN\s+(\d+)', re.MULTILINE)
+TREATMENT_LINE = re.compile(rb'^\s*TREATMENT\s+(\d+)', re.MULTILINE)
+HEADER_LINE = re.compile(rb'^@', re.MULTILINE)
+
+class RunIndex:
+    """Byte offsets of the *RUN sections of one DSSAT output file
+    
+    Each entry is a dict with run, treatment, start (offset of the *RUN line),
+    header (offset of the @ line, -1 if the run has none) and end (offset
+    where the next run starts, or the file size).
+    """
+    
+    def __init__(self, path, entries, size, mtime_ns):
+        self.path = Path(path)
+        self.entries = entries
+        self.size = size
+        self.mtime_ns = mtime_ns
+    
+    @staticmethod
+    def sidecar_path(path):
+        path = Path(path)
+        return path.with_name(path.name + INDEX_SUFFIX)
+    
+    @classmethod
+    def build(cls, path):
+        """Scan the output file once for *RUN, TREATMENT and @ lines"""
+        
+        path = Path(path)
+        stat = path.stat()
+        entries = []
+        
+        if stat.st_size:
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                starts = [(m.start(), int(m.group(1))) for m in RUN_LINE.finditer(mm)]
+                for i, (start, run_number) in enumerate(starts):
+                    end = starts[i + 1][0] if i + 1 < len(starts) else len(mm)
+                    treatment = TREATMENT_LINE.search(mm, start, end)
+                    header = HEADER_LINE.search(mm, start, end)
+                    entries.append({
+                        'run': run_number,
+                        'treatment': int(treatment.group(1)) if treatment else None,
+                        'start': start,
+                        'header': header.start() if header else -1,
+                        'end': end,
+                    })
+        
+        return cls(path, entries, stat.st_size, stat.st_mtime_ns)
+    
+    def save(self):
+        """Write the sidecar file next to the output file (atomically)"""
+        
+        sidecar = self.sidecar_path(self.path)
+        tmp = sidecar.with_name(f".{sidecar.name}-{os.getpid()}")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': INDEX_VERSION,
+                'size': self.size,
+                'mtime_ns': self.mtime_ns,
+                'runs': self.entries,
+            }, f)
+        os.replace(tmp, sidecar)
+    
+    @classmethod
+    def load(cls, path):
+        """Index of path from its sidecar, built (and saved) when missing or stale"""
+        
+        path = Path(path)
+        stat = path.stat()
+        try:
+            with open(cls.sidecar_path(path), 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if (stored.get('version') == INDEX_VERSION and stored.get('size') == stat.st_size
+                    and stored.get('mtime_ns') == stat.st_mtime_ns):
+                return cls(path, stored['runs'], stat.st_size, stat.st_mtime_ns)
+        except (OSError, ValueError, KeyError):
+            pass
+        
+        index = cls.build(path)
+        try:
+            index.save()
+        except OSError:
+            # Read-only output directories still get an in-memory index
+            pass
+        return index
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def find(self, runs=None, treatments=None):
+        """Index entries matching the given run numbers and/or treatment numbers"""
+        
+        selected = self.entries
+        if runs is not None:
+            runs = set(runs)
+            selected = [e for e in selected if e['run'] in runs]
+        if treatments is not None:
+            treatments = set(treatments)
+            selected = [e for e in selected if e['treatment'] in treatments]
+        return selected
+    
+    def read(self, runs=None, treatments=None, plan=None, numeric=False):
+        """Parse only the selected runs, reading their bytes through a memory map
+        
+        Args:
+            runs: Run numbers to read (None for all)
+            treatments: Treatment numbers to read (None for all)
+            plan: Optional ExtractionPlan
+            numeric: Parse data blocks as float arrays
+        
+        Returns:
+            List of OutputRun objects in file order
+        """
+        
+        selected = self.find(runs, treatments)
+        if not selected:
+            return []
+        
+        result = []
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for entry in selected:
+                text = mm[entry['start']:entry['end']].decode('utf-8', errors='ignore')
+                result.extend(iter_runs_from_lines(io.StringIO(text), plan, numeric))
+        return result
+
+def read_runs(path, runs=None, treatments=None, plan=None, numeric=False):
+    """Read selected runs of a DSSAT output file through its sidecar index"""
+    return RunIndex.load(path).read(runs, treatments, plan, numeric)
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+DSSAT Soil Profile Catalog
+
+Purpose: Index over the soil profiles of multi-profile .SOL files (DSSAT48/Soil,
+         input/DE.SOL, ...). Every file is parsed once into two tables:
+         
+         profiles - one row per profile: ID, FILE, SOURCE, TEXTURE, DEPTH,
+                    DESCRIPTION, SITE, COUNTRY, LAT, LONG, FAMILY and the surface
+                    parameters (SCOM, SALB, SLU1, SLDR, SLRO, ...)
+         layers   - one row per profile layer: ID, PROFILE (row in profiles), SLB
+                    and every variable of its layer tables (SLLL, SDUL, SSAT,
+                    SRGF, SBDM, SLOC, ..., SLPX, SLPT, ... when present)
+         
+         Profiles are looked up by ID (dictionary), by country and by location
+         (nearest profile to a point, vectorized over many points for spatial
+         runs). The verbatim text of each profile is kept, so a single profile
+         can be written back out as a DSSAT .SOL file.
+"""
+
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+HEADER_LABEL = re.compile(r'\S+')
+
+# Fixed columns of the profile and site lines (DSSAT reads them with
+# '(1X,A10,2X,A11,1X,A5,1X,F5.0,1X,A50)' and '(1X,A11,1X,A11,2(1X,F8.3),1X,A50)')
+PROFILE_FIELDS = [('ID', 1, 11), ('SOURCE', 13, 24), ('TEXTURE', 25, 30),
+                  ('DEPTH', 31, 36), ('DESCRIPTION', 37, None)]
+SITE_FIELDS = [('SITE', 1, 12), ('COUNTRY', 13, 24), ('LAT', 25, 33), ('LONG', 34, 42),
+               ('FAMILY', 43, None)]
+
+# Layer columns holding text (master horizon)
+TEXT_COLUMNS = {'SLMH', 'SCOM', 'SMHB', 'SMPX', 'SMKE'}
+
+# Points per chunk of the vectorized nearest-profile search
+NEAREST_CHUNK = 4096
+
+def _to_float(text):
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+def _parse_row(header, line):
+    """Values of a data line under an @ header (right-aligned to each label)
+    
+    Lines that do not line up with their header fall back to whitespace splitting.
+    """
+    
+    labels = [(m.group(0), m.end()) for m in HEADER_LABEL.finditer(' ' + header[1:])]
+    row = {}
+    previous = 0
+    for i, (label, end) in enumerate(labels):
+        row[label] = (line[previous:] if i == len(labels) - 1 else line[previous:end]).strip()
+        previous = end
+    
+    misaligned = any(value and label not in TEXT_COLUMNS and np.isnan(_to_float(value))
+                     for label, value in row.items())
+    tokens = line.split()
+    if misaligned and len(tokens) == len(labels):
+        return dict(zip([label for label, _ in labels], tokens))
+    return row
+
+def _typed(row):
+    return {key: (value if key in TEXT_COLUMNS else _to_float(value) if value else np.nan)
+            for key, value in row.items()}
+
+def _fixed_fields(line, fields):
+    return {name: line[start:end].strip() for name, start, end in fields}
+
+def parse_sol(path):
+    """Profiles and layers of one .SOL file
+    
+    Returns:
+        (profile rows, layer rows, profile texts): lists of dicts and a list of
+        the verbatim text of each profile
+    """
+    
+    path = Path(path)
+    with open(path, 'r', encoding='latin-1') as f:
+        lines = f.read().splitlines()
+    
+    profiles, layers, texts = [], [], []
+    starts = [i for i, line in enumerate(lines)
+              if line.startswith('*') and not line.upper().startswith('*SOILS')]
+    for n, start in enumerate(starts):
+        stop = starts[n + 1] if n + 1 < len(starts) else len(lines)
+        # The profile ends at the next '*' line (a file header or the next profile)
+        block = lines[start:stop]
+        end = next((i for i, line in enumerate(block[1:], 1) if line.startswith('*')), len(block))
+        block = block[:end]
+        while block and not block[-1].strip():
+            block.pop()
+        
+        profile = _fixed_fields(block[0], PROFILE_FIELDS)
+        profile['DEPTH'] = _to_float(profile['DEPTH'])
+        profile['FILE'] = path.name
+        
+        profile_layers = {}
+        header = None
+        for line in block[1:]:
+            if line.startswith('@'):
+                header = line
+                continue
+            if header is None or not line.strip() or line.startswith('!'):
+                continue
+            if header.startswith('@SITE'):
+                site = _fixed_fields(line, SITE_FIELDS)
+                site['LAT'], site['LONG'] = _to_float(site['LAT']), _to_float(site['LONG'])
+                profile.update(site)
+            elif 'SLB' in header.split()[:2]:
+                row = _typed(_parse_row(header, line))
+                if not np.isnan(row.get('SLB', np.nan)):
+                    profile_layers.setdefault(row['SLB'], {'ID': profile['ID']}).update(row)
+            elif 'SCOM' in header:
+                profile.update(_typed(_parse_row(header, line)))
+        
+        profile['NLAYERS'] = len(profile_layers)
+        profiles.append(profile)
+        layers.extend(profile_layers.values())
+        texts.append('\n'.join(block) + '\n')
+    return profiles, layers, texts
+
+class SoilCatalog:
+    """Soil profiles of one or more .SOL files
+    
+    Attributes:
+        profiles: DataFrame, one row per profile (see module docstring)
+        layers: DataFrame, one row per layer, in profile order and by depth
+    """
+    
+    def __init__(self, profiles, layers, texts):
+        self.profiles = profiles
+        self.layers = layers
+        self.texts = texts
+        
+        # ID -> profile row. An ID listed in several files resolves like DSSAT does:
+        # the file named after the ID prefix (DE02157980 -> DE.SOL), else the first one
+        self._by_id = {}
+        for i, (profile_id, file_name) in enumerate(zip(profiles['ID'], profiles['FILE'])):
+            preferred = file_name.upper() == f"{profile_id[:2].upper()}.SOL"
+            if profile_id not in self._by_id or preferred:
+                self._by_id[profile_id] = i
+        
+        self._by_country = {}
+        for i, country in enumerate(profiles['COUNTRY']):
+            self._by_country.setdefault(str(country).upper(), []).append(i)
+        
+        rows = np.arange(len(profiles))
+        owners = layers['PROFILE'].to_numpy(dtype=int)
+        self._layer_starts = np.searchsorted(owners, rows, 'left')
+        self._layer_stops = np.searchsorted(owners, rows, 'right')
+        
+        # Unit vectors of the located profiles for the nearest-profile search
+        lat = np.radians(profiles['LAT'].to_numpy(dtype=float))
+        lon = np.radians(profiles['LONG'].to_numpy(dtype=float))
+        located = ~(np.isnan(lat) | np.isnan(lon) | (profiles['LAT'] <= -99).to_numpy())
+        self._located = np.flatnonzero(located)
+        self._xyz = np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon),
+                                     np.sin(lat)])[located]
+    
+    @classmethod
+    def build(cls, *paths):
+        """Parse .SOL files; directories contribute every *.SOL file they hold"""
+        
+        files = []
+        for path in map(Path, paths):
+            files.extend(sorted(path.glob('*.SOL')) if path.is_dir() else [path])
+        
+        profiles, layers, texts = [], [], []
+        for path in files:
+            try:
+                file_profiles, file_layers, file_texts = parse_sol(path)
+            except (OSError, ValueError, IndexError) as e:
+                print(f"[WARNING] Skipping {path.name}: {e}")
+                continue
+            # Layers point at their profile row (an ID may occur in several files)
+            offsets = {profile_id: len(profiles) + i
+                       for i, profile_id in reversed(list(enumerate(p['ID'] for p in file_profiles)))}
+            for layer in file_layers:
+                layer['PROFILE'] = offsets[layer['ID']]
+            profiles.extend(file_profiles)
+            layers.extend(file_layers)
+            texts.extend(file_texts)
+        
+        profiles = pd.DataFrame(profiles)
+        layers = pd.DataFrame(layers)
+        if layers.empty:
+            layers = pd.DataFrame(columns=['ID', 'PROFILE', 'SLB'])
+        layers = layers[['ID', 'PROFILE'] + [c for c in layers.columns if c not in ('ID', 'PROFILE')]]
+        layers = layers.sort_values(['PROFILE', 'SLB'], kind='stable').reset_index(drop=True)
+        return cls(profiles, layers, texts)
+    
+    def __len__(self):
+        return len(self.profiles)
+    
+    def __contains__(self, profile_id):
+        return profile_id in self._by_id
+    
+    def profile(self, profile_id):
+        """Profile row (Series) of a soil ID"""
+        return self.profiles.iloc[self._by_id[profile_id]]
+    
+    def profile_layers(self, profile_id):
+        """Layer rows (DataFrame) of a soil ID, top to bottom"""
+        
+        i = self._by_id[profile_id]
+        layers = self.layers.iloc[self._layer_starts[i]:self._layer_stops[i]]
+        return layers.dropna(axis=1, how='all').reset_index(drop=True)
+    
+    def by_country(self, country):
+        """Profiles whose COUNTRY field matches (case-insensitive)"""
+        return self.profiles.iloc[self._by_country.get(country.upper(), [])]
+    
+    def nearest(self, lat, lon, country=None):
+        """Soil ID of the located profile closest to each point
+        
+        Args:
+            lat, lon: Point or arrays of points (decimal degrees)
+            country: Only consider profiles of this country
+        
+        Returns:
+            Soil ID (str) for a single point, else an array of IDs
+        """
+        
+        candidates = np.arange(len(self._located))
+        if country is not None:
+            allowed = set(self._by_country.get(country.upper(), []))
+            candidates = np.array([i for i, row in enumerate(self._located) if row in allowed],
+                                  dtype=int)
+        if not len(candidates):
+            raise LookupError(f"No located soil profiles{' for ' + country if country else ''}")
+        
+        single = np.ndim(lat) == 0
+        lat = np.radians(np.atleast_1d(np.asarray(lat, dtype=float)))
+        lon = np.radians(np.atleast_1d(np.asarray(lon, dtype=float)))
+        points = np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+        
+        # Largest dot product of unit vectors = smallest great-circle distance
+        xyz = self._xyz[candidates]
+        best = np.empty(len(points), dtype=int)
+        for start in range(0, len(points), NEAREST_CHUNK):
+            chunk = points[start:start + NEAREST_CHUNK]
+            best[start:start + len(chunk)] = np.argmax(chunk @ xyz.T, axis=1)
+        
+        ids = self.profiles['ID'].to_numpy()[self._located[candidates[best]]]
+        return ids[0] if single else ids
+    
+    def profile_text(self, profile_id):
+        """Verbatim DSSAT text of one profile (from its '*ID' line)"""
+        return self.texts[self._by_id[profile_id]]
+    
+    def write_profile(self, profile_id, path, title='General DSSAT Soil Input File'):
+        """Write one profile as a DSSAT soil file (e.g. input/DE.SOL)"""
+        
+        with open(path, 'w', encoding='latin-1') as f:
+            f.write(f"*SOILS: {title}\n\n{self.profile_text(profile_id)}")
+
+# Catalogs already parsed, keyed on the files and their size and mtime
+_CATALOGS = {}
+
+def load_soil_catalog(*paths):
+    """Soil catalog of the given .SOL files/directories, parsed once per file version"""
+    
+    files = []
+    for path in map(Path, paths):
+        files.extend(sorted(path.glob('*.SOL')) if path.is_dir() else [path])
+    key = tuple((str(f.resolve()), f.stat().st_size, f.stat().st_mtime_ns) for f in files if f.exists())
+    
+    if key not in _CATALOGS:
+        _CATALOGS[key] = SoilCatalog.build(*paths)
+    return _CATALOGS[key]
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+DSSAT Soil Output Readers
+
+Purpose: Layer-resolved soil water (SoilWat.OUT) and mineral nitrogen (SoilNi.OUT)
+         as 3-D NumPy arrays indexed run x day x layer. The per-layer columns
+         (SW1D..SW9D, NI1D..NI9D, NH1D..NH9D, ...) are picked from the @ header by
+         name, each run is parsed with the vectorized numeric reader, and runs of
+         different length are padded with NaN. Parsed tables go through the same
+         OutputTableCache as the other outputs.
+"""
+
+import re
+from pathlib import Path
+
+import numpy as np
+
+from dssat_output_reader import ExtractionPlan, read_output_file
+
+# Upper bound on soil layers looked up in the headers (DSSAT profiles have at most 20)
+MAX_LAYERS = 20
+
+# Layer variables of each soil output: array name -> column pattern
+SOIL_WATER_LAYERS = {'SW': 'SW{}D'}  # Volumetric soil water (mm3/mm3)
+SOIL_NITROGEN_LAYERS = {'NO3': 'NI{}D', 'NH4': 'NH{}D'}  # NO3 and NH4 (ppm)
+
+DEPTH_RANGE = re.compile(r'(\d+)-(\d*)')
+
+class SoilLayerArrays:
+    """Layer-resolved daily soil output of all runs
+    
+    Attributes:
+        runs: Run numbers (length R)
+        treatments: Treatment numbers (length R)
+        das: Days after start, shape (R, D), NaN where a run is shorter
+        layers: Variable name -> array of shape (R, D, L)
+        depths: List of (top, bottom) depths in cm per layer, when the file lists them
+    """
+    
+    def __init__(self, runs, treatments, das, layers, depths):
+        self.runs = runs
+        self.treatments = treatments
+        self.das = das
+        self.layers = layers
+        self.depths = depths
+    
+    def __getitem__(self, name):
+        return self.layers[name]
+    
+    def __repr__(self):
+        shapes = ', '.join(f"{name}={array.shape}" for name, array in self.layers.items())
+        return f"SoilLayerArrays({shapes})"
+    
+    def run_index(self, treatment):
+        """Position of a treatment along the run axis"""
+        return self.treatments.index(treatment)
+    
+    def profile_total(self, name):
+        """Sum over layers, shape (R, D) (NaN where a run has no data)"""
+        
+        array = self.layers[name]
+        return np.where(np.isnan(array).all(axis=2), np.nan, np.nansum(array, axis=2))
+
+def read_layer_depths(path):
+    """Layer depth ranges from the '!' comment line above the first @ header
+    
+    Files with several layer groups (SoilNi.OUT: NO3, NH4, ...) repeat the ranges
+    for each group; only the first group is returned, one entry per layer.
+    
+    Returns:
+        List of (top, bottom) tuples in cm (bottom is None if the file truncates it)
+    """
+    
+    comment = None
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            if line.startswith('@'):
+                break
+            if line.startswith('!'):
+                comment = line
+    if comment is None:
+        return []
+    
+    depths = []
+    for top, bottom in DEPTH_RANGE.findall(comment):
+        top = int(top)
+        # The next group starts over at the surface
+        if depths and top <= depths[-1][0]:
+            break
+        depths.append((top, int(bottom) if bottom else None))
+    return depths
+
+def read_layer_arrays(path, variables, cache=None):
+    """Read per-layer columns of a daily soil output into run x day x layer arrays
+    
+    Args:
+        path: SoilWat.OUT, SoilNi.OUT or another output with numbered layer columns
+        variables: Mapping of array name to column pattern, e.g. {'SW': 'SW{}D'}
+        cache: Optional OutputTableCache
+    
+    Returns:
+        SoilLayerArrays, or None if the file is missing or has no data
+    """
+    
+    if not Path(path).exists():
+        return None
+    
+    fields = {'DAS': 'DAS'}
+    for pattern in variables.values():
+        for layer in range(1, MAX_LAYERS + 1):
+            column = pattern.format(layer)
+            fields[column] = column
+    plan = ExtractionPlan(fields)
+    
+    runs = [run for run in read_output_file(path, plan, numeric=True, cache=cache)
+            if run.data is not None and 'DAS' in run.data.columns]
+    if not runs:
+        return None
+    
+    max_days = max(len(run.data) for run in runs)
+    das = np.full((len(runs), max_days), np.nan)
+    for i, run in enumerate(runs):
+        das[i, :len(run.data)] = run.data['DAS'].to_numpy()
+    
+    layers = {}
+    for name, pattern in variables.items():
+        columns = []
+        for layer in range(1, MAX_LAYERS + 1):
+            column = pattern.format(layer)
+            if column not in runs[0].data.columns:
+                break
+            columns.append(column)
+        
+        array = np.full((len(runs), max_days, len(columns)), np.nan)
+        for i, run in enumerate(runs):
+            present = [c for c in columns if c in run.data.columns]
+            if len(present) == len(columns):
+                array[i, :len(run.data), :] = run.data[columns].to_numpy()
+        layers[name] = array
+    
+    depths = read_layer_depths(path)
+    for name, array in layers.items():
+        if depths and len(depths) != array.shape[2]:
+            raise ValueError(f"{Path(path).name}: {len(depths)} layer depths for "
+                             f"{array.shape[2]} {name} layers")
+    
+    return SoilLayerArrays(
+        runs=[run.run_number for run in runs],
+        treatments=[run.treatment for run in runs],
+        das=das,
+        layers=layers,
+        depths=depths,
+    )
+
+def read_soil_water(path='SoilWat.OUT', cache=None):
+    """Volumetric soil water per layer (SoilLayerArrays with an 'SW' array)"""
+    return read_layer_arrays(path, SOIL_WATER_LAYERS, cache)
+
+def read_soil_nitrogen(path='SoilNi.OUT', cache=None):
+    """Nitrate and ammonium per layer (SoilLayerArrays with 'NO3' and 'NH4' arrays)"""
+    return read_layer_arrays(path, SOIL_NITROGEN_LAYERS, cache)
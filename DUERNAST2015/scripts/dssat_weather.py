@@ -0,0 +1,637 @@
+#!/usr/bin/env python3
+"""
+DSSAT Weather Store
+
+Purpose: Columnar binary store for an archive of DSSAT weather files (.WTH), e.g.
+         the 970 .WTH files of DSSAT48/Weather. All files are parsed once into one
+         compressed NumPy archive holding a date array and one float32 array per
+         weather variable (SRAD, TMAX, TMIN, RAIN, DEWP, WIND, PAR, EVAP, RHUM,
+         ...), with missing values as NaN. Rows are grouped by file and sorted by
+         date within a file, so the rows of a station or of a date range are
+         array slices found with searchsorted instead of text scans.
+         
+         The header block, column widths, decimals and missing-value tokens of
+         every file are stored next to the arrays, and the exporter regenerates
+         .WTH files from the (possibly edited) arrays in the original layout.
+         
+         patch_wth edits single columns of a .WTH file without parsing it into a
+         WeatherFile: lines are streamed into a temporary file, only the patched
+         fields are rewritten (same width and decimals) and the result replaces
+         the file, which makes bulk edits over many files safe.
+         
+         Usage:
+             python dssat_weather.py build <weather_dir> <store.npz>
+             python dssat_weather.py export <store.npz> <out_dir> [FILE.WTH ...]
+"""
+
+import os
+import re
+import sys
+import json
+import datetime
+import itertools
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+STORE_VERSION = 1
+
+# Two-digit years (YYDDD dates) below the pivot are 20xx, others 19xx
+# (DSSAT48/Weather spans 1953-2030)
+CENTURY_PIVOT = 50
+
+HEADER_LABEL = re.compile(r'\S+')
+DATA_LINE = re.compile(r'^\s*\d{5,7}(\s|$)')
+QUALITY_FLAG = re.compile(r'(?<=\d)[A-Za-z]+$')
+NUMBER = re.compile(r'^-?\d*\.?\d*$')
+
+# Site header names of the two .WTH layouts ('@ INSI LAT LONG ...' and '@Latitude Longitud ...')
+SITE_FIELDS = {'LAT': 'LAT', 'Latitude': 'LAT', 'LONG': 'LONG', 'Longitud': 'LONG',
+               'ELEV': 'ELEV', 'Elev': 'ELEV', 'TAV': 'TAV', 'AMP': 'AMP', 'TAMP': 'AMP',
+               'REFHT': 'REFHT', 'WNDHT': 'WNDHT'}
+
+EPOCH = np.datetime64('1970-01-01', 'D')
+UNIX_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+def _label_extents(header):
+    """(label, end) of each @ header label; values are right-aligned to the end"""
+    return [(m.group(0), m.end()) for m in HEADER_LABEL.finditer(' ' + header[1:])]
+
+def _data_extents(labels, lines):
+    """Label extents, corrected to the data lines when these are offset
+    
+    csmtools writes the data lines one character right of the labels ('@DATE  SRAD'
+    over '15001    2.2'); when all sampled data lines agree, their token ends are used.
+    """
+    
+    sample = [line for line in lines if DATA_LINE.match(line)]
+    data_ends = {tuple(m.end() for m in HEADER_LABEL.finditer(line)) for line in sample}
+    if len(data_ends) == 1:
+        data_ends = data_ends.pop()
+        if len(data_ends) == len(labels) and data_ends != tuple(end for _, end in labels):
+            return [(label, end) for (label, _), end in zip(labels, data_ends)]
+    return labels
+
+def _to_float(text):
+    text = text.strip()
+    return float(text) if text else np.nan
+
+def _decimals(token):
+    token = token.strip()
+    return len(token) - token.index('.') - 1 if '.' in token else 0
+
+def yyddd_to_days(codes, digits=5):
+    """Days since 1970-01-01 of YYDDD (digits=5) or YYYYDDD (digits=7) date codes"""
+    
+    codes = np.asarray(codes, dtype=np.int64)
+    years = codes // 1000
+    if digits == 5:
+        years = np.where(years < CENTURY_PIVOT, 2000 + years, 1900 + years)
+    starts = (years - 1970).astype('datetime64[Y]').astype('datetime64[D]')
+    return (starts - EPOCH).astype(np.int64) + codes % 1000 - 1
+
+def days_to_yyddd(days, digits=5):
+    """Inverse of yyddd_to_days"""
+    
+    dates = EPOCH + np.asarray(days, dtype=np.int64)
+    years = dates.astype('datetime64[Y]').astype(np.int64) + 1970
+    doy = (dates - dates.astype('datetime64[Y]').astype('datetime64[D]')).astype(np.int64) + 1
+    return (years % 100 if digits == 5 else years) * 1000 + doy
+
+def _yyddd_day(code, digits=5):
+    """yyddd_to_days of a single date code"""
+    
+    year = code // 1000
+    if digits == 5:
+        year += 2000 if year < CENTURY_PIVOT else 1900
+    return datetime.date(year, 1, 1).toordinal() - UNIX_ORDINAL + code % 1000 - 1
+
+class WeatherFile:
+    """Parsed .WTH file
+    
+    Attributes:
+        name: File name (e.g. 'ACNM1301.WTH'); the station is its first 4 characters
+        header: Verbatim text up to and including the @DATE line
+        columns: Weather variables in file order (without DATE)
+        days: Dates as days since 1970-01-01 (int64)
+        values: Variable -> float array (NaN where missing)
+        formats: Variable -> [width, decimals, missing token]
+        date_digits: 5 (YYDDD) or 7 (YYYYDDD)
+        extras: [row position, text] of non-data lines inside the data block
+        overrides: [row, text, values] of data lines kept verbatim while unchanged
+        site: LAT, LONG, ELEV, TAV, AMP, REFHT, WNDHT from the site header
+    """
+    
+    def __init__(self, name):
+        self.name = name
+        self.header = ''
+        self.columns = []
+        self.days = np.zeros(0, dtype=np.int64)
+        self.values = {}
+        self.formats = {}
+        self.date_digits = 5
+        self.extras = []
+        self.overrides = []
+        self.site = {}
+        self.newline = '\n'
+        self.line_width = None
+        self.final_newline = True
+    
+    @property
+    def station(self):
+        return self.name[:4].upper()
+    
+    def layout(self):
+        """Layout metadata stored with the arrays (everything except the values)"""
+        return {'name': self.name, 'header': self.header, 'columns': self.columns,
+                'formats': self.formats, 'date_digits': self.date_digits,
+                'extras': self.extras, 'overrides': self.overrides, 'site': self.site,
+                'newline': self.newline,
+                'line_width': self.line_width, 'final_newline': self.final_newline}
+    
+    @classmethod
+    def from_layout(cls, layout, days, values):
+        weather = cls(layout['name'])
+        for key in ('header', 'columns', 'formats', 'date_digits', 'extras', 'overrides',
+                    'site', 'newline', 'line_width', 'final_newline'):
+            setattr(weather, key, layout[key])
+        weather.days = days
+        weather.values = values
+        return weather
+
+def _parse_site(header_lines):
+    """Site values from the first @ header naming a latitude and the line below it"""
+    
+    for i, line in enumerate(header_lines[:-1]):
+        if not line.startswith('@'):
+            continue
+        labels = _label_extents(line)
+        if not any(label in ('LAT', 'Latitude') for label, _ in labels):
+            continue
+        row = header_lines[i + 1]
+        site = {}
+        previous = 0
+        for label, end in labels:
+            field = row[previous:end]
+            previous = end
+            if label in SITE_FIELDS:
+                try:
+                    site[SITE_FIELDS[label]] = _to_float(field)
+                except ValueError:
+                    site[SITE_FIELDS[label]] = np.nan
+        return {key: (None if np.isnan(value) else value) for key, value in site.items()}
+    return {}
+
+def read_wth(path):
+    """Parse a .WTH file into a WeatherFile
+    
+    Data lines are cut at the @DATE header's label extents (values are
+    right-aligned under their label; blank fields are missing). Lines inside the
+    data block that are not data (comments, end-of-file markers, flagged dates)
+    are kept verbatim in extras.
+    """
+    
+    path = Path(path)
+    weather = WeatherFile(path.name)
+    # latin-1 maps every byte to one character, so files are reproduced byte for byte
+    with open(path, 'r', encoding='latin-1', newline='') as f:
+        text = f.read()
+    
+    weather.newline = '\r\n' if '\r\n' in text else '\n'
+    weather.final_newline = text.endswith('\n')
+    lines = text.splitlines()
+    
+    date_line = next((i for i, line in enumerate(lines)
+                      if line.startswith('@') and line[1:].split()[:1] == ['DATE']), None)
+    if date_line is None:
+        weather.header = text
+        return weather
+    
+    weather.header = weather.newline.join(lines[:date_line + 1]) + weather.newline
+    weather.site = _parse_site(lines[:date_line])
+    labels = _label_extents(lines[date_line])
+    weather.date_digits = 7 if labels[0][1] >= 7 else 5
+    # Printable column names (a few archive headers carry control characters)
+    weather.columns = [''.join(c for c in label if c.isprintable()) for label, _ in labels[1:]]
+    if len(set(weather.columns)) != len(weather.columns):
+        raise ValueError(f"duplicate columns in {lines[date_line]!r}")
+    
+    labels = _data_extents(labels, lines[date_line + 1:date_line + 11])
+    
+    # Cut every data line at the header extents. Rows that are not aligned with
+    # the header, or carry quality flags ('18.7E'), are split on whitespace instead;
+    # anything else (comments, end-of-file markers) stays verbatim.
+    starts = [0] + [end for _, end in labels[:-1]]
+    ends = [end for _, end in labels[:-1]] + [None]
+    good, dates, columns = [], [], [[] for _ in weather.columns]
+    for line in lines[date_line + 1:]:
+        if not DATA_LINE.match(line):
+            weather.extras.append([len(good), line])
+            continue
+        try:
+            date = int(line[:ends[0]])
+            fields = [_to_float(line[start:end]) for start, end in zip(starts[1:], ends[1:])]
+        except ValueError:
+            tokens = [QUALITY_FLAG.sub('', token) for token in line.split()]
+            try:
+                if len(tokens) > len(labels):
+                    raise ValueError(line)
+                date = int(tokens[0])
+                fields = [float(token) for token in tokens[1:]]
+                fields += [np.nan] * (len(weather.columns) - len(fields))
+            except ValueError:
+                weather.extras.append([len(good), line])
+                continue
+        good.append(line)
+        dates.append(date)
+        for column, value in zip(columns, fields):
+            column.append(value)
+    
+    weather.days = yyddd_to_days(dates, weather.date_digits)
+    weather.values = {}
+    for name, column in zip(weather.columns, columns):
+        values = np.array(column, dtype=float)
+        values[values == -99] = np.nan
+        weather.values[name] = values
+    
+    # Output format of each column: width, most common decimals, missing token and
+    # whether values below 1 are written without the leading zero ('  .5')
+    for i, name in enumerate(weather.columns):
+        start, end = starts[i + 1], labels[i + 1][1]
+        tokens = [line[start:ends[i + 1]].strip() for line in good[:200]]
+        present = [t for t in tokens if t and not t.startswith('-99') and NUMBER.match(t)]
+        decimals = [_decimals(t) for t in present]
+        missing = [t for t in tokens if not t or t.startswith('-99')]
+        weather.formats[name] = [
+            end - start,
+            max(set(decimals), key=decimals.count) if decimals else 1,
+            max(set(missing), key=missing.count) if missing else '-99.0',
+            any(t.startswith(('.', '-.')) for t in present),
+        ]
+    
+    # Lines are either right-trimmed or padded to one common width
+    if any(line != line.rstrip() for line in good):
+        widths = [len(line) for line in good]
+        weather.line_width = max(set(widths), key=widths.count)
+    
+    # Rows the column formats do not reproduce (irregular spacing, odd decimals)
+    # keep their text, together with the values it was parsed to
+    for row, (line, text) in enumerate(zip(good, _format_rows(weather))):
+        if line != text:
+            weather.overrides.append([row, line, _row_values(weather, row)])
+    return weather
+
+def _row_values(weather, row):
+    """Date and values of one row as float32-rounded floats (None where missing)"""
+    
+    values = [float(weather.days[row])] + [float(np.float32(weather.values[name][row]))
+                                           for name in weather.columns]
+    return [None if np.isnan(value) else value for value in values]
+
+def _format_rows(weather):
+    """Data lines of a WeatherFile formatted with its column formats"""
+    
+    n = len(weather.days)
+    codes = days_to_yyddd(weather.days, weather.date_digits)
+    lines = np.char.mod(f"%0{weather.date_digits}d", codes) if n else np.zeros(0, dtype=str)
+    
+    for name in weather.columns:
+        width, decimals, token, bare = weather.formats[name]
+        values = np.asarray(weather.values[name], dtype=float)
+        text = np.char.mod(f"%{width}.{decimals}f", np.nan_to_num(values))
+        if bare:
+            text = np.char.replace(np.char.replace(text, ' 0.', '  .'), '-0.', ' -.')
+        text = np.where(np.isnan(values), token.rjust(width), text)
+        lines = np.char.add(lines, text)
+    
+    lines = np.char.rstrip(lines)
+    if weather.line_width:
+        lines = np.char.ljust(lines, weather.line_width)
+    
+    return lines.tolist()
+
+def render_wth(weather):
+    """Text of a WeatherFile in its original layout"""
+    
+    body = _format_rows(weather)
+    for row, text, values in weather.overrides:
+        if row < len(body) and _row_values(weather, row) == values:
+            body[row] = text
+    for position, text in reversed(weather.extras):
+        body.insert(position, text)
+    
+    text = weather.header + weather.newline.join(body)
+    if body and weather.final_newline:
+        text += weather.newline
+    return text
+
+def _atomic_write(path, text):
+    """Write through a temporary file in the target directory, then replace"""
+    
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}-{os.getpid()}")
+    with open(tmp, 'w', encoding='latin-1', newline='') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def write_wth(weather, path):
+    _atomic_write(path, render_wth(weather))
+
+def _dates_to_days(values):
+    """Mapping/Series of date -> value as a dict of days since 1970-01-01 -> float"""
+    
+    series = pd.Series(values, dtype=float).dropna()
+    days = (pd.DatetimeIndex(series.index).values.astype('datetime64[D]') - EPOCH).astype(np.int64)
+    return dict(zip(days.tolist(), series.to_numpy().tolist()))
+
+def _replace_field(line, start, end, value, decimals):
+    """Line with the field line[start:end] holding value, right-aligned at end
+    
+    The field keeps its width and at least one separating space: a value that
+    does not fit loses decimals first (1000.0 -> 1000. -> 1000 in a 6-wide
+    field); a value whose integer part does not fit raises ValueError.
+    """
+    
+    field = line[start:end]
+    candidates = [f"{value:.{places}f}" for places in range(decimals, 0, -1)]
+    candidates += [f"{value:.0f}.", f"{value:.0f}"]
+    for text in candidates:
+        if len(text) < len(field):
+            return line[:start] + text.rjust(len(field)) + line[end:]
+    raise ValueError(f"{value} does not fit the {len(field)}-character field '{field}'")
+
+def patch_wth(path, updates, out_path=None):
+    """Replace values of chosen columns of a .WTH file, leaving everything else as is
+    
+    The file is streamed line by line into a temporary file that then replaces
+    the target. Only the patched fields change: each new value is written
+    right-aligned in its field with the decimals of the value it replaces;
+    header, comments, other columns and line endings are copied verbatim.
+    Field widths never change, so every column stays under its header label:
+    a value too wide for its field is written with fewer decimals (e.g. SRAD
+    1000.0 becomes ' 1000.'), and one that does not fit even without decimals
+    raises ValueError and leaves the file unchanged.
+    
+    Args:
+        path: .WTH file
+        updates: Column -> mapping (dict or pandas Series) of date -> new value;
+                 NaN and dates not listed leave the field unchanged
+        out_path: Output file (default: rewrite path in place)
+    
+    Returns:
+        Dict of column -> number of patched values
+    """
+    
+    path = Path(path)
+    out_path = Path(out_path or path)
+    updates = {column: _dates_to_days(values) for column, values in updates.items()}
+    counts = {column: 0 for column in updates}
+    tmp = out_path.with_name(f".{out_path.name}-{os.getpid()}")
+    
+    try:
+        with open(path, 'r', encoding='latin-1', newline='') as source, \
+                open(tmp, 'w', encoding='latin-1', newline='') as target:
+            # Header: copied up to the @DATE line
+            labels = None
+            for line in source:
+                target.write(line)
+                if line.startswith('@') and line[1:].split()[:1] == ['DATE']:
+                    labels = _label_extents(line.rstrip('\r\n'))
+                    break
+            if labels is None:
+                raise ValueError(f"{path.name}: no @DATE line")
+            
+            columns = [label for label, _ in labels[1:]]
+            unknown = set(updates) - set(columns)
+            if unknown:
+                raise ValueError(f"{path.name}: no column {', '.join(sorted(unknown))}")
+            
+            # The first data lines fix the field extents; the rest is streamed
+            head = [line for _, line in zip(range(10), source)]
+            labels = _data_extents(labels, [line.rstrip('\r\n') for line in head])
+            digits = 7 if labels[0][1] >= 7 else 5
+            ends = [end for _, end in labels]
+            targets = sorted((columns.index(column) + 1, column) for column in updates)
+            decimals = {column: 1 for column in updates}
+            
+            for line in itertools.chain(head, source):
+                body = line.rstrip('\r\n')
+                if not DATA_LINE.match(body):
+                    target.write(line)
+                    continue
+                tokens = list(HEADER_LABEL.finditer(body))
+                day = _yyddd_day(int(tokens[0].group(0)), digits)
+                for index, column in targets:
+                    value = updates[column].get(day)
+                    # Fields are located by token when every field is filled (lines
+                    # offset from the header), else by the label extents
+                    if len(tokens) == len(labels):
+                        start, end = tokens[index - 1].end(), tokens[index].end()
+                    else:
+                        start, end = ends[index - 1], ends[index]
+                    old = body[start:end].strip()
+                    if '.' in old and not old.startswith('-99'):
+                        decimals[column] = _decimals(old)
+                    if value is None:
+                        continue
+                    try:
+                        body = _replace_field(body, start, end, value, decimals[column])
+                    except ValueError as e:
+                        raise ValueError(f"{path.name}, {tokens[0].group(0)} {column}: {e}") from None
+                    counts[column] += 1
+                target.write(body + line[len(line.rstrip('\r\n')):])
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    
+    os.replace(tmp, out_path)
+    return counts
+
+class WeatherStore:
+    """Weather variables of many .WTH files as one set of columnar arrays
+    
+    Attributes:
+        days: Date of every row (days since 1970-01-01, int32)
+        variables: Variable -> float32 array over all rows (NaN where missing or
+                   where the file has no such column)
+        files: Layout of each file (see WeatherFile.layout)
+        starts, stops: Row range of each file
+    """
+    
+    def __init__(self, days, variables, files, starts, stops):
+        self.days = days
+        self.variables = variables
+        self.files = files
+        self.starts = starts
+        self.stops = stops
+        self._file_index = {layout['name'].upper(): i for i, layout in enumerate(files)}
+        self._stations = {}
+        for i, layout in enumerate(files):
+            self._stations.setdefault(layout['name'][:4].upper(), []).append(i)
+    
+    @classmethod
+    def build(cls, weather_dir, pattern='*.WTH'):
+        """Parse every .WTH file of a directory"""
+        
+        paths = sorted(Path(weather_dir).glob(pattern))
+        parsed = []
+        for path in paths:
+            try:
+                parsed.append(read_wth(path))
+            except (OSError, ValueError) as e:
+                print(f"[WARNING] Skipping {path.name}: {e}")
+        return cls.from_files(parsed)
+    
+    @classmethod
+    def from_files(cls, weather_files):
+        names = sorted({name for weather in weather_files for name in weather.columns})
+        counts = [len(weather.days) for weather in weather_files]
+        stops = np.cumsum(counts, dtype=np.int64)
+        starts = stops - np.asarray(counts, dtype=np.int64)
+        total = int(stops[-1]) if len(stops) else 0
+        
+        days = np.zeros(total, dtype=np.int32)
+        variables = {name: np.full(total, np.nan, dtype=np.float32) for name in names}
+        files = []
+        for weather, start, stop in zip(weather_files, starts, stops):
+            # Rows of a file are sorted by date so date ranges are searchsorted slices
+            order = np.argsort(weather.days, kind='stable')
+            layout = weather.layout()
+            layout['order'] = None if np.all(order == np.arange(len(order))) else order.tolist()
+            days[start:stop] = weather.days[order]
+            for name in weather.columns:
+                variables[name][start:stop] = weather.values[name][order]
+            files.append(layout)
+        return cls(days, variables, files, starts, stops)
+    
+    def save(self, path):
+        """Write the store as one compressed .npz archive"""
+        
+        arrays = {f"var:{name}": values for name, values in self.variables.items()}
+        meta = json.dumps({'version': STORE_VERSION, 'files': self.files})
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, days=self.days, starts=self.starts, stops=self.stops,
+                                meta=np.array(meta), **arrays)
+    
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as archive:
+            meta = json.loads(str(archive['meta']))
+            if meta.get('version') != STORE_VERSION:
+                raise ValueError(f"{path}: unsupported weather store version {meta.get('version')}")
+            variables = {key[4:]: archive[key] for key in archive.files if key.startswith('var:')}
+            return cls(archive['days'], variables, meta['files'], archive['starts'], archive['stops'])
+    
+    @property
+    def stations(self):
+        return sorted(self._stations)
+    
+    @property
+    def file_names(self):
+        return [layout['name'] for layout in self.files]
+    
+    def file_slice(self, name):
+        """Rows of one file"""
+        
+        i = self._file_index[name.upper()]
+        return slice(int(self.starts[i]), int(self.stops[i]))
+    
+    def site(self, station):
+        """Site header values (LAT, LONG, ELEV, ...) of a station's first file"""
+        return self.files[self._stations[station.upper()][0]]['site']
+    
+    def station_rows(self, station, start=None, end=None):
+        """Row indices of a station, optionally limited to dates start..end (inclusive)
+        
+        Args:
+            station: Four-letter station code (e.g. 'UFGA')
+            start, end: Dates (anything np.datetime64 accepts, e.g. '1982-03-01')
+        """
+        
+        lo = None if start is None else (np.datetime64(start, 'D') - EPOCH).astype(np.int64)
+        hi = None if end is None else (np.datetime64(end, 'D') - EPOCH).astype(np.int64)
+        
+        rows = []
+        for i in self._stations.get(station.upper(), []):
+            first, last = int(self.starts[i]), int(self.stops[i])
+            days = self.days[first:last]
+            a = first + (np.searchsorted(days, lo, 'left') if lo is not None else 0)
+            b = first + (np.searchsorted(days, hi, 'right') if hi is not None else len(days))
+            if b > a:
+                rows.append(np.arange(a, b))
+        rows = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+        # Several files of one station may overlap; return rows in date order
+        return rows[np.argsort(self.days[rows], kind='stable')]
+    
+    def read(self, station, start=None, end=None, variables=None):
+        """DataFrame of DATE and weather variables of one station"""
+        
+        rows = self.station_rows(station, start, end)
+        frame = {'DATE': EPOCH + self.days[rows].astype(np.int64)}
+        for name in variables or self.variables:
+            frame[name] = self.variables[name][rows]
+        return pd.DataFrame(frame)
+    
+    def weather_file(self, name):
+        """WeatherFile of one stored file (arrays in the file's original row order)"""
+        
+        i = self._file_index[name.upper()]
+        layout = self.files[i]
+        rows = slice(int(self.starts[i]), int(self.stops[i]))
+        restore = slice(None) if layout.get('order') is None else np.argsort(layout['order'])
+        days = self.days[rows].astype(np.int64)[restore]
+        values = {column: self.variables[column][rows].astype(float)[restore]
+                  for column in layout['columns']}
+        return WeatherFile.from_layout(layout, days, values)
+    
+    def export(self, name, path):
+        """Regenerate one .WTH file"""
+        write_wth(self.weather_file(name), path)
+    
+    def export_all(self, out_dir, names=None):
+        """Regenerate .WTH files (all by default) into out_dir
+        
+        Returns:
+            List of written paths
+        """
+        
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for name in names or self.file_names:
+            path = out_dir / self.files[self._file_index[name.upper()]]['name']
+            self.export(name, path)
+            paths.append(path)
+        return paths
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Convert .WTH archives to a columnar store and back')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='Parse all .WTH files of a directory into a store')
+    build.add_argument('weather_dir')
+    build.add_argument('store')
+    export = commands.add_parser('export', help='Regenerate .WTH files from a store')
+    export.add_argument('store')
+    export.add_argument('out_dir')
+    export.add_argument('files', nargs='*')
+    args = parser.parse_args()
+    
+    if args.command == 'build':
+        store = WeatherStore.build(args.weather_dir)
+        if not store.files:
+            print(f"[ERROR] No .WTH files found in {args.weather_dir}")
+            return 1
+        store.save(args.store)
+        print(f"[OK] {len(store.files)} files, {len(store.days)} days, "
+              f"{len(store.variables)} variables -> {args.store}")
+    else:
+        store = WeatherStore.load(args.store)
+        paths = store.export_all(args.out_dir, args.files or None)
+        print(f"[OK] Wrote {len(paths)} .WTH files to {args.out_dir}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
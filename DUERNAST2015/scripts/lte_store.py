@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Duernast LTE Raw Table Store
+
+Purpose: Ingests the original long-term field experiment tables in
+         input/orignal data/.../data/0_raw (lte_duernast.V1_0_*.csv) once and
+         keeps them as analysis-ready tables:
+         
+         plots            - one row per plot and year: replicate, treatment
+                            (Pruefglied), crop, position
+         yields           - harvest date, variety and yield (Hp_Trockenmasse)
+         fertilization    - fertilizer events (Duengemittel, amount, N, P2O5, ...)
+         plant_protection - plant protection events (product, l/ha, kg/ha)
+         tillage          - soil tillage operations
+         sowing           - sowing date, variety and seed rate
+         plant_samples    - laboratory values of the plant samples
+         weather          - daily climate data (KLIMADATEN)
+         
+         The lookup tables (PARZELLE, PRUEFGLIED, FAKTOR1_STUFE, KULTUR, SORTE,
+         DUENGEMITTEL, ...) are joined in. Names become categorical columns,
+         dates datetime64 and IDs integers. Every event table carries year, plot,
+         replicate and treatment and is sorted by year, treatment and plot, so
+         the rows of one year and treatment are a slice found with searchsorted.
+         
+         The tables are stored column by column (Parquet when pyarrow is
+         installed, otherwise one .npz archive per table) next to a meta.json
+         holding the size and mtime of every source file. load_lte_store only
+         rebuilds the store when a source table changed.
+         
+         Usage:
+             python lte_store.py [raw_dir] [store_dir]
+"""
+
+import os
+import sys
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dssat_output_cache import COLUMNAR_FORMAT
+
+RAW_DIR = (Path(__file__).parent.parent / 'input' / 'orignal data'
+           / 'orignal data complete years duernast' / 'data' / '0_raw')
+STORE_DIR = Path(__file__).parent.parent / 'output' / 'lte_store'
+TABLE_PREFIX = 'lte_duernast.V1_0_'
+STORE_VERSION = 1
+
+# Raw tables read for the store (file name without prefix and .csv)
+RAW_TABLES = [
+    'VERSUCHSAUFBAU', 'PARZELLE', 'PRUEFGLIED', 'FAKTOR1_STUFE', 'KULTUR', 'SORTE',
+    'SAAT_PFLANZGUT', 'ERNTE', 'ERTRAG', 'DUENGUNG', 'DUENGEMITTEL', 'PFLANZENSCHUTZ',
+    'PFLANZENSCHUTZMITTEL', 'BODENBEARBEITUNG', 'BODENBEARBEITUNG_MASSNAHME', 'AUSSAAT',
+    'PROBENAHME_PFLANZEN', 'PFLANZENLABORWERTE', 'KLIMADATEN',
+]
+
+DATE_COLUMNS = ('Termin', 'Beginn', 'Ende')
+
+# Sort order (and index) of the event tables
+SORT_KEYS = ['Versuchsjahr', 'Pruefglied_ID', 'Parzelle_ID', 'Termin']
+
+def _parse_dates(series):
+    """ISO dates; a few rows of PARZELLE are written year-day-month"""
+    
+    dates = pd.to_datetime(series, errors='coerce', format='ISO8601')
+    swapped = pd.to_datetime(series, errors='coerce', format='%Y-%d-%m %H:%M:%S.%f')
+    return dates.fillna(swapped)
+
+def read_raw_table(name, raw_dir=RAW_DIR):
+    """One raw LTE table with parsed date columns"""
+    
+    frame = pd.read_csv(Path(raw_dir) / f"{TABLE_PREFIX}{name}.csv", encoding='utf-8-sig')
+    for column in DATE_COLUMNS:
+        if column in frame:
+            frame[column] = _parse_dates(frame[column])
+    return frame
+
+def _typed(frame):
+    """Text columns as categoricals, integer columns as int32"""
+    
+    frame = frame.copy()
+    for column in frame.columns:
+        kind = frame[column].dtype.kind
+        if kind in 'iu':
+            frame[column] = frame[column].astype(np.int32)
+        elif kind not in 'fMb':
+            frame[column] = frame[column].astype('category')
+    return frame
+
+def _sorted(frame):
+    keys = [key for key in SORT_KEYS if key in frame]
+    return frame.sort_values(keys, kind='stable').reset_index(drop=True)
+
+def build_tables(raw_dir=RAW_DIR):
+    """Join the raw tables into the analysis tables (see module docstring)
+    
+    Returns:
+        Dict of table name -> DataFrame
+    """
+    
+    raw = {name: read_raw_table(name, raw_dir) for name in RAW_TABLES}
+    
+    treatments = raw['PRUEFGLIED'].merge(raw['FAKTOR1_STUFE'], on='Faktor1_Stufe_ID')[
+        ['Pruefglied_ID', 'Beschreibung']].rename(columns={'Beschreibung': 'Pruefglied'})
+    crops = raw['KULTUR'][['Kultur_ID', 'Kultur']]
+    varieties = raw['SAAT_PFLANZGUT'].merge(raw['SORTE'], on='Sorte_ID')[
+        ['Saat_Pflanzgut_ID', 'Sorte', 'Kultur_ID']]
+    
+    plots = (raw['VERSUCHSAUFBAU']
+             .merge(raw['PARZELLE'].drop(columns='Pruefglied_ID'), on='Parzelle_ID', how='left')
+             .merge(treatments, on='Pruefglied_ID', how='left')
+             .merge(crops, on='Kultur_ID', how='left'))
+    
+    # Treatment and replicate of each plot and year (2018 lists two crops per plot)
+    plot_keys = plots[['Versuchsjahr', 'Parzelle_ID', 'Parzelle', 'Wiederholung', 'Pruefglied_ID',
+                       'Pruefglied']].drop_duplicates(['Versuchsjahr', 'Parzelle_ID'])
+    
+    def events(frame):
+        return frame.merge(plot_keys, on=['Versuchsjahr', 'Parzelle_ID'], how='left')
+    
+    tables = {
+        'plots': plots,
+        'yields': events(raw['ERNTE'].merge(raw['ERTRAG'], on='Ernte_ID', how='left')
+                         .merge(varieties, on='Saat_Pflanzgut_ID', how='left')
+                         .merge(crops, on='Kultur_ID', how='left')),
+        'fertilization': events(raw['DUENGUNG'].merge(
+            raw['DUENGEMITTEL'][['Duengemittel_ID', 'Name']].rename(columns={'Name': 'Duengemittel'}),
+            on='Duengemittel_ID', how='left')),
+        'plant_protection': events(raw['PFLANZENSCHUTZ'].merge(
+            raw['PFLANZENSCHUTZMITTEL'][['Pflanzenschutz_Mittel_ID', 'Name']].rename(
+                columns={'Name': 'Pflanzenschutzmittel'}), on='Pflanzenschutz_Mittel_ID', how='left')
+            .merge(crops, on='Kultur_ID', how='left')),
+        'tillage': events(raw['BODENBEARBEITUNG'].merge(
+            raw['BODENBEARBEITUNG_MASSNAHME'], on='Bodenbearbeitung_Massnahme_ID', how='left')),
+        'sowing': events(raw['AUSSAAT'].merge(varieties, on='Saat_Pflanzgut_ID', how='left')
+                         .merge(crops, on='Kultur_ID', how='left')),
+        'plant_samples': events(raw['PROBENAHME_PFLANZEN'].merge(
+            raw['PFLANZENLABORWERTE'], on='Probenahme_Pflanzen_ID', how='left')),
+        'weather': raw['KLIMADATEN'].sort_values('Termin').reset_index(drop=True),
+    }
+    return {name: _typed(_sorted(frame)) for name, frame in tables.items()}
+
+def _source_files(raw_dir):
+    return {name: Path(raw_dir) / f"{TABLE_PREFIX}{name}.csv" for name in RAW_TABLES}
+
+def _fingerprints(raw_dir):
+    return {name: [path.stat().st_size, path.stat().st_mtime_ns]
+            for name, path in _source_files(raw_dir).items()}
+
+class LteStore:
+    """Joined LTE tables with year/treatment slicing (see module docstring)"""
+    
+    def __init__(self, tables, sources=None):
+        self.tables = tables
+        self.sources = sources or {}
+    
+    @classmethod
+    def build(cls, raw_dir=RAW_DIR):
+        return cls(build_tables(raw_dir), _fingerprints(raw_dir))
+    
+    def __getitem__(self, name):
+        return self.tables[name]
+    
+    def save(self, store_dir=STORE_DIR, fmt=COLUMNAR_FORMAT):
+        """Write every table as a columnar file, then meta.json (atomic replace)"""
+        
+        store_dir = Path(store_dir)
+        store_dir.mkdir(parents=True, exist_ok=True)
+        meta = {'version': STORE_VERSION, 'format': fmt, 'sources': self.sources, 'tables': {}}
+        
+        for name, frame in self.tables.items():
+            file_name = f"{name}.{fmt}"
+            tmp = store_dir / f".{file_name}-{os.getpid()}"
+            categories = {column: frame[column].cat.categories.tolist()
+                          for column in frame.columns if isinstance(frame[column].dtype, pd.CategoricalDtype)}
+            if fmt == 'parquet':
+                frame.to_parquet(tmp, index=False)
+            else:
+                # Categoricals are stored as their codes; the categories go to meta.json
+                arrays = {column: (frame[column].cat.codes.to_numpy() if column in categories
+                                   else frame[column].to_numpy()) for column in frame.columns}
+                with open(tmp, 'wb') as f:
+                    np.savez_compressed(f, **arrays)
+            os.replace(tmp, store_dir / file_name)
+            meta['tables'][name] = {'file': file_name, 'columns': list(frame.columns),
+                                    'categories': categories}
+        
+        tmp = store_dir / f".meta-{os.getpid()}.json"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, store_dir / 'meta.json')
+    
+    @classmethod
+    def load(cls, store_dir=STORE_DIR):
+        store_dir = Path(store_dir)
+        with open(store_dir / 'meta.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        
+        tables = {}
+        for name, info in meta['tables'].items():
+            path = store_dir / info['file']
+            if meta['format'] == 'parquet':
+                tables[name] = pd.read_parquet(path)
+                continue
+            with np.load(path, allow_pickle=False) as archive:
+                columns = {}
+                for column in info['columns']:
+                    if column in info['categories']:
+                        columns[column] = pd.Categorical.from_codes(
+                            archive[column], categories=info['categories'][column])
+                    else:
+                        columns[column] = archive[column]
+            tables[name] = pd.DataFrame(columns, columns=info['columns'])
+        return cls(tables, meta['sources'])
+    
+    def query(self, table, year=None, treatment=None):
+        """Rows of an event table for one year and/or treatment (Pruefglied_ID)
+        
+        The tables are sorted by year and treatment, so both lookups are binary
+        searches returning a slice.
+        """
+        
+        frame = self.tables[table]
+        start, stop = 0, len(frame)
+        if year is not None:
+            years = frame['Versuchsjahr'].to_numpy()
+            start, stop = np.searchsorted(years, year, 'left'), np.searchsorted(years, year, 'right')
+        if treatment is not None:
+            if year is None:
+                return frame[frame['Pruefglied_ID'] == treatment].reset_index(drop=True)
+            treatments = frame['Pruefglied_ID'].to_numpy()[start:stop]
+            start, stop = (start + np.searchsorted(treatments, treatment, 'left'),
+                           start + np.searchsorted(treatments, treatment, 'right'))
+        return frame.iloc[start:stop].reset_index(drop=True)
+    
+    def yields(self, year=None, treatment=None):
+        return self.query('yields', year, treatment)
+    
+    def fertilization(self, year=None, treatment=None):
+        return self.query('fertilization', year, treatment)
+    
+    def plant_protection(self, year=None, treatment=None):
+        return self.query('plant_protection', year, treatment)
+    
+    def weather(self, start=None, end=None):
+        """Daily climate data between two dates (inclusive)"""
+        
+        frame = self.tables['weather']
+        dates = frame['Termin'].to_numpy()
+        lo = np.searchsorted(dates, np.datetime64(pd.Timestamp(start)), 'left') if start else 0
+        hi = np.searchsorted(dates, np.datetime64(pd.Timestamp(end)), 'right') if end else len(frame)
+        return frame.iloc[lo:hi].reset_index(drop=True)
+    
+    def mean_yields(self):
+        """Mean yield over the replicates: year x treatment (Pruefglied_ID)"""
+        return self.tables['yields'].pivot_table(index='Versuchsjahr', columns='Pruefglied_ID',
+                                                 values='Hp_Trockenmasse', aggfunc='mean')
+
+def load_lte_store(raw_dir=RAW_DIR, store_dir=STORE_DIR):
+    """Stored LTE tables, rebuilt from the raw CSVs when a source file changed"""
+    
+    meta_path = Path(store_dir) / 'meta.json'
+    if meta_path.exists():
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if (meta.get('version') == STORE_VERSION and meta.get('format') == COLUMNAR_FORMAT
+                    and meta.get('sources') == _fingerprints(raw_dir)):
+                return LteStore.load(store_dir)
+        except (OSError, ValueError, KeyError):
+            pass
+    
+    print(f"[INFO] Building LTE store from {raw_dir}")
+    store = LteStore.build(raw_dir)
+    store.save(store_dir)
+    return store
+
+def main():
+    raw_dir = Path(sys.argv[1]) if len(sys.argv) > 1 else RAW_DIR
+    store_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else STORE_DIR
+    if not (raw_dir / f"{TABLE_PREFIX}ERTRAG.csv").exists():
+        print(f"[ERROR] No LTE tables in {raw_dir}")
+        return 1
+    
+    store = LteStore.build(raw_dir)
+    store.save(store_dir)
+    for name, frame in store.tables.items():
+        print(f"  {name:<17} {len(frame):>6} rows")
+    print(f"[OK] LTE store written to {store_dir}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
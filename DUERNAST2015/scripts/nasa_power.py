@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+NASA POWER Daily Data Fetcher
+
+Purpose: Downloads daily NASA POWER data (ALLSKY_SFC_SW_DWN and any other
+         parameter of the AG community) for many (lat, lon, year) requests at
+         once, e.g. every season 2015-2022 of the Duernast site or a grid of
+         points. Requests run concurrently on an asyncio event loop (at most
+         `concurrency` at a time); the blocking urllib calls run in worker
+         threads. Failed requests (connection errors, timeouts, HTTP 429/5xx)
+         are retried with exponential backoff.
+         
+         Every response is stored as JSON in an on-disk cache (.power_cache/)
+         under a key of its request parameters, so a request that was answered
+         once is never sent again. The base URL can point at a local HTTP server
+         serving the same API for offline runs.
+         
+         Usage:
+             python nasa_power.py [--lat 48.403 --lon 11.691] [--years 2015-2022]
+             python nasa_power.py --grid 47.5 49.5 10.5 12.5 0.5 --years 2015-2022
+             python nasa_power.py --parameters ALLSKY_SFC_SW_DWN T2MDEW WS2M --url http://localhost:8000/point
+"""
+
+import os
+import sys
+import json
+import random
+import asyncio
+import hashlib
+import urllib.error
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+POWER_URL = "https://power.larc.nasa.gov/api/temporal/daily/point"
+CACHE_DIR = Path(__file__).parent.parent / '.power_cache'
+
+# Duernast, Freising (see reference scripts/download_nasa_power_radiation.py)
+LATITUDE = 48.403
+LONGITUDE = 11.691
+
+DEFAULT_PARAMETERS = ('ALLSKY_SFC_SW_DWN',)
+COMMUNITY = 'AG'
+POWER_MISSING = -999
+
+# Requests in flight at once, attempts per request (at least 1) and the first retry delay (s)
+CONCURRENCY = 4
+RETRIES = 4
+BACKOFF = 2.0
+TIMEOUT = 60
+
+# HTTP status codes worth retrying (rate limit, server errors)
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+def request_params(lat, lon, year, parameters=DEFAULT_PARAMETERS, community=COMMUNITY):
+    """Query parameters of one daily point request (one calendar year)"""
+    return {
+        'parameters': ','.join(parameters),
+        'community': community,
+        'longitude': f"{lon:.4f}",
+        'latitude': f"{lat:.4f}",
+        'start': f"{year}0101",
+        'end': f"{year}1231",
+        'format': 'JSON',
+    }
+
+def cache_path(params, cache_dir=CACHE_DIR):
+    """Cache file of a request: readable prefix plus a hash of all parameters"""
+    
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+    name = f"{params['latitude']}_{params['longitude']}_{params['start'][:4]}_{digest}.json"
+    return Path(cache_dir) / name
+
+def _read_cache(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_cache(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}-{os.getpid()}")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+def _get_json(url, timeout):
+    """Blocking GET (runs in a worker thread)"""
+    
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+class PowerFetcher:
+    """Concurrent, cached NASA POWER downloads (see module docstring)"""
+    
+    def __init__(self, base_url=POWER_URL, cache_dir=CACHE_DIR, parameters=DEFAULT_PARAMETERS,
+                 community=COMMUNITY, concurrency=CONCURRENCY, retries=RETRIES, backoff=BACKOFF,
+                 timeout=TIMEOUT):
+        if retries < 1:
+            raise ValueError(f"retries must be at least 1 (got {retries})")
+        self.base_url = base_url
+        self.cache_dir = Path(cache_dir)
+        self.parameters = tuple(parameters)
+        self.community = community
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.downloaded = 0
+        self.cached = 0
+    
+    async def _download(self, params, semaphore):
+        url = f"{self.base_url}?{urllib.parse.urlencode(params)}"
+        for attempt in range(self.retries):
+            async with semaphore:
+                try:
+                    return await asyncio.to_thread(_get_json, url, self.timeout)
+                except urllib.error.HTTPError as e:
+                    if e.code not in RETRY_STATUS or attempt == self.retries - 1:
+                        raise
+                    error = e
+                except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+                    if attempt == self.retries - 1:
+                        raise
+                    error = e
+            delay = self.backoff * 2 ** attempt * (1 + random.random() / 2)
+            print(f"[WARNING] {params['latitude']}, {params['longitude']} {params['start'][:4]}: "
+                  f"{error}; retrying in {delay:.1f} s")
+            await asyncio.sleep(delay)
+    
+    async def _fetch_one(self, lat, lon, year, semaphore):
+        params = request_params(lat, lon, year, self.parameters, self.community)
+        path = cache_path(params, self.cache_dir)
+        data = _read_cache(path)
+        if data is not None:
+            self.cached += 1
+            return data
+        
+        data = await self._download(params, semaphore)
+        if 'properties' not in data:
+            raise ValueError(f"Unexpected response: {str(data)[:200]}")
+        _write_cache(path, data)
+        self.downloaded += 1
+        return data
+    
+    async def fetch_async(self, requests):
+        """Responses of (lat, lon, year) requests; failed requests are left out
+        
+        Returns:
+            Dict of (lat, lon, year) -> POWER JSON response
+        """
+        
+        semaphore = asyncio.Semaphore(self.concurrency)
+        requests = list(dict.fromkeys(requests))
+        results = await asyncio.gather(*(self._fetch_one(lat, lon, year, semaphore)
+                                         for lat, lon, year in requests), return_exceptions=True)
+        
+        responses = {}
+        for request, result in zip(requests, results):
+            if isinstance(result, BaseException):
+                print(f"[ERROR] {request}: {result}")
+            else:
+                responses[request] = result
+        return responses
+    
+    def fetch(self, requests):
+        """Blocking wrapper of fetch_async"""
+        return asyncio.run(self.fetch_async(requests))
+
+def _unit_key(unit):
+    return unit.replace(' ', '').replace('²', '^2').lower()
+
+def power_frame(data, units=None):
+    """Daily values of a POWER response: DataFrame indexed by date, NaN for missing
+    
+    Args:
+        data: POWER JSON response
+        units: Parameter -> expected unit (e.g. 'MJ/m^2/day'); a parameter the
+               response reports in another unit raises ValueError
+    """
+    
+    parameters = data['properties']['parameter']
+    reported = data.get('parameters', {})
+    for name, unit in (units or {}).items():
+        found = reported.get(name, {}).get('units')
+        if name in parameters and found is not None and _unit_key(found) != _unit_key(unit):
+            raise ValueError(f"{name} is reported in {found}, expected {unit}")
+    fill = data.get('header', {}).get('fill_value', POWER_MISSING)
+    frame = pd.DataFrame(parameters, dtype=float)
+    frame.index = pd.to_datetime(frame.index, format='%Y%m%d')
+    return frame.where(frame != fill).sort_index()
+
+def fetch_power(requests, **options):
+    """Daily POWER data of many (lat, lon, year) requests
+    
+    Args:
+        requests: Iterable of (lat, lon, year)
+        **options: PowerFetcher arguments (base_url, cache_dir, parameters, concurrency, ...)
+    
+    Returns:
+        Dict of (lat, lon, year) -> DataFrame (see power_frame)
+    """
+    
+    responses = PowerFetcher(**options).fetch(requests)
+    return {request: power_frame(data) for request, data in responses.items()}
+
+def _years(text):
+    first, _, last = text.partition('-')
+    return list(range(int(first), int(last or first) + 1))
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Download daily NASA POWER data for many sites and years')
+    parser.add_argument('--lat', type=float, default=LATITUDE)
+    parser.add_argument('--lon', type=float, default=LONGITUDE)
+    parser.add_argument('--grid', type=float, nargs=5, metavar=('LAT0', 'LAT1', 'LON0', 'LON1', 'STEP'),
+                        help='All points of a lat/lon grid instead of --lat/--lon')
+    parser.add_argument('--years', default='2015-2022', help='Year or range, e.g. 2015-2022')
+    parser.add_argument('--parameters', nargs='+', default=list(DEFAULT_PARAMETERS))
+    parser.add_argument('--url', default=POWER_URL, help='API endpoint (e.g. a local stand-in server)')
+    parser.add_argument('--cache', default=str(CACHE_DIR))
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    args = parser.parse_args()
+    
+    if args.grid:
+        lat0, lat1, lon0, lon1, step = args.grid
+        points = [(round(lat, 4), round(lon, 4))
+                  for lat in np.arange(lat0, lat1 + step / 2, step)
+                  for lon in np.arange(lon0, lon1 + step / 2, step)]
+    else:
+        points = [(args.lat, args.lon)]
+    requests = [(lat, lon, year) for lat, lon in points for year in _years(args.years)]
+    
+    fetcher = PowerFetcher(args.url, args.cache, args.parameters, concurrency=args.concurrency)
+    responses = fetcher.fetch(requests)
+    print(f"[OK] {len(responses)}/{len(requests)} requests: {fetcher.downloaded} downloaded, "
+          f"{fetcher.cached} from cache ({args.cache})")
+    return 0 if len(responses) == len(requests) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -17,18 +17,27 @@ Coordinates: 48.403°N, 11.691°E
 Year: 2015
 """
 
-import requests
+import sys
 import json
+import shutil
+from pathlib import Path
 from datetime import datetime, timedelta
 
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from dssat_weather import EPOCH, patch_wth, read_wth
+from nasa_power import PowerFetcher, power_frame, POWER_URL, CACHE_DIR
+from weather_stats import compare, seasonal_stats
+
 # Site Information
 SITE_NAME = "Duernast"
 LATITUDE = 48.403
 LONGITUDE = 11.691
 YEAR = 2015
 
-# NASA POWER API Configuration
-NASA_POWER_URL = "https://power.larc.nasa.gov/api/temporal/daily/point"
+# NASA POWER API Configuration (responses are cached in .power_cache/ by nasa_power.py)
+NASA_POWER_URL = POWER_URL
 
 def download_nasa_power_radiation(lat, lon, year):
     """
@@ -56,99 +65,74 @@ def download_nasa_power_radiation(lat, lon, year):
     print(f"Year: {year}")
     print(f"Parameter: ALLSKY_SFC_SW_DWN (All-Sky Surface Shortwave Downward Irradiance)")
     
-    # API Parameters
-    params = {
-        'parameters': 'ALLSKY_SFC_SW_DWN',  # All-sky surface shortwave downward irradiance
-        'community': 'AG',                   # Agricultural community
-        'longitude': lon,
-        'latitude': lat,
-        'start': f'{year}0101',
-        'end': f'{year}1231',
-        'format': 'JSON'
-    }
-    
     print(f"\nContacting NASA POWER API...")
     print(f"URL: {NASA_POWER_URL}")
     
     try:
-        response = requests.get(NASA_POWER_URL, params=params, timeout=60)
-        response.raise_for_status()
-        
-        data = response.json()
+        # Cached years are read from .power_cache/; downloads are retried with backoff
+        fetcher = PowerFetcher(NASA_POWER_URL, CACHE_DIR, parameters=('ALLSKY_SFC_SW_DWN',))
+        responses = fetcher.fetch([(lat, lon, year)])
         
-        # Extract radiation data
-        if 'properties' in data and 'parameter' in data['properties']:
-            srad_data = data['properties']['parameter']['ALLSKY_SFC_SW_DWN']
+        if (lat, lon, year) in responses:
+            # NASA POWER provides MJ/m²/day, which is what DSSAT needs
+            srad = power_frame(responses[(lat, lon, year)],
+                               {'ALLSKY_SFC_SW_DWN': 'MJ/m^2/day'})['ALLSKY_SFC_SW_DWN']
+            print(f"[OK] {fetcher.downloaded} downloaded, {fetcher.cached} from cache")
             
-            # Convert to DOY format
-            radiation_by_doy = {}
-            start_date = datetime(year, 1, 1)
+            # Convert to DOY format; missing days become -99 (DSSAT missing code)
+            radiation_by_doy = {date.dayofyear: float(value) for date, value in srad.fillna(-99.0).items()}
             
-            for date_str, srad_value in srad_data.items():
-                try:
-                    date = datetime.strptime(date_str, '%Y%m%d')
-                    doy = date.timetuple().tm_yday
-                    
-                    # NASA POWER provides MJ/m²/day, which is what DSSAT needs
-                    if srad_value is not None and srad_value != -999:
-                        radiation_by_doy[doy] = float(srad_value)
-                    else:
-                        # Fill missing with -99 (DSSAT missing code)
-                        radiation_by_doy[doy] = -99.0
-                except:
-                    continue
+            print(f"\n[SUCCESS] Retrieved {len(radiation_by_doy)} days of radiation data")
             
-            print(f"\n[SUCCESS] Downloaded {len(radiation_by_doy)} days of radiation data")
-            
-            # Statistics
-            valid_values = [v for v in radiation_by_doy.values() if v > 0]
-            if valid_values:
+            # Statistics (days with SRAD > 0)
+            frame = pd.DataFrame({
+                'STATION': SITE_NAME,
+                'DATE': pd.to_datetime([f"{year}{doy:03d}" for doy in radiation_by_doy], format='%Y%j'),
+                'SRAD': list(radiation_by_doy.values()),
+            })
+            frame['SRAD'] = frame['SRAD'].where(frame['SRAD'] > 0)
+            stats = seasonal_stats(frame).loc[(SITE_NAME, year)]
+            if 'Annual' in stats.index:
+                annual = stats.loc['Annual']
                 print(f"\nData Quality:")
-                print(f"  Valid records: {len(valid_values)}/{len(radiation_by_doy)} days")
-                print(f"  Mean SRAD: {sum(valid_values)/len(valid_values):.2f} MJ/m²/day")
-                print(f"  Min SRAD: {min(valid_values):.2f} MJ/m²/day")
-                print(f"  Max SRAD: {max(valid_values):.2f} MJ/m²/day")
-                
-                # Seasonal averages
-                winter = [radiation_by_doy.get(d, 0) for d in range(1, 90) if radiation_by_doy.get(d, 0) > 0]
-                spring = [radiation_by_doy.get(d, 0) for d in range(90, 182) if radiation_by_doy.get(d, 0) > 0]
-                summer = [radiation_by_doy.get(d, 0) for d in range(182, 274) if radiation_by_doy.get(d, 0) > 0]
-                fall = [radiation_by_doy.get(d, 0) for d in range(274, 366) if radiation_by_doy.get(d, 0) > 0]
+                print(f"  Valid records: {int(annual['count'])}/{len(radiation_by_doy)} days")
+                print(f"  Mean SRAD: {annual['mean']:.2f} MJ/m²/day")
+                print(f"  Min SRAD: {annual['min']:.2f} MJ/m²/day")
+                print(f"  Max SRAD: {annual['max']:.2f} MJ/m²/day")
                 
+                labels = {'Winter': 'Winter (Jan-Mar)', 'Spring': 'Spring (Apr-Jun)',
+                          'Summer': 'Summer (Jul-Sep)', 'Fall': 'Fall (Oct-Dec)',
+                          'Growing season': 'Growing Season (Mar 18 - Aug 25)'}
                 print(f"\nSeasonal Averages:")
-                if winter: print(f"  Winter (Jan-Mar): {sum(winter)/len(winter):.2f} MJ/m²/day")
-                if spring: print(f"  Spring (Apr-Jun): {sum(spring)/len(spring):.2f} MJ/m²/day")
-                if summer: print(f"  Summer (Jul-Sep): {sum(summer)/len(summer):.2f} MJ/m²/day")
-                if fall: print(f"  Fall (Oct-Dec): {sum(fall)/len(fall):.2f} MJ/m²/day")
-                
-                # Growing season (DOY 77-237: Mar 18 - Aug 25)
-                growing_season = [radiation_by_doy.get(d, 0) for d in range(77, 238) if radiation_by_doy.get(d, 0) > 0]
-                if growing_season:
-                    print(f"  Growing Season (Mar 18 - Aug 25): {sum(growing_season)/len(growing_season):.2f} MJ/m²/day")
+                for period, label in labels.items():
+                    if period in stats.index:
+                        print(f"  {label}: {stats.loc[period, 'mean']:.2f} MJ/m²/day")
             
             return radiation_by_doy
             
         else:
-            print("[ERROR] Unexpected data format from NASA POWER API")
+            print("[ERROR] Failed to download data from NASA POWER API")
             return None
             
-    except requests.exceptions.RequestException as e:
-        print(f"[ERROR] Failed to download data: {e}")
-        return None
     except Exception as e:
         print(f"[ERROR] Error processing data: {e}")
         return None
 
-def update_weather_file(wth_file, radiation_data):
+def update_weather_file(wth_file, radiation_data, year=YEAR):
     """
     Update DSSAT weather file with NASA POWER radiation data
     
+    Only the SRAD field of each day is replaced (fixed width kept); all other
+    columns (DEWP, WIND, PAR, EVAP, RHUM, ...) stay as they are.
+    
     Parameters:
     -----------
     wth_file : str
         Path to DSSAT weather file (.WTH)
     radiation_data : dict
         Dictionary of {DOY: SRAD} values
+    year : int
+        Year of the DOYs
     """
     
     print(f"\n{'='*80}")
@@ -157,53 +141,17 @@ def update_weather_file(wth_file, radiation_data):
     print(f"\nFile: {wth_file}")
     
     try:
-        with open(wth_file, 'r') as f:
-            lines = f.readlines()
-        
         # Backup original file
         backup_file = wth_file.replace('.WTH', '_HARGREAVES_BACKUP.WTH')
-        with open(backup_file, 'w') as f:
-            f.writelines(lines)
+        shutil.copyfile(wth_file, backup_file)
         print(f"[OK] Backup created: {backup_file}")
         
-        # Find data section start
-        data_start = -1
-        for i, line in enumerate(lines):
-            if line.startswith('@DATE'):
-                data_start = i + 1
-                break
-        
-        if data_start == -1:
-            print("[ERROR] Could not find data section in weather file")
-            return False
+        # Missing days (-99) keep their current value
+        srad = {datetime(year, 1, 1) + timedelta(days=doy - 1): value
+                for doy, value in radiation_data.items() if value != -99}
+        counts = patch_wth(wth_file, {'SRAD': srad})
         
-        # Update radiation values
-        updated_count = 0
-        for i in range(data_start, len(lines)):
-            if lines[i].strip() and not lines[i].startswith('*'):
-                parts = lines[i].split()
-                if len(parts) >= 5:
-                    try:
-                        date_code = int(parts[0])
-                        doy = date_code % 1000
-                        
-                        if doy in radiation_data:
-                            # Replace SRAD value (column 2, index 1)
-                            old_srad = float(parts[1])
-                            new_srad = radiation_data[doy]
-                            parts[1] = f"{new_srad:5.1f}"
-                            
-                            # Reconstruct line
-                            lines[i] = f"{parts[0]:>5}  {parts[1]:>4}  {parts[2]:>4}  {parts[3]:>4}  {parts[4]:>4}\n"
-                            updated_count += 1
-                    except:
-                        continue
-        
-        # Write updated file
-        with open(wth_file, 'w') as f:
-            f.writelines(lines)
-        
-        print(f"[SUCCESS] Updated {updated_count} days of radiation data")
+        print(f"[SUCCESS] Updated {counts['SRAD']} days of radiation data")
         print(f"[OK] Weather file saved: {wth_file}")
         
         return True
@@ -222,37 +170,19 @@ def compare_hargreaves_vs_nasa(wth_file_backup, wth_file_nasa):
     print(f"{'='*80}")
     
     try:
-        # Read Hargreaves data
-        hargreaves_srad = []
-        with open(wth_file_backup, 'r') as f:
-            for line in f:
-                if line.strip() and not line.startswith(('*', '@', '!')):
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        try:
-                            srad = float(parts[1])
-                            if srad > 0:
-                                hargreaves_srad.append(srad)
-                        except:
-                            continue
-        
-        # Read NASA data
-        nasa_srad = []
-        with open(wth_file_nasa, 'r') as f:
-            for line in f:
-                if line.strip() and not line.startswith(('*', '@', '!')):
-                    parts = line.split()
-                    if len(parts) >= 2:
-                        try:
-                            srad = float(parts[1])
-                            if srad > 0:
-                                nasa_srad.append(srad)
-                        except:
-                            continue
+        # Daily SRAD of both files (days with SRAD > 0), compared on common days
+        frames = []
+        for path in (wth_file_backup, wth_file_nasa):
+            weather = read_wth(path)
+            srad = pd.Series(weather.values['SRAD'])
+            frames.append(pd.DataFrame({'STATION': SITE_NAME, 'DATE': EPOCH + weather.days,
+                                        'SRAD': srad.where(srad > 0)}))
+        stats = compare(frames[1], frames[0], 'SRAD', by=('STATION',))
         
-        if hargreaves_srad and nasa_srad:
-            hargreaves_mean = sum(hargreaves_srad) / len(hargreaves_srad)
-            nasa_mean = sum(nasa_srad) / len(nasa_srad)
+        if len(stats):
+            row = stats.iloc[0]
+            hargreaves_mean = row['ESTIMATE']
+            nasa_mean = row['REFERENCE']
             
             difference = nasa_mean - hargreaves_mean
             percent_diff = (difference / hargreaves_mean) * 100
@@ -261,6 +191,7 @@ def compare_hargreaves_vs_nasa(wth_file_backup, wth_file_nasa):
             print(f"  Hargreaves Estimate: {hargreaves_mean:.2f} MJ/m²/day")
             print(f"  NASA POWER:          {nasa_mean:.2f} MJ/m²/day")
             print(f"  Difference:          {difference:+.2f} MJ/m²/day ({percent_diff:+.1f}%)")
+            print(f"  RMSE:                {row['RMSE']:.2f} MJ/m²/day (r = {row['R']:.2f}, {int(row['N'])} days)")
             
             if percent_diff > 0:
                 print(f"\n NASA POWER radiation is HIGHER by {percent_diff:.1f}%")
@@ -316,6 +247,5 @@ def main():
     return 0
 
 if __name__ == '__main__':
-    import sys
     sys.exit(main())
 
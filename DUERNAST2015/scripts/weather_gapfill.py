@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+NASA POWER Gap-Filling for DSSAT Weather Files
+
+Purpose: Fills the missing values (-99) of .WTH files with NASA POWER daily data,
+         for every weather variable POWER provides (SRAD, TMAX, TMIN, RAIN, DEWP,
+         WIND, PAR, EVAP, RHUM), e.g. the DEWP, WIND, PAR and EVAP columns of
+         input/TUDU1501.WTH, which are all -99.
+         
+         A batch (a single file or the whole DSSAT48/Weather directory) is parsed
+         first, then the POWER series of every (site, year) with gaps are fetched
+         in one concurrent, cached batch (nasa_power.py). Each file is then filled
+         in one vectorized pass: its dates index the POWER frame and every missing
+         value of a column is replaced by the converted POWER value of that day.
+         Columns the file does not have (e.g. DEWP, WIND in a four-variable file)
+         can be appended. The files are written back in their original layout
+         (dssat_weather.render_wth).
+         
+         Usage:
+             python weather_gapfill.py ../input/TUDU1501.WTH --out ../input
+             python weather_gapfill.py ../../DSSAT48/Weather --out filled --add DEWP WIND RHUM
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dssat_weather import EPOCH, read_wth, write_wth
+from nasa_power import PowerFetcher, power_frame, POWER_URL, CACHE_DIR
+
+# .WTH variable -> (POWER parameter, POWER unit, factor to DSSAT units)
+#   WIND: m/s -> km/day; PAR: W/m2 -> mol/m2/day (4.57 umol/J); EVAP: POWER land
+#   evaporation (kg/m2/s * 10^6 -> mm/day, x 86400 s/day / 10^6), the closest POWER
+#   quantity to pan evaporation
+POWER_VARIABLES = {
+    'SRAD': ('ALLSKY_SFC_SW_DWN', 'MJ/m^2/day', 1.0),
+    'TMAX': ('T2M_MAX', 'C', 1.0),
+    'TMIN': ('T2M_MIN', 'C', 1.0),
+    'RAIN': ('PRECTOTCORR', 'mm/day', 1.0),
+    'DEWP': ('T2MDEW', 'C', 1.0),
+    'WIND': ('WS2M', 'm/s', 86.4),
+    'PAR': ('ALLSKY_SFC_PAR_TOT', 'W/m^2', 0.0864 * 4.57),
+    'EVAP': ('EVLAND', 'kg/m^2/s * 10^6', 0.0864),
+    'RHUM': ('RH2M', '%', 1.0),
+}
+
+# POWER parameter -> unit the conversion factors above expect
+POWER_UNITS = {parameter: unit for parameter, unit, _ in POWER_VARIABLES.values()}
+
+# Width and decimals of appended (or entirely missing) columns
+COLUMN_FORMATS = {'SRAD': (6, 1), 'TMAX': (6, 1), 'TMIN': (6, 1), 'RAIN': (6, 1), 'DEWP': (6, 1),
+                  'WIND': (6, 0), 'PAR': (6, 1), 'EVAP': (6, 1), 'RHUM': (6, 1)}
+
+# First year of the POWER daily record
+POWER_FIRST_YEAR = 1981
+
+def add_column(weather, name):
+    """Append an all-missing column to a WeatherFile (and its @DATE header label)"""
+    
+    if name in weather.columns:
+        return
+    width, decimals = COLUMN_FORMATS[name]
+    lines = weather.header.split(weather.newline)
+    # The header ends with the @DATE line and a newline
+    lines[-2] = lines[-2].rstrip() + name.rjust(width)
+    weather.header = weather.newline.join(lines)
+    weather.columns.append(name)
+    weather.values[name] = np.full(len(weather.days), np.nan)
+    weather.formats[name] = [width, decimals, '-99', False]
+    weather.line_width = None
+
+def _years(weather):
+    if not len(weather.days):
+        return []
+    years = (EPOCH + weather.days).astype('datetime64[Y]').astype(np.int64) + 1970
+    last = pd.Timestamp.today().year
+    return [int(year) for year in np.unique(years) if POWER_FIRST_YEAR <= year <= last]
+
+def _location(weather):
+    lat, lon = weather.site.get('LAT'), weather.site.get('LONG')
+    if lat is None or lon is None or -99 in (lat, lon):
+        return None
+    return round(lat, 4), round(lon, 4)
+
+def fill_weather(weather, power, variables=None):
+    """Replace missing values of a WeatherFile with POWER data (in place)
+    
+    Args:
+        weather: WeatherFile
+        power: DataFrame of POWER parameters indexed by date (see power_frame)
+        variables: .WTH variables to fill (default: every POWER_VARIABLES column of the file)
+    
+    Returns:
+        Dict of variable -> number of filled values
+    """
+    
+    variables = [name for name in (variables or POWER_VARIABLES) if name in weather.columns]
+    dates = pd.DatetimeIndex(EPOCH + weather.days)
+    filled = {}
+    for name in variables:
+        parameter, _, factor = POWER_VARIABLES[name]
+        if parameter not in power:
+            continue
+        values = weather.values[name]
+        source = power[parameter].reindex(dates).to_numpy(dtype=float) * factor
+        missing = np.isnan(values) & ~np.isnan(source)
+        if missing.any() and np.isnan(values).all():
+            # Decimals of an all-missing column were not seen in the file
+            weather.formats[name][1] = COLUMN_FORMATS[name][1]
+        values[missing] = source[missing]
+        filled[name] = int(missing.sum())
+    return filled
+
+def gapfill_files(paths, out_dir, variables=None, add=(), base_url=POWER_URL, cache_dir=CACHE_DIR,
+                  **options):
+    """Gap-fill a batch of .WTH files with one concurrent POWER download
+    
+    Args:
+        paths: .WTH files
+        out_dir: Output directory (may be the input directory)
+        variables: .WTH variables to fill (default: all of POWER_VARIABLES)
+        add: Variables appended to files that lack them
+        **options: Further PowerFetcher arguments (concurrency, retries, ...)
+    
+    Returns:
+        Dict of file name -> {variable: filled values}
+    """
+    
+    variables = list(variables or POWER_VARIABLES)
+    weather_files = []
+    for path in map(Path, paths):
+        try:
+            weather = read_wth(path)
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Skipping {path.name}: {e}")
+            continue
+        for name in add:
+            add_column(weather, name)
+        if _location(weather) is None:
+            print(f"[WARNING] Skipping {path.name}: no site coordinates")
+            continue
+        gaps = [name for name in variables
+                if name in weather.columns and np.isnan(weather.values[name]).any()]
+        if gaps:
+            weather_files.append(weather)
+    
+    parameters = [POWER_VARIABLES[name][0] for name in POWER_VARIABLES if name in variables]
+    requests = sorted({(*_location(weather), year)
+                       for weather in weather_files for year in _years(weather)})
+    fetcher = PowerFetcher(base_url, cache_dir, parameters, **options)
+    responses = fetcher.fetch(requests)
+    print(f"[INFO] POWER: {fetcher.downloaded} downloaded, {fetcher.cached} from cache, "
+          f"{len(requests) - len(responses)} failed")
+    
+    frames = {}
+    for request, data in responses.items():
+        try:
+            frames[request] = power_frame(data, POWER_UNITS)
+        except ValueError as e:
+            print(f"[ERROR] {request}: {e}")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    report = {}
+    for weather in weather_files:
+        location = _location(weather)
+        years = [frames[(*location, year)] for year in _years(weather) if (*location, year) in frames]
+        if not years:
+            continue
+        report[weather.name] = fill_weather(weather, pd.concat(years), variables)
+        write_wth(weather, out_dir / weather.name)
+    return report
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Fill missing .WTH values with NASA POWER data')
+    parser.add_argument('paths', nargs='+', help='.WTH files or directories')
+    parser.add_argument('--out', required=True, help='Output directory (may be the input directory)')
+    parser.add_argument('--variables', nargs='+', choices=list(POWER_VARIABLES),
+                        help='Variables to fill (default: all)')
+    parser.add_argument('--add', nargs='+', default=[], choices=list(POWER_VARIABLES),
+                        help='Append these columns to files that lack them')
+    parser.add_argument('--url', default=POWER_URL)
+    parser.add_argument('--cache', default=str(CACHE_DIR))
+    args = parser.parse_args()
+    
+    paths = []
+    for path in map(Path, args.paths):
+        paths.extend(sorted(path.glob('*.WTH')) if path.is_dir() else [path])
+    if not paths:
+        print("[ERROR] No .WTH files found")
+        return 1
+    
+    report = gapfill_files(paths, args.out, args.variables, args.add, args.url, args.cache)
+    for name, filled in report.items():
+        counts = ', '.join(f"{variable} {count}" for variable, count in filled.items() if count)
+        print(f"  {name:<14} {counts or 'nothing to fill'}")
+    print(f"[OK] {len(report)} of {len(paths)} files gap-filled -> {args.out}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
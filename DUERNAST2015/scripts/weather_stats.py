@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Weather Statistics and Radiation Comparison
+
+Purpose: Vectorized statistics over many stations and years of daily weather
+         data (a WeatherStore, a directory of .WTH files or NASA POWER series):
+         
+         seasonal_stats   - count, mean, min and max per station, year and period
+                            (Winter Jan-Mar, Spring Apr-Jun, Summer Jul-Sep,
+                            Fall Oct-Dec, Annual and the Duernast growing season
+                            DOY 77-237)
+         doy_climatology  - mean of each day of year over all years (DOY x station)
+         compare          - bias, percent bias, RMSE, MAE and correlation of an
+                            estimate against a reference per station and year
+                            (e.g. Hargreaves SRAD of the .WTH files against NASA
+                            POWER ALLSKY_SFC_SW_DWN)
+         
+         All statistics are groupby aggregations over one long table (STATION,
+         DATE, variables), so a whole weather archive is summarized in one pass.
+         
+         Usage:
+             python weather_stats.py ../../DSSAT48/Weather [--stations UFGA ACNM] [--out stats.csv]
+             python weather_stats.py ../input --power [--url http://localhost:8000/point]
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dssat_weather import EPOCH, WeatherStore
+from nasa_power import fetch_power, POWER_URL, CACHE_DIR
+
+# First day of year of each season (reference scripts/download_nasa_power_radiation.py)
+SEASON_STARTS = np.array([1, 90, 182, 274])
+SEASONS = np.array(['Winter', 'Spring', 'Summer', 'Fall'])
+
+# Growing season of the Duernast wheat (Mar 18 - Aug 25)
+GROWING_SEASON = (77, 237)
+
+PERIODS = ['Winter', 'Spring', 'Summer', 'Fall', 'Growing season', 'Annual']
+
+# First year of the POWER daily record
+POWER_FIRST_YEAR = 1981
+
+def weather_frame(store, variables=('SRAD',), stations=None):
+    """Long table STATION, DATE, variables of a WeatherStore
+    
+    Rows of overlapping files of one station are kept once (first file wins).
+    """
+    
+    counts = (store.stops - store.starts).astype(np.int64)
+    frame = {'STATION': np.repeat([name[:4].upper() for name in store.file_names], counts),
+             'DATE': EPOCH + store.days.astype(np.int64)}
+    for name in variables:
+        frame[name] = store.variables[name].astype(float)
+    frame = pd.DataFrame(frame)
+    if stations is not None:
+        frame = frame[frame['STATION'].isin([station.upper() for station in stations])]
+    frame = frame.drop_duplicates(['STATION', 'DATE'])
+    frame['STATION'] = frame['STATION'].astype('category')
+    return frame.sort_values(['STATION', 'DATE'], kind='stable').reset_index(drop=True)
+
+def with_periods(frame):
+    """Rows of frame labelled with PERIOD and YEAR (a row is in its season, the
+    annual period and, within DOY 77-237, the growing season)"""
+    
+    doy = frame['DATE'].dt.dayofyear.to_numpy()
+    frame = frame.assign(YEAR=frame['DATE'].dt.year.to_numpy())
+    growing = (doy >= GROWING_SEASON[0]) & (doy <= GROWING_SEASON[1])
+    labelled = pd.concat([
+        frame.assign(PERIOD=SEASONS[np.searchsorted(SEASON_STARTS, doy, 'right') - 1]),
+        frame[growing].assign(PERIOD='Growing season'),
+        frame.assign(PERIOD='Annual'),
+    ], ignore_index=True)
+    labelled['PERIOD'] = pd.Categorical(labelled['PERIOD'], categories=PERIODS, ordered=True)
+    return labelled
+
+def seasonal_stats(frame, variable='SRAD'):
+    """Count, mean, min and max of a variable per STATION, YEAR and PERIOD
+    
+    Args:
+        frame: Long table with STATION, DATE and the variable (NaN = missing)
+    """
+    
+    labelled = with_periods(frame.dropna(subset=[variable]))
+    return (labelled.groupby(['STATION', 'YEAR', 'PERIOD'], observed=True)[variable]
+            .agg(['count', 'mean', 'min', 'max']))
+
+def doy_climatology(frame, variable='SRAD'):
+    """Mean of a variable per day of year over all years: DataFrame DOY x STATION"""
+    
+    return frame.pivot_table(index=frame['DATE'].dt.dayofyear.rename('DOY'), columns='STATION',
+                             values=variable, aggfunc='mean', observed=True)
+
+def compare(reference, estimate, variable='SRAD', by=('STATION', 'YEAR'), periods=False):
+    """Error statistics of estimate against reference on their common days
+    
+    Args:
+        reference, estimate: Long tables with STATION, DATE and the variable
+        by: Grouping columns (STATION, YEAR, PERIOD)
+        periods: Also split every year into the seasonal periods (adds PERIOD)
+    
+    Returns:
+        DataFrame per group: N, REFERENCE and ESTIMATE means, BIAS (estimate -
+        reference), PBIAS (% of the reference mean), RMSE, MAE and R
+    """
+    
+    pairs = reference[['STATION', 'DATE', variable]].merge(
+        estimate[['STATION', 'DATE', variable]], on=['STATION', 'DATE'], suffixes=('_REF', '_EST'))
+    pairs = pairs.dropna()
+    x, y = pairs[f"{variable}_REF"].to_numpy(), pairs[f"{variable}_EST"].to_numpy()
+    pairs = pairs[['STATION', 'DATE']].assign(X=x, Y=y, D=y - x, D2=(y - x) ** 2, AD=np.abs(y - x),
+                                              XX=x * x, YY=y * y, XY=x * y)
+    pairs['STATION'] = pairs['STATION'].astype(str)
+    if periods:
+        pairs = with_periods(pairs)
+        by = list(by) + ['PERIOD'] if 'PERIOD' not in by else list(by)
+    else:
+        pairs['YEAR'] = pairs['DATE'].dt.year
+    
+    sums = pairs.groupby(list(by), observed=True)[['X', 'Y', 'D', 'D2', 'AD', 'XX', 'YY', 'XY']].sum()
+    n = pairs.groupby(list(by), observed=True).size()
+    stats = pd.DataFrame({'N': n, 'REFERENCE': sums['X'] / n, 'ESTIMATE': sums['Y'] / n})
+    stats['BIAS'] = sums['D'] / n
+    stats['PBIAS'] = 100 * stats['BIAS'] / stats['REFERENCE']
+    stats['RMSE'] = np.sqrt(sums['D2'] / n)
+    stats['MAE'] = sums['AD'] / n
+    cov = sums['XY'] / n - stats['REFERENCE'] * stats['ESTIMATE']
+    var_x = sums['XX'] / n - stats['REFERENCE'] ** 2
+    var_y = sums['YY'] / n - stats['ESTIMATE'] ** 2
+    spread = (var_x * var_y).clip(lower=0) ** 0.5
+    stats['R'] = (cov / spread).where(spread > 0)
+    return stats
+
+def power_frame_for(store, stations=None, parameter='ALLSKY_SFC_SW_DWN', variable='SRAD', **options):
+    """NASA POWER series of every located station of a store, as a long table
+    
+    Args:
+        options: nasa_power.fetch_power arguments (base_url, cache_dir, ...)
+    """
+    
+    weather = weather_frame(store, (), stations)
+    years = weather.groupby('STATION', observed=True)['DATE'].agg(['min', 'max'])
+    last = pd.Timestamp.today().year
+    requests, owners = [], {}
+    for station, (first_date, last_date) in years.iterrows():
+        site = store.site(station)
+        lat, lon = site.get('LAT'), site.get('LONG')
+        if lat is None or lon is None or -99 in (lat, lon):
+            continue
+        for year in range(max(first_date.year, POWER_FIRST_YEAR), min(last_date.year, last) + 1):
+            request = (round(lat, 4), round(lon, 4), year)
+            requests.append(request)
+            owners.setdefault(request, []).append(station)
+    
+    frames = fetch_power(requests, parameters=(parameter,), **options)
+    parts = [pd.DataFrame({'STATION': station, 'DATE': data.index, variable: data[parameter].to_numpy()})
+             for request, data in frames.items() for station in owners[request]]
+    if not parts:
+        return pd.DataFrame({'STATION': pd.Series(dtype=str), 'DATE': pd.Series(dtype='datetime64[ns]'),
+                             variable: pd.Series(dtype=float)})
+    return pd.concat(parts, ignore_index=True)
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Seasonal weather statistics and SRAD vs NASA POWER')
+    parser.add_argument('source', help='Weather store (.npz) or directory of .WTH files')
+    parser.add_argument('--variable', default='SRAD')
+    parser.add_argument('--stations', nargs='+')
+    parser.add_argument('--power', action='store_true',
+                        help='Compare SRAD with NASA POWER ALLSKY_SFC_SW_DWN')
+    parser.add_argument('--url', default=POWER_URL)
+    parser.add_argument('--cache', default=str(CACHE_DIR))
+    parser.add_argument('--out', help='Write the statistics to this CSV file')
+    args = parser.parse_args()
+    
+    source = Path(args.source)
+    store = WeatherStore.load(source) if source.suffix == '.npz' else WeatherStore.build(source)
+    if not store.files:
+        print(f"[ERROR] No .WTH files in {source}")
+        return 1
+    if args.variable not in store.variables:
+        print(f"[ERROR] No {args.variable} column in {source}")
+        return 1
+    
+    if args.power:
+        estimate = weather_frame(store, ('SRAD',), args.stations)
+        reference = power_frame_for(store, args.stations, base_url=args.url, cache_dir=args.cache)
+        stats = compare(reference, estimate, 'SRAD')
+        print("\nSRAD of the weather files vs NASA POWER (BIAS = file - POWER, MJ/m2/day):")
+    else:
+        stats = seasonal_stats(weather_frame(store, (args.variable,), args.stations), args.variable)
+        print(f"\n{args.variable} per station, year and period:")
+    
+    with pd.option_context('display.max_rows', 60, 'display.width', 120):
+        print(stats.round(2))
+    if args.out:
+        stats.to_csv(args.out)
+        print(f"[OK] {len(stats)} rows -> {args.out}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""patch_wth keeps the fixed-width layout of .WTH files"""
+
+import datetime
+
+import pytest
+
+from dssat_weather import patch_wth
+
+WTH = ("*WEATHER: TEST\r\n"
+       "\r\n"
+       "@ INSI      LAT     LONG  ELEV   TAV   AMP REFHT WNDHT\r\n"
+       "  TUDU   48.403   11.691   471   9.9  11.1   2.0   -99\r\n"
+       "\r\n"
+       "@DATE  SRAD  TMAX  TMIN  RAIN\r\n"
+       "15001   2.5   3.1  -2.0   0.0\r\n"
+       "15002   3.0   4.2  -1.5   1.2\r\n"
+       "15003   4.1   5.0  -0.5   0.0\r\n")
+
+@pytest.fixture
+def wth(tmp_path):
+    path = tmp_path / 'TEST1501.WTH'
+    path.write_bytes(WTH.encode('latin-1'))
+    return path
+
+def data_lines(path):
+    return path.read_bytes().decode('latin-1').split('\r\n')[6:9]
+
+def test_patch_replaces_only_the_column(wth):
+    counts = patch_wth(wth, {'SRAD': {datetime.date(2015, 1, 2): 12.34}})
+    assert counts == {'SRAD': 1}
+    assert data_lines(wth) == ["15001   2.5   3.1  -2.0   0.0",
+                               "15002  12.3   4.2  -1.5   1.2",
+                               "15003   4.1   5.0  -0.5   0.0"]
+
+def test_wide_values_drop_decimals_and_keep_columns(wth):
+    patch_wth(wth, {'SRAD': {datetime.date(2015, 1, 1): 1000.0, datetime.date(2015, 1, 2): 12345.6},
+                    'TMIN': {datetime.date(2015, 1, 3): -100.0}})
+    assert data_lines(wth) == ["15001 1000.   3.1  -2.0   0.0",
+                               "15002 12346   4.2  -1.5   1.2",
+                               "15003   4.1   5.0 -100.   0.0"]
+
+def test_value_too_wide_for_field_raises(wth):
+    with pytest.raises(ValueError):
+        patch_wth(wth, {'SRAD': {datetime.date(2015, 1, 1): 123456.0}})
+    assert wth.read_bytes().decode('latin-1') == WTH
+    assert [path.name for path in wth.parent.iterdir()] == [wth.name]
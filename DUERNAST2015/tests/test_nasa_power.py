@@ -0,0 +1,99 @@
+"""PowerFetcher against a local stand-in for the NASA POWER API"""
+
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from nasa_power import PowerFetcher, cache_path, power_frame, request_params
+
+REQUEST = (48.403, 11.691, 2015)
+
+class PowerStub(ThreadingHTTPServer):
+    """Answers each request with the next queued status (200 once the queue is empty)"""
+    
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), PowerHandler)
+        self.statuses = []
+        self.hits = 0
+        self.url = f"http://127.0.0.1:{self.server_address[1]}/point"
+
+class PowerHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.hits += 1
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        if status != 200:
+            self.send_error(status)
+            return
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        year = query['start'][0][:4]
+        body = json.dumps({
+            'header': {'fill_value': -999},
+            'properties': {'parameter': {name: {f"{year}0101": 1.5, f"{year}0102": -999}
+                                         for name in query['parameters'][0].split(',')}},
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    stub = PowerStub()
+    thread = threading.Thread(target=stub.serve_forever, daemon=True)
+    thread.start()
+    yield stub
+    stub.shutdown()
+    stub.server_close()
+
+def make_fetcher(server, cache_dir, **options):
+    return PowerFetcher(server.url, cache_dir, backoff=0.01, timeout=5, **options)
+
+def test_cache_hit_skips_download(server, tmp_path):
+    first = make_fetcher(server, tmp_path)
+    responses = first.fetch([REQUEST])
+    assert first.downloaded == 1 and first.cached == 0
+    assert cache_path(request_params(*REQUEST), tmp_path).is_file()
+    
+    second = make_fetcher(server, tmp_path)
+    assert second.fetch([REQUEST]) == responses
+    assert second.downloaded == 0 and second.cached == 1
+    assert server.hits == 1
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_retry_after_transient_status(server, tmp_path, status):
+    server.statuses = [status]
+    fetcher = make_fetcher(server, tmp_path, retries=3)
+    responses = fetcher.fetch([REQUEST])
+    assert REQUEST in responses
+    assert fetcher.downloaded == 1
+    assert server.hits == 2
+
+def test_fatal_client_error_is_not_retried(server, tmp_path):
+    server.statuses = [404]
+    fetcher = make_fetcher(server, tmp_path, retries=3)
+    assert fetcher.fetch([REQUEST]) == {}
+    assert fetcher.downloaded == 0
+    assert server.hits == 1
+    assert not list(tmp_path.iterdir())
+
+def test_retries_below_one_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        PowerFetcher(cache_dir=tmp_path, retries=0)
+
+def test_power_frame_checks_units():
+    data = {'header': {'fill_value': -999},
+            'parameters': {'EVLAND': {'units': 'kg m-2 s-1'}},
+            'properties': {'parameter': {'EVLAND': {'20150101': 20.0, '20150102': -999}}}}
+    frame = power_frame(data)
+    assert frame['EVLAND'].iloc[0] == 20.0 and frame['EVLAND'].isna().iloc[1]
+    with pytest.raises(ValueError):
+        power_frame(data, {'EVLAND': 'kg/m^2/s * 10^6'})
+    data['parameters']['EVLAND']['units'] = 'kg/m^2/s * 10^6'
+    assert len(power_frame(data, {'EVLAND': 'kg/m^2/s * 10^6'})) == 2